@@ -86,6 +86,7 @@ setup(
               ],
     license='LGPLv3',
     install_requires=windows_dep if sys.platform == 'win32' else unix_dep,
+    extras_require={'hdf5': ['h5py>=3.1.0']},
     python_requires='>=3.8, <3.11',
     classifiers=['Development Status :: 5 - Production/Stable',
 
@@ -120,7 +121,8 @@ setup(
         'console_scripts': ['qudi=qudi.runnable:main',
                             'qudi-config-editor=qudi.tools.config_editor.config_editor:main',
                             'qudi-uninstall-kernel=qudi.core.qudikernel:uninstall_kernel',
-                            'qudi-install-kernel=qudi.core.qudikernel:install_kernel'
+                            'qudi-install-kernel=qudi.core.qudikernel:install_kernel',
+                            'qudi-rebuild-data-catalog=qudi.util.datacatalog:main'
                             ]
     },
     zip_safe=False
@@ -408,6 +408,15 @@ class Qudi(QtCore.QObject):
             self.module_manager.stop_all_modules()
             self.module_manager.clear()
             QtCore.QCoreApplication.instance().processEvents()
+            self.log.info('Waiting for pending data saves...')
+            print('> Waiting for pending data saves...')
+            try:
+                from qudi.util.datastorage import DataStorageBase, DataStreamBase
+                DataStreamBase.close_all()
+                DataStorageBase.drain_async_saves()
+            except:
+                self.log.exception('Error while waiting for pending data saves:')
+            QtCore.QCoreApplication.instance().processEvents()
             if not self.no_gui:
                 self.log.info('Closing main GUI...')
                 print('> Closing main GUI...')
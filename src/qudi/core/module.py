@@ -313,10 +313,26 @@ class Base(QtCore.QObject, metaclass=ModuleMeta):
         except:
             self.log.exception('Exception during deactivation:')
         finally:
-            # save status variables even if deactivation failed
+            # write buffered data and save status variables even if deactivation failed
+            self._close_data_streams()
             self._dump_status_variables()
         return True
 
+    def _close_data_streams(self) -> None:
+        """ Flush and close all data streams held by this module, either directly or via a
+        data storage instance attribute (see TextDataStorage.open_stream and
+        Hdf5DataStorage.open_stream).
+        """
+        try:
+            from qudi.util.datastorage import TextDataStorage, Hdf5DataStorage, DataStreamBase
+            for value in list(vars(self).values()):
+                if isinstance(value, (TextDataStorage, Hdf5DataStorage)):
+                    value.close_streams()
+                elif isinstance(value, DataStreamBase):
+                    value.close()
+        except:
+            self.log.exception('Exception while closing data streams:')
+
     def _load_status_variables(self) -> None:
         """ Load status variables from app data directory on disc.
         """
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains a persistent SQLite based index of measurement data files saved by the qudi data
+storage objects (see qudi.util.datastorage). It allows to query saved data sets by timestamp,
+nametag and metadata without opening every single data file.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ('get_default_catalog_path', 'flatten_metadata', 'DataCatalog')
+
+import os
+import re
+import sqlite3
+import logging
+import argparse
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from qudi.util.mutex import Mutex
+from qudi.util.paths import get_default_data_dir
+from qudi.util.datastorage import get_metadata_from_file
+
+_log = logging.getLogger(__name__)
+
+# Matches file names created by qudi.util.datastorage.get_timestamp_filename
+_timestamp_filename_regex = re.compile(r'^(\d{8}-\d{4}-\d{2})(?:_(.+))?$')
+
+# Storage class names to register for files found on disk, by file extension
+_storage_by_extension = {'.dat': 'TextDataStorage',
+                         '.csv': 'CsvDataStorage',
+                         '.npy': 'NpyDataStorage',
+                         '.h5': 'Hdf5DataStorage',
+                         '.hdf5': 'Hdf5DataStorage'}
+
+_schema = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    timestamp REAL,
+    nametag TEXT,
+    storage TEXT,
+    shape TEXT,
+    notes TEXT,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS metadata (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value_num REAL,
+    value_text TEXT
+);
+CREATE INDEX IF NOT EXISTS files_timestamp_index ON files (timestamp);
+CREATE INDEX IF NOT EXISTS files_nametag_index ON files (nametag);
+CREATE INDEX IF NOT EXISTS metadata_num_index ON metadata (key, value_num);
+CREATE INDEX IF NOT EXISTS metadata_text_index ON metadata (key, value_text);
+CREATE INDEX IF NOT EXISTS metadata_file_index ON metadata (file_id);
+"""
+
+
+def get_default_catalog_path():
+    """ Returns the default path of the data catalog database file located in the default data
+    root directory.
+
+    @return str: path to default data catalog database file
+    """
+    return os.path.join(get_default_data_dir(), 'qudi_data_catalog.sqlite')
+
+
+def flatten_metadata(metadata, _prefix=''):
+    """ Flattens a (nested) metadata dict into a flat dict. Keys of nested dicts are joined by ".",
+    e.g. {'laser': {'power': 1e-3}} becomes {'laser.power': 1e-3}.
+
+    @param dict metadata: (nested) metadata dict to flatten
+
+    @return dict: flattened metadata dict
+    """
+    flat = dict()
+    for key, value in metadata.items():
+        key = f'{_prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_metadata(value, _prefix=f'{key}.'))
+        else:
+            flat[key] = value
+    return flat
+
+
+def _metadata_value_to_columns(value):
+    """ Converts a single metadata value into a (numeric, text) value tuple for the database.
+    Real numbers (incl. bool) are stored as numeric value, strings as text and everything else as
+    repr text.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, float)):
+        return float(value), None
+    if isinstance(value, str):
+        return None, value
+    return None, repr(value)
+
+
+def _nametag_from_file_path(file_path):
+    match = _timestamp_filename_regex.match(os.path.splitext(os.path.basename(file_path))[0])
+    return None if match is None else match.group(2)
+
+
+def _scan_data_file(file_path):
+    """ Reads the header of a qudi data file and returns the info needed for the catalog.
+    Returns None if the file is not a readable qudi data file.
+
+    @param str file_path: path of data file to read header from
+
+    @return dict: file info with keys "timestamp", "notes", "shape", "metadata", "storage", "mtime"
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    try:
+        mtime = os.path.getmtime(file_path)
+        metadata, general = get_metadata_from_file(file_path)
+    except Exception:
+        _log.debug(f'Unable to read qudi data file header from "{file_path}"', exc_info=True)
+        return None
+    return {'timestamp': general.get('timestamp', None),
+            'notes': general.get('notes', None),
+            'shape': general.get('shape', None),
+            'metadata': metadata,
+            'storage': _storage_by_extension.get(extension, None),
+            'mtime': mtime}
+
+
+class DataCatalog:
+    """ Persistent index (SQLite database) of data files saved by qudi data storage objects.
+    Each entry holds the file path, timestamp, nametag, storage class name, data shape, notes and
+    the flattened metadata of a saved data set.
+
+    The catalog is kept up to date automatically for all data saved via DataStorageBase.save_data
+    once it has been registered via DataStorageBase.set_data_catalog. Existing data directories can
+    be (re-)indexed by calling rebuild or by running the "qudi-rebuild-data-catalog" command.
+
+    Usage example:
+
+        catalog = DataCatalog(get_default_catalog_path())
+        DataStorageBase.set_data_catalog(catalog)
+        ...
+        paths = catalog.query(nametag='odmr',
+                              start=datetime(2021, 5, 1),
+                              stop=datetime(2021, 6, 1),
+                              metadata={'power': 13, 'frequency': (2.8e9, 2.9e9)})
+    """
+
+    # File extensions considered when scanning data directories
+    data_file_extensions = ('.dat', '.csv', '.npy', '.h5', '.hdf5')
+
+    def __init__(self, db_path):
+        """
+        @param str db_path: path to SQLite database file (will be created if not existing)
+        """
+        self._db_path = db_path
+        self._lock = Mutex()
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(_schema)
+        self._connection.commit()
+
+    @property
+    def db_path(self):
+        return self._db_path
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def add_file(self, file_path, *, timestamp=None, nametag=None, metadata=None, notes=None,
+                 shape=None, storage=None, mtime=None):
+        """ Add a data file to the catalog. An existing entry with the same path is replaced.
+
+        @param str file_path: path of the data file to add
+        @param datetime.datetime timestamp: optional, timestamp of the data set
+        @param str nametag: optional, nametag of the data set (derived from file name if omitted)
+        @param dict metadata: optional, (nested) metadata dict of the data set
+        @param str notes: optional, notes of the data set
+        @param tuple shape: optional, shape of the saved data array
+        @param str storage: optional, name of the storage class used to save the data set
+        @param float mtime: optional, file modification time (read from disk if omitted)
+        """
+        with self._lock, self._connection:
+            self._add_file(file_path, timestamp, nametag, metadata, notes, shape, storage, mtime)
+
+    def remove_file(self, file_path):
+        """ Remove a data file entry from the catalog. Does nothing if the file is not indexed.
+
+        @param str file_path: path of the data file to remove
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM files WHERE path = ?',
+                                     (os.path.abspath(file_path),))
+
+    def clear(self):
+        """ Remove all entries from the catalog.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM metadata')
+            self._connection.execute('DELETE FROM files')
+
+    def query(self, *, nametag=None, start=None, stop=None, metadata=None, storage=None):
+        """ Query the catalog for data files matching all given criteria.
+
+        Metadata criteria are given as dict with flattened metadata keys (see flatten_metadata).
+        Values can either be a single value to match exactly or a (min, max) tuple to match a
+        numeric range (use None for an open end).
+
+        @param str nametag: optional, nametag to match (case-insensitive)
+        @param datetime.datetime start: optional, earliest timestamp to match
+        @param datetime.datetime stop: optional, latest timestamp to match
+        @param dict metadata: optional, metadata key-value criteria to match
+        @param str storage: optional, name of the storage class used to save the data sets
+
+        @return list: paths of matching data files, sorted by timestamp
+        """
+        conditions = list()
+        parameters = list()
+        if nametag is not None:
+            conditions.append('nametag = ? COLLATE NOCASE')
+            parameters.append(nametag)
+        if start is not None:
+            conditions.append('timestamp >= ?')
+            parameters.append(start.timestamp())
+        if stop is not None:
+            conditions.append('timestamp <= ?')
+            parameters.append(stop.timestamp())
+        if storage is not None:
+            conditions.append('storage = ?')
+            parameters.append(storage)
+        if metadata is not None:
+            for key, value in flatten_metadata(metadata).items():
+                if isinstance(value, tuple) and len(value) == 2:
+                    criteria = ['key = ?']
+                    parameters.append(key)
+                    if value[0] is not None:
+                        criteria.append('value_num >= ?')
+                        parameters.append(float(value[0]))
+                    if value[1] is not None:
+                        criteria.append('value_num <= ?')
+                        parameters.append(float(value[1]))
+                else:
+                    value_num, value_text = _metadata_value_to_columns(value)
+                    if value_num is None:
+                        criteria = ['key = ?', 'value_text = ?']
+                        parameters.extend((key, value_text))
+                    else:
+                        criteria = ['key = ?', 'value_num = ?']
+                        parameters.extend((key, value_num))
+                conditions.append(
+                    f'id IN (SELECT file_id FROM metadata WHERE {" AND ".join(criteria)})'
+                )
+        sql = 'SELECT path FROM files'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY timestamp'
+        with self._lock:
+            return [row[0] for row in self._connection.execute(sql, parameters)]
+
+    def get_entry(self, file_path):
+        """ Returns the catalog entry of a single data file.
+
+        @param str file_path: path of the indexed data file
+
+        @return dict: catalog entry including flattened metadata (None if not indexed)
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT id, path, timestamp, nametag, storage, shape, notes FROM files '
+                'WHERE path = ?',
+                (os.path.abspath(file_path),)
+            ).fetchone()
+            if row is None:
+                return None
+            metadata = dict()
+            for key, value_num, value_text in self._connection.execute(
+                    'SELECT key, value_num, value_text FROM metadata WHERE file_id = ?', (row[0],)):
+                metadata[key] = value_text if value_num is None else value_num
+        return {'path': row[1],
+                'timestamp': None if row[2] is None else datetime.fromtimestamp(row[2]),
+                'nametag': row[3],
+                'storage': row[4],
+                'shape': row[5],
+                'notes': row[6],
+                'metadata': metadata}
+
+    def rebuild(self, root_dir, *, clear=False, max_workers=None):
+        """ (Re-)Index all qudi data files found in root_dir (recursive). File headers are read
+        concurrently in a thread pool. Files already indexed with unchanged modification time are
+        skipped unless clear is True. Entries of files within root_dir that no longer exist are
+        removed.
+
+        @param str root_dir: root directory to scan for data files (e.g. the qudi data directory)
+        @param bool clear: optional, remove all existing entries before scanning (default: False)
+        @param int max_workers: optional, number of threads used to read file headers
+
+        @return int: number of added/updated data files
+        """
+        if clear:
+            self.clear()
+            known = dict()
+        else:
+            with self._lock:
+                known = dict(self._connection.execute('SELECT path, mtime FROM files'))
+        file_paths = list()
+        found = set()
+        for dir_path, _, file_names in os.walk(root_dir):
+            for file_name in file_names:
+                if not file_name.lower().endswith(self.data_file_extensions):
+                    continue
+                file_path = os.path.abspath(os.path.join(dir_path, file_name))
+                found.add(file_path)
+                if file_path in known:
+                    try:
+                        if os.path.getmtime(file_path) == known[file_path]:
+                            continue
+                    except OSError:
+                        continue
+                file_paths.append(file_path)
+
+        # Indexed files within root_dir that have been deleted from disk. Files not found by the
+        # scan (e.g. added with a different file extension) are only removed if they do not exist.
+        root_prefix = os.path.join(os.path.abspath(root_dir), '')
+        deleted = [(path,) for path in known if path.startswith(root_prefix) and
+                   path not in found and not os.path.exists(path)]
+
+        added = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            infos = executor.map(_scan_data_file, file_paths)
+            with self._lock, self._connection:
+                self._connection.executemany('DELETE FROM files WHERE path = ?', deleted)
+                for file_path, info in zip(file_paths, infos):
+                    if info is None:
+                        continue
+                    self._add_file(file_path,
+                                   info['timestamp'],
+                                   None,
+                                   info['metadata'],
+                                   info['notes'],
+                                   info['shape'],
+                                   info['storage'],
+                                   info['mtime'])
+                    added += 1
+        return added
+
+    def _add_file(self, file_path, timestamp, nametag, metadata, notes, shape, storage, mtime):
+        file_path = os.path.abspath(file_path)
+        if nametag is None:
+            nametag = _nametag_from_file_path(file_path)
+        if mtime is None:
+            try:
+                mtime = os.path.getmtime(file_path)
+            except OSError:
+                mtime = None
+        self._connection.execute('DELETE FROM files WHERE path = ?', (file_path,))
+        cursor = self._connection.execute(
+            'INSERT INTO files (path, timestamp, nametag, storage, shape, notes, mtime) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (file_path,
+             None if timestamp is None else timestamp.timestamp(),
+             nametag,
+             storage,
+             None if shape is None else repr(tuple(shape)),
+             notes,
+             mtime)
+        )
+        if metadata:
+            file_id = cursor.lastrowid
+            self._connection.executemany(
+                'INSERT INTO metadata (file_id, key, value_num, value_text) VALUES (?, ?, ?, ?)',
+                ((file_id, key, *_metadata_value_to_columns(value)) for key, value in
+                 flatten_metadata(metadata).items())
+            )
+
+
+def main():
+    """ Command line entry point to (re-)build a data catalog database from data files on disk.
+    """
+    parser = argparse.ArgumentParser(prog='qudi-rebuild-data-catalog',
+                                     description='(Re-)Build the qudi data catalog by scanning the '
+                                                 'headers of all data files in a directory tree.')
+    parser.add_argument('root_dir',
+                        nargs='?',
+                        default=None,
+                        help='root directory to scan for data files (default: qudi data directory)')
+    parser.add_argument('-d', '--database',
+                        default=None,
+                        help='path to catalog database file (default: <root_dir>/'
+                             'qudi_data_catalog.sqlite)')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=None,
+                        help='number of threads used to read file headers')
+    parser.add_argument('-c', '--clear',
+                        action='store_true',
+                        help='remove all existing catalog entries before scanning')
+    args = parser.parse_args()
+
+    root_dir = get_default_data_dir() if args.root_dir is None else args.root_dir
+    db_path = args.database
+    if db_path is None:
+        db_path = os.path.join(root_dir, 'qudi_data_catalog.sqlite')
+    with DataCatalog(db_path) as catalog:
+        count = catalog.rebuild(root_dir, clear=args.clear, max_workers=args.workers)
+        print(f'Indexed {count:d} data files from "{root_dir}" into catalog "{db_path}" '
+              f'({len(catalog):d} entries total).')
+
+
+if __name__ == '__main__':
+    main()
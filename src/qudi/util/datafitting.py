@@ -21,13 +21,20 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 __all__ = ('is_fit_model', 'get_all_fit_models', 'FitConfiguration', 'FitConfigurationsModel',
-           'FitContainer')
+           'FitContainer', 'FitTracker', 'HighResBestFit')
 
+import os
 import importlib
 import logging
 import inspect
+import threading
+import multiprocessing
 import lmfit
 import numpy as np
+from collections.abc import Sequence
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import as_completed
+from multiprocessing.shared_memory import SharedMemory
 from PySide2 import QtCore
 from typing import Iterable, Optional, Mapping, Union
 
@@ -35,7 +42,7 @@ import qudi.util.fit_models as _fit_models_ns
 from qudi.util.mutex import Mutex
 from qudi.util.units import create_formatted_output
 from qudi.util.helpers import iter_modules_recursive
-from qudi.util.fit_models.model import FitModelBase
+from qudi.util.fit_models.model import FitModelBase, FIT_OBJECTIVES
 
 
 _log = logging.getLogger(__name__)
@@ -64,6 +71,140 @@ def get_all_fit_models():
     return _fit_models.copy()
 
 
+# Cache of default lmfit.Parameters per fit model name. Fit models are only collected once upon
+# import, so the defaults never change. Do not hand out these objects without copying them.
+_default_parameters = dict()
+
+
+def _get_default_parameters(model_name):
+    """ Returns the cached (shared) default parameters of a fit model. Copy before mutating.
+    """
+    try:
+        return _default_parameters[model_name]
+    except KeyError:
+        params = _fit_models[model_name]().make_params()
+        params = lmfit.Parameters() if params is None else params
+        _default_parameters[model_name] = params
+        return params
+
+
+def _get_fit_parameters(model, estimator, custom_parameters, data, x):
+    """ Helper to create the initial fit parameters for a model according to a fit configuration,
+    i.e. by calling the estimator (if any) and applying custom parameters (if any).
+    """
+    if estimator is None:
+        parameters = model.make_params()
+    else:
+        parameters = model.estimators[estimator](data, x)
+    if custom_parameters is not None:
+        for name, param in custom_parameters.items():
+            parameters[name] = param
+    return parameters
+
+
+def _fit_batch_rows(config_dict, parameter_names, x, data, objective='least_squares'):
+    """ Fits each row of a 2D data array with the model and settings of a fit configuration dict
+    representation (see FitConfiguration.to_dict) using the given fit objective
+    (see FitModelBase.fit). Used by FitContainer.fit_data_batch and executed in worker processes.
+
+    @return list: (success, reduced chi-square, best values, stderrs) tuple for each data row
+    """
+    config = FitConfiguration.from_dict(dict(config_dict))
+    model = _fit_models[config.model]()
+    estimator = config.estimator
+    custom_parameters = config.custom_parameters
+    nan_values = (np.nan,) * len(parameter_names)
+    results = list()
+    for row in data:
+        try:
+            parameters = _get_fit_parameters(model, estimator, custom_parameters, row, x)
+            result = model.fit(row, parameters, x=x, objective=objective)
+        except Exception:
+            results.append((False, np.nan, nan_values, nan_values))
+            continue
+        values = tuple(result.params[name].value for name in parameter_names)
+        stderrs = tuple(np.nan if result.params[name].stderr is None else
+                        result.params[name].stderr for name in parameter_names)
+        results.append((result.success, result.redchi, values, stderrs))
+    return results
+
+
+def _fit_map_rows(config_dict, parameter_names, x, data, rows, objective='least_squares',
+                  tolerance=2., seed_neighbours=True, progress_callback=None):
+    """ Fits each spectrum of the given rows of a 3D data array (ny, nx, npoints) with the model and
+    settings of a fit configuration dict representation (see FitConfiguration.to_dict). Used by
+    FitContainer.fit_data_map and executed in worker processes.
+
+    The rows are traversed in snake order, so each pixel follows a neighbouring pixel. If
+    <seed_neighbours> is True, each fit is seeded with the result of the preceding pixel and
+    repeated starting from the estimator if rejected (see FitContainer._fit_warm_start).
+
+    @param data: 3D data array or (shared memory name, shape, dtype) tuple to read the data from
+    @param iterable rows: row indices to fit
+    @param callable progress_callback: optional, called with the number of fitted pixels after
+                                       each row
+
+    @return list: (row index, row results) tuples with (success, reduced chi-square, warm_start,
+                  best values, stderrs) tuple for each pixel of the row
+    """
+    config = FitConfiguration.from_dict(dict(config_dict))
+    model = _fit_models[config.model]()
+    estimator = config.estimator
+    custom_parameters = config.custom_parameters
+    fit_kwargs = {'x': x, 'objective': objective}
+    nan_values = (np.nan,) * len(parameter_names)
+    shared_memory = None
+    if not isinstance(data, np.ndarray):
+        shared_memory = SharedMemory(name=data[0])
+        data = np.ndarray(data[1], dtype=data[2], buffer=shared_memory.buf)
+    try:
+        columns = np.arange(data.shape[1])
+        results = list()
+        last_result = None
+        for ii, row in enumerate(rows):
+            row_results = [None] * columns.size
+            for column in (columns if ii % 2 == 0 else columns[::-1]):
+                # Copy spectrum to not keep references to the (shared) data buffer
+                spectrum = np.array(data[row, column], dtype=float)
+                result = None
+                if seed_neighbours and last_result is not None:
+                    result = FitContainer._fit_warm_start(model,
+                                                          last_result,
+                                                          tolerance,
+                                                          spectrum,
+                                                          fit_kwargs)
+                if result is None:
+                    try:
+                        parameters = _get_fit_parameters(model,
+                                                         estimator,
+                                                         custom_parameters,
+                                                         spectrum,
+                                                         x)
+                        result = model.fit(spectrum, parameters, **fit_kwargs)
+                    except Exception:
+                        last_result = None
+                        row_results[column] = (False, np.nan, False, nan_values, nan_values)
+                        continue
+                    result.warm_start = False
+                last_result = result if result.success and np.isfinite(result.redchi) else None
+                values = tuple(result.params[name].value for name in parameter_names)
+                stderrs = tuple(np.nan if result.params[name].stderr is None else
+                                result.params[name].stderr for name in parameter_names)
+                row_results[column] = (result.success,
+                                       result.redchi,
+                                       result.warm_start,
+                                       values,
+                                       stderrs)
+            results.append((row, row_results))
+            if progress_callback is not None:
+                progress_callback(columns.size)
+        return results
+    finally:
+        if shared_memory is not None:
+            del data
+            shared_memory.close()
+
+
 class FitConfiguration:
     """
     """
@@ -106,8 +247,7 @@ class FitConfiguration:
 
     @property
     def default_parameters(self):
-        params = _fit_models[self._model]().make_params()
-        return lmfit.Parameters() if params is None else params
+        return _get_default_parameters(self._model).copy()
 
     @property
     def custom_parameters(self):
@@ -116,8 +256,7 @@ class FitConfiguration:
     @custom_parameters.setter
     def custom_parameters(self, value):
         if value is not None:
-            default_params = self.default_parameters
-            invalid = set(value).difference(default_params)
+            invalid = set(value).difference(_get_default_parameters(self._model))
             assert not invalid, f'Invalid model parameters encountered: {invalid}'
             assert isinstance(value, lmfit.Parameters), \
                 'Property custom_parameters must be of type <lmfit.Parameters>.'
@@ -162,7 +301,7 @@ class FitConfigurationsModel(QtCore.QAbstractListModel):
 
     @property
     def model_default_parameters(self):
-        return {name: model().make_params() for name, model in _fit_models.items()}
+        return {name: _get_default_parameters(name).copy() for name in _fit_models}
 
     @property
     def configuration_names(self):
@@ -277,23 +416,120 @@ class FitConfigurationsModel(QtCore.QAbstractListModel):
         self.sigFitConfigurationsChanged.emit(self.configuration_names)
 
 
+class HighResBestFit(Sequence):
+    """ Lazily evaluated high-resolution best-fit curve of a fit result. Behaves like the tuple
+    (x, y) of numpy arrays, e.g. "x, y = fit_result.high_res_best_fit". The fit model is only
+    evaluated upon first access of the data.
+
+    The curve is sampled with <oversampling> times the number of points of the original x-axis,
+    capped to <max_points> (but never less than the original number of points). If <x_range> is
+    given, only the overlap of this (visible) range with the original x-axis span is sampled.
+    """
+
+    def __init__(self, model, best_values, x, oversampling=10, max_points=10000, x_range=None):
+        """
+        @param lmfit.Model model: fit model to evaluate
+        @param dict best_values: best fit parameter values
+        @param numpy.ndarray x: original x-axis of the fitted data
+        @param int oversampling: optional, number of curve points per original data point
+        @param int max_points: optional, maximum number of curve points
+        @param tuple x_range: optional, (min, max) x-axis range to evaluate the curve in
+        """
+        self._model = model
+        self._best_values = dict(best_values)
+        self._x_start = x[0]
+        self._x_stop = x[-1]
+        self._points = max(len(x), min(len(x) * max(1, int(oversampling)), int(max_points)))
+        self._x_range = None if x_range is None else (min(x_range), max(x_range))
+        self._curve = None
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        if self._curve is None:
+            self._curve = self.evaluate(self._x_range)
+        return self._curve[index]
+
+    @property
+    def is_evaluated(self):
+        return self._curve is not None
+
+    def evaluate(self, x_range=None, points=None):
+        """ Evaluates the best-fit curve without altering the lazily evaluated (cached) curve.
+        Use this e.g. to only sample the currently visible range of a plot.
+
+        @param tuple x_range: optional, (min, max) x-axis range to evaluate the curve in
+        @param int points: optional, number of curve points (default: same as lazy curve)
+
+        @return (numpy.ndarray, numpy.ndarray): x and y values of the best-fit curve
+        """
+        start, stop = self._x_start, self._x_stop
+        if x_range is not None:
+            # Restrict to overlap with the fitted x-axis span, preserving its direction
+            low, high = max(min(x_range), min(start, stop)), min(max(x_range), max(start, stop))
+            if low > high:
+                return np.empty(0), np.empty(0)
+            start, stop = (low, high) if start <= stop else (high, low)
+        points = self._points if points is None else int(points)
+        high_res_x = np.linspace(start, stop, points)
+        return high_res_x, self._model.eval(**self._best_values, x=high_res_x)
+
+
 class FitContainer(QtCore.QObject):
     """
     """
     sigFitConfigurationsChanged = QtCore.Signal(tuple)  # config_names
     sigLastFitResultChanged = QtCore.Signal(str, object)  # (fit_config name, lmfit.ModelResult)
 
-    def __init__(self, *args, config_model, **kwargs):
+    def __init__(self, *args, config_model, warm_start=False, warm_start_tolerance=2.,
+                 high_res_oversampling=10, high_res_max_points=10000, objective='least_squares',
+                 **kwargs):
+        """
+        @param FitConfigurationsModel config_model: model holding the available fit configurations
+        @param bool warm_start: optional, seed fits with the parameters of the last fit result
+                                instead of running the estimator (see fit_data)
+        @param float warm_start_tolerance: optional, maximum allowed ratio of reduced chi-square of
+                                           a warm-started fit and the last fit result before
+                                           falling back to the estimator
+        @param int high_res_oversampling: optional, number of points per data point of the
+                                          high-resolution best-fit curve (see HighResBestFit)
+        @param int high_res_max_points: optional, maximum number of points of the high-resolution
+                                        best-fit curve (see HighResBestFit)
+        @param str objective: optional, fit objective to minimize, i.e. "least_squares" or
+                              "poisson" for photon count data (see FitModelBase.fit)
+        """
         assert isinstance(config_model, FitConfigurationsModel)
+        if objective not in FIT_OBJECTIVES:
+            raise ValueError(f'Invalid fit objective "{objective}". Valid objectives are: '
+                             f'{FIT_OBJECTIVES}')
         super().__init__(*args, **kwargs)
         self._access_lock = Mutex()
         self._configuration_model = config_model
         self._last_fit_result = None
         self._last_fit_config = 'No Fit'
+        self._warm_start = bool(warm_start)
+        self._warm_start_tolerance = float(warm_start_tolerance)
+        self._warm_start_state = None  # (configuration key, x) of last fit result
+        self._objective = objective
+        self._high_res_oversampling = int(high_res_oversampling)
+        self._high_res_max_points = int(high_res_max_points)
+        self._high_res_range = None
+        # Cached fit model instances and custom parameters per fit configuration name. Each thread
+        # fitting with this container uses its own model instances (see _get_cached_model).
+        self._model_cache = threading.local()
+        self._model_cache_generation = 0
+        self._batch_lock = Mutex()
+        self._batch_executor = None
+        self._batch_workers = 0
+        self._async_lock = Mutex()
+        self._async_executor = None
+        self._async_jobs = list()  # (Future, abort threading.Event) of asynchronous fits
 
         self._configuration_model.sigFitConfigurationsChanged.connect(
             self.sigFitConfigurationsChanged
         )
+        self._configuration_model.sigFitConfigurationsChanged.connect(self._clear_model_cache)
 
     @property
     def fit_configurations(self):
@@ -308,36 +544,490 @@ class FitContainer(QtCore.QObject):
         with self._access_lock:
             return self._last_fit_config, self._last_fit_result
 
-    @QtCore.Slot(str, object, object)
-    def fit_data(self, fit_config, x, data):
+    @property
+    def warm_start(self):
+        return self._warm_start
+
+    @warm_start.setter
+    def warm_start(self, value):
         with self._access_lock:
-            if fit_config:
-                # Handle "No Fit" case
-                if fit_config == 'No Fit':
-                    self._last_fit_result = None
-                    self._last_fit_config = 'No Fit'
-                else:
-                    config = self._configuration_model.get_configuration_by_name(fit_config)
-                    model = _fit_models[config.model]()
-                    estimator = config.estimator
-                    add_parameters = config.custom_parameters
-                    if estimator is None:
-                        parameters = model.make_params()
-                    else:
-                        parameters = model.estimators[estimator](data, x)
-                    if add_parameters is not None:
-                        for name, param in add_parameters.items():
-                            parameters[name] = param
-                    result = model.fit(data, parameters, x=x)
-                    # Mutate lmfit.ModelResult object to include high-resolution result curve
-                    high_res_x = np.linspace(x[0], x[-1], len(x) * 10)
-                    result.high_res_best_fit = (high_res_x,
-                                                model.eval(**result.best_values, x=high_res_x))
-                    self._last_fit_result = result
-                    self._last_fit_config = fit_config
-                self.sigLastFitResultChanged.emit(self._last_fit_config, self._last_fit_result)
-                return self._last_fit_config, self._last_fit_result
+            self._warm_start = bool(value)
+            self._warm_start_state = None
+
+    @property
+    def warm_start_tolerance(self):
+        return self._warm_start_tolerance
+
+    @warm_start_tolerance.setter
+    def warm_start_tolerance(self, value):
+        self._warm_start_tolerance = float(value)
+
+    @property
+    def objective(self):
+        """ Fit objective minimized by subsequent fits, i.e. "least_squares" or "poisson" (Poisson
+        maximum-likelihood for photon count data, see FitModelBase.fit).
+        """
+        return self._objective
+
+    @objective.setter
+    def objective(self, value):
+        if value not in FIT_OBJECTIVES:
+            raise ValueError(f'Invalid fit objective "{value}". Valid objectives are: '
+                             f'{FIT_OBJECTIVES}')
+        with self._access_lock:
+            self._objective = value
+            # Reduced chi-square values of different objectives are not comparable
+            self._warm_start_state = None
+
+    @property
+    def high_res_oversampling(self):
+        return self._high_res_oversampling
+
+    @high_res_oversampling.setter
+    def high_res_oversampling(self, value):
+        self._high_res_oversampling = int(value)
+
+    @property
+    def high_res_max_points(self):
+        return self._high_res_max_points
+
+    @high_res_max_points.setter
+    def high_res_max_points(self, value):
+        self._high_res_max_points = int(value)
+
+    @property
+    def high_res_range(self):
+        """ (min, max) x-axis range (e.g. visible plot range) to evaluate the high-resolution
+        best-fit curve of subsequent fit results in. None to use the full x-axis span.
+        """
+        return self._high_res_range
+
+    @high_res_range.setter
+    def high_res_range(self, value):
+        self._high_res_range = None if value is None else (min(value), max(value))
+
+    @QtCore.Slot(str, object, object)
+    def fit_data(self, fit_config, x, data, weights=None):
+        """ Fits the data with the given fit configuration and stores the result as last_fit.
+        The access lock is only held to read the fit configuration and to publish the result, so
+        last_fit stays accessible while the fit is running.
+
+        The returned fit result has an additional attribute "high_res_best_fit" holding a lazily
+        evaluated high-resolution best-fit curve (see HighResBestFit).
+
+        If warm_start is enabled and the last fit was performed with the same (unchanged) fit
+        configuration on the same x-axis, the fit parameters are initialized with the best values
+        of the last fit result instead of running the estimator. If the warm-started fit fails or
+        its reduced chi-square exceeds warm_start_tolerance times the one of the last fit result,
+        the fit is repeated starting from the estimator.
+
+        The fit minimizes the objective set by the "objective" property. Optional per-point
+        weights multiply the residuals, e.g. 1/sigma for data with known uncertainties sigma.
+
+        @param str fit_config: name of the fit configuration to use ("No Fit" to clear last_fit)
+        @param numpy.ndarray x: 1D array of x values
+        @param numpy.ndarray data: 1D array of data values to fit
+        @param numpy.ndarray weights: optional, 1D array of residual weights (same size as data)
+
+        @return (str, lmfit.model.ModelResult): name of fit configuration used and fit result
+        """
+        return self._run_fit(fit_config, x, data, weights)
+
+    def fit_data_async(self, fit_config, x, data, weights=None, *, supersede=True):
+        """ Non-blocking version of fit_data. The fit is performed in a background worker thread
+        (one per FitContainer) and published as last_fit (emitting sigLastFitResultChanged) once
+        finished. x, data and weights must not be altered until the returned Future is done.
+
+        If <supersede> is True, all pending or running fits previously started by this method are
+        cancelled (see cancel_async_fits), e.g. if new data arrives before the last fit finished.
+        Cancelled fits do not alter last_fit.
+
+        @param str fit_config: name of the fit configuration to use ("No Fit" to clear last_fit)
+        @param numpy.ndarray x: 1D array of x values
+        @param numpy.ndarray data: 1D array of data values to fit
+        @param numpy.ndarray weights: optional, 1D array of residual weights (same size as data)
+        @param bool supersede: optional, cancel all previously started asynchronous fits
+
+        @return concurrent.futures.Future: Future object holding the return value of fit_data.
+                                           Raises concurrent.futures.CancelledError if the fit
+                                           has been cancelled.
+        """
+        if supersede:
+            self.cancel_async_fits()
+        abort_event = threading.Event()
+        with self._async_lock:
+            if self._async_executor is None:
+                self._async_executor = ThreadPoolExecutor(max_workers=1,
+                                                          thread_name_prefix='fit-container')
+            future = self._async_executor.submit(self._run_fit,
+                                                 fit_config,
+                                                 x,
+                                                 data,
+                                                 weights,
+                                                 abort_event)
+            self._async_jobs = [job for job in self._async_jobs if not job[0].done()]
+            self._async_jobs.append((future, abort_event))
+        return future
+
+    def cancel_async_fits(self):
+        """ Cancels all pending asynchronous fits started by fit_data_async. Running fits are
+        aborted upon the next iteration of the minimizer and their results are discarded.
+        """
+        with self._async_lock:
+            jobs = self._async_jobs
+            self._async_jobs = list()
+        for future, abort_event in jobs:
+            abort_event.set()
+            future.cancel()
+
+    def shutdown_async_fits(self, wait=True):
+        """ Cancels all asynchronous fits and stops the background worker thread (if running).
+        Subsequent calls to fit_data_async will start a new worker thread.
+
+        @param bool wait: optional, wait for the worker thread to finish
+        """
+        self.cancel_async_fits()
+        with self._async_lock:
+            executor = self._async_executor
+            self._async_executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _run_fit(self, fit_config, x, data, weights=None, abort_event=None):
+        """ Performs a fit (see fit_data) and publishes the result as last_fit. Holds the access
+        lock only while reading the fit settings and while publishing the result.
+
+        @param threading.Event abort_event: optional, event to abort the fit and discard the result
+
+        @return (str, lmfit.model.ModelResult): name of fit configuration used and fit result
+        """
+        if not fit_config:
             return '', None
+        # Handle "No Fit" case
+        if fit_config == 'No Fit':
+            result = None
+            warm_start_state = None
+        else:
+            with self._access_lock:
+                config = self._configuration_model.get_configuration_by_name(fit_config)
+                estimator = config.estimator
+                config_key, model, custom_parameters = self._get_cached_model(config)
+                warm_start_result = self._get_warm_start_result(fit_config, config_key, x)
+                high_res_settings = {'oversampling': self._high_res_oversampling,
+                                     'max_points': self._high_res_max_points,
+                                     'x_range': self._high_res_range}
+                tolerance = self._warm_start_tolerance
+                fit_kwargs = {'x': x, 'weights': weights, 'objective': self._objective}
+            if abort_event is None:
+                iter_cb = None
+            else:
+                # lmfit aborts the minimization if the iteration callback returns True
+                def iter_cb(*args, **kwargs):
+                    return abort_event.is_set()
+            fit_kwargs['iter_cb'] = iter_cb
+
+            result = None
+            if warm_start_result is not None:
+                result = self._fit_warm_start(model, warm_start_result, tolerance, data, fit_kwargs)
+            if result is None and not (abort_event is not None and abort_event.is_set()):
+                parameters = _get_fit_parameters(model, estimator, custom_parameters, data, x)
+                result = model.fit(data, parameters, **fit_kwargs)
+                result.warm_start = False
+            if abort_event is not None and abort_event.is_set():
+                raise CancelledError(f'Fit with configuration "{fit_config}" has been cancelled.')
+            warm_start_state = (config_key, np.array(x, copy=True))
+            # Mutate lmfit.ModelResult object to include high-resolution result curve.
+            # Evaluated upon first access only.
+            result.high_res_best_fit = HighResBestFit(model,
+                                                      result.best_values,
+                                                      x,
+                                                      **high_res_settings)
+
+        with self._access_lock:
+            if abort_event is not None and abort_event.is_set():
+                raise CancelledError(f'Fit with configuration "{fit_config}" has been cancelled.')
+            self._last_fit_result = result
+            self._last_fit_config = fit_config
+            self._warm_start_state = warm_start_state
+        self.sigLastFitResultChanged.emit(fit_config, result)
+        return fit_config, result
+
+    @QtCore.Slot()
+    def _clear_model_cache(self):
+        with self._access_lock:
+            # Invalidates the model caches of all threads
+            self._model_cache_generation += 1
+
+    @staticmethod
+    def _configuration_key(config):
+        """ Cheap key to detect changes of a fit configuration. Replacing the custom parameters of
+        a FitConfiguration always stores a new Parameters object, so identity comparison suffices.
+        """
+        return config, config.model, config.estimator, config._custom_parameters
+
+    @staticmethod
+    def _is_same_configuration(key_a, key_b):
+        return all(a is b for a, b in zip(key_a, key_b))
+
+    def _get_cached_model(self, config):
+        """ Returns the fit model instance and custom parameters for a fit configuration. Both are
+        cached per configuration name and calling thread and rebuilt if the configuration has
+        changed. Fit model instances are never shared between threads, since lmfit models are not
+        thread-safe.
+        Must be called while holding the access lock.
+
+        @return (tuple, FitModelBase, lmfit.Parameters): configuration key, fit model instance and
+                                                         custom parameters (can be None)
+        """
+        config_key = self._configuration_key(config)
+        cache = getattr(self._model_cache, 'models', None)
+        if cache is None or self._model_cache.generation != self._model_cache_generation:
+            cache = self._model_cache.models = dict()
+            self._model_cache.generation = self._model_cache_generation
+        try:
+            cached_key, model, custom_parameters = cache[config.name]
+        except KeyError:
+            pass
+        else:
+            if self._is_same_configuration(cached_key, config_key):
+                return cached_key, model, custom_parameters
+        model = _fit_models[config.model]()
+        # Private copy. Parameters are deep-copied by lmfit upon each fit and never altered.
+        custom_parameters = config.custom_parameters
+        cache[config.name] = (config_key, model, custom_parameters)
+        return config_key, model, custom_parameters
+
+    def _get_warm_start_result(self, fit_config, config_key, x):
+        """ Returns the last fit result to seed the next fit with if warm-starting is enabled and
+        applicable, i.e. fit configuration and x-axis are unchanged since the last fit.
+        Must be called while holding the access lock.
+
+        @return lmfit.model.ModelResult: last fit result or None if warm-start is not applicable
+        """
+        last_result = self._last_fit_result
+        if not self._warm_start or last_result is None or self._warm_start_state is None:
+            return None
+        last_config_key, last_x = self._warm_start_state
+        if fit_config != self._last_fit_config or \
+                not self._is_same_configuration(config_key, last_config_key):
+            return None
+        if last_x.shape != np.shape(x) or not np.array_equal(last_x, x):
+            return None
+        return last_result
+
+    @staticmethod
+    def _fit_warm_start(model, last_result, tolerance, data, fit_kwargs):
+        """ Performs a fit seeded by the best values of the last fit result.
+
+        @param dict fit_kwargs: keyword arguments passed on to FitModelBase.fit (incl. x)
+
+        @return lmfit.model.ModelResult: fit result or None if the fit result is not acceptable
+        """
+        try:
+            result = model.fit(data, last_result.params.copy(), **fit_kwargs)
+        except Exception:
+            _log.debug('Warm-started fit failed. Falling back to estimator.', exc_info=True)
+            return None
+        # Quality check. Reject diverged warm fits and compare goodness of fit with last result.
+        if not result.success or not np.isfinite(result.redchi):
+            return None
+        if np.isfinite(last_result.redchi) and result.redchi > tolerance * last_result.redchi:
+            return None
+        result.warm_start = True
+        return result
+
+    def fit_data_batch(self, fit_config, x, data, *, max_workers=None):
+        """ Fits each row of a 2D data array (e.g. a stack of spectra) sharing the same x-axis with
+        the given fit configuration. The rows are fitted in parallel by a pool of worker processes
+        that is kept alive for subsequent calls (see shutdown_batch_workers). The fit configuration
+        is sent only once per worker process and call.
+        Does not alter last_fit and does not emit sigLastFitResultChanged.
+
+        Rows that can not be fitted are marked with success=False and NaN values.
+        The fits minimize the objective set by the "objective" property.
+
+        @param str fit_config: name of the fit configuration to use
+        @param numpy.ndarray x: 1D array of x values shared by all data rows
+        @param numpy.ndarray data: 2D array with one data set to fit per row
+        @param int max_workers: optional, number of worker processes (default: number of CPUs).
+                                Set to 0 to fit all rows sequentially in the calling thread.
+
+        @return numpy.ndarray: structured array with one element per data row containing the fields
+                               "success", "redchi" and for each fit parameter <name> the fields
+                               <name> (best value) and <name>_stderr
+        """
+        x = np.asarray(x)
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[1] != x.size:
+            raise ValueError(f'data must be 2D array with one data set of size {x.size:d} (same '
+                             f'as x) per row. Got data array of shape {data.shape} instead.')
+        config = self._configuration_model.get_configuration_by_name(fit_config)
+        config_dict = config.to_dict()
+        objective = self._objective
+        parameter_names = tuple(_fit_models[config.model]().make_params())
+        result_dtype = [('success', bool), ('redchi', float)]
+        for name in parameter_names:
+            result_dtype.extend(((name, float), (f'{name}_stderr', float)))
+        results = np.empty(data.shape[0], dtype=result_dtype)
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max(0, int(max_workers)), data.shape[0])
+        if max_workers < 2:
+            row_results = _fit_batch_rows(config_dict, parameter_names, x, data, objective)
+        else:
+            executor = self._get_batch_executor(max_workers)
+            futures = [executor.submit(_fit_batch_rows,
+                                       config_dict,
+                                       parameter_names,
+                                       x,
+                                       chunk,
+                                       objective) for chunk in np.array_split(data, max_workers)]
+            row_results = [res for future in futures for res in future.result()]
+
+        for ii, (success, redchi, values, stderrs) in enumerate(row_results):
+            results[ii]['success'] = success
+            results[ii]['redchi'] = redchi
+            for name, value, stderr in zip(parameter_names, values, stderrs):
+                results[ii][name] = value
+                results[ii][f'{name}_stderr'] = stderr
+        return results
+
+    def fit_data_map(self, fit_config, x, data, *, max_workers=None, seed_neighbours=True,
+                     progress_callback=None):
+        """ Fits the spectrum of each pixel of a 2D measurement map (e.g. an ODMR map) sharing the
+        same x-axis with the given fit configuration. The data is copied once into shared memory
+        and the map rows are fitted in blocks by the worker process pool of fit_data_batch.
+        Does not alter last_fit and does not emit sigLastFitResultChanged.
+
+        If <seed_neighbours> is True, the pixels of each block of rows are fitted in snake order and
+        each fit is seeded with the result of the preceding (neighbouring) pixel instead of running
+        the estimator. Seeded fits are accepted according to warm_start_tolerance (see fit_data).
+        Pixels that can not be fitted are marked with success=False and NaN values.
+        The fits minimize the objective set by the "objective" property.
+
+        @param str fit_config: name of the fit configuration to use
+        @param numpy.ndarray x: 1D array of x values shared by all pixels
+        @param numpy.ndarray data: 3D array of shape (ny, nx, npoints) with one spectrum per pixel
+        @param int max_workers: optional, number of worker processes (default: number of CPUs).
+                                Set to 0 to fit all pixels sequentially in the calling thread.
+        @param bool seed_neighbours: optional, seed fits with the result of a neighbouring pixel
+        @param callable progress_callback: optional, called in the calling thread with the number
+                                           of fitted pixels and the total number of pixels
+                                           whenever a block of rows has been fitted
+
+        @return numpy.ndarray: structured array of shape (ny, nx) containing the fields "success",
+                               "redchi", "warm_start" (fit seeded by neighbour) and for each fit
+                               parameter <name> the fields <name> (best value map) and
+                               <name>_stderr
+        """
+        x = np.asarray(x)
+        data = np.asarray(data, dtype=float)
+        if data.ndim != 3 or data.shape[2] != x.size:
+            raise ValueError(f'data must be 3D array of shape (ny, nx, {x.size:d}) with one '
+                             f'spectrum of size {x.size:d} (same as x) per pixel. Got data array '
+                             f'of shape {data.shape} instead.')
+        config = self._configuration_model.get_configuration_by_name(fit_config)
+        config_dict = config.to_dict()
+        objective = self._objective
+        tolerance = self._warm_start_tolerance
+        parameter_names = tuple(_fit_models[config.model]().make_params())
+        result_dtype = [('success', bool), ('redchi', float), ('warm_start', bool)]
+        for name in parameter_names:
+            result_dtype.extend(((name, float), (f'{name}_stderr', float)))
+        results = np.empty(data.shape[:2], dtype=result_dtype)
+        total_pixels = results.size
+        fitted_pixels = 0
+
+        def report_progress(pixels):
+            nonlocal fitted_pixels
+            fitted_pixels += pixels
+            if progress_callback is not None:
+                progress_callback(fitted_pixels, total_pixels)
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max(0, int(max_workers)), data.shape[0])
+        if max_workers < 2:
+            row_results = _fit_map_rows(config_dict,
+                                        parameter_names,
+                                        x,
+                                        data,
+                                        range(data.shape[0]),
+                                        objective,
+                                        tolerance,
+                                        seed_neighbours,
+                                        report_progress)
+        else:
+            # Few blocks of adjacent rows per worker for load balancing and progress reporting
+            blocks = np.array_split(np.arange(data.shape[0]),
+                                    min(data.shape[0], 4 * max_workers))
+            shared_memory = SharedMemory(create=True, size=max(1, data.nbytes))
+            try:
+                shared_data = np.ndarray(data.shape, dtype=data.dtype, buffer=shared_memory.buf)
+                shared_data[...] = data
+                del shared_data
+                data_spec = (shared_memory.name, data.shape, data.dtype.str)
+                executor = self._get_batch_executor(max_workers)
+                futures = [executor.submit(_fit_map_rows,
+                                           config_dict,
+                                           parameter_names,
+                                           x,
+                                           data_spec,
+                                           block.tolist(),
+                                           objective,
+                                           tolerance,
+                                           seed_neighbours) for block in blocks]
+                row_results = list()
+                try:
+                    for future in as_completed(futures):
+                        block_results = future.result()
+                        row_results.extend(block_results)
+                        report_progress(len(block_results) * data.shape[1])
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+            finally:
+                shared_memory.close()
+                shared_memory.unlink()
+
+        for row, pixel_results in row_results:
+            for column, (success, redchi, warm_start, values, stderrs) in enumerate(pixel_results):
+                pixel = results[row, column]
+                pixel['success'] = success
+                pixel['redchi'] = redchi
+                pixel['warm_start'] = warm_start
+                for name, value, stderr in zip(parameter_names, values, stderrs):
+                    pixel[name] = value
+                    pixel[f'{name}_stderr'] = stderr
+        return results
+
+    def shutdown_batch_workers(self, wait=True):
+        """ Shut down the worker process pool used by fit_data_batch and fit_data_map (if running).
+
+        @param bool wait: optional, wait for running batch fits to finish
+        """
+        with self._batch_lock:
+            executor = self._batch_executor
+            self._batch_executor = None
+            self._batch_workers = 0
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_batch_executor(self, max_workers):
+        with self._batch_lock:
+            if self._batch_executor is not None and self._batch_workers < max_workers:
+                self._batch_executor.shutdown(wait=False)
+                self._batch_executor = None
+            if self._batch_executor is None:
+                # Do not fork the qudi process (Qt, threads). Always spawn fresh interpreters.
+                self._batch_executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._batch_workers = max_workers
+            return self._batch_executor
 
     @staticmethod
     def formatted_result(fit_result: Union[None, lmfit.model.ModelResult],
@@ -376,3 +1066,207 @@ class FitContainer(QtCore.QObject):
             export_dict[key] = dict_i
 
         return export_dict
+
+
+class FitTracker:
+    """ Recursive tracking of fit parameters (e.g. drifting resonance centers) across a series of
+    consecutive data sets fitted with the same fit configuration of a FitContainer.
+
+    The first data set (and any data set the tracked state can not describe anymore) is fitted by
+    FitContainer.fit_data including the estimator. All subsequent data sets only update the tracked
+    state by an (iterated) extended Kalman filter step: the varying fit parameters follow a random
+    walk with given process noise and each data set is a measurement linearized by the model
+    Jacobian (see FitModelBase.eval_jacobian). Each update costs a few model evaluations, i.e.
+    O(points), instead of a full fit.
+
+    The noise variance of the data is taken from the reduced chi-square of the last full fit. If
+    the reduced chi-square after an update exceeds refit_tolerance times this value, the update is
+    discarded and the data set is fitted from scratch.
+    """
+
+    def __init__(self, fit_container, fit_config, process_noise=None, refit_tolerance=2.,
+                 iterations=2):
+        """
+        @param FitContainer fit_container: fit container to perform the full fits with
+        @param str fit_config: name of the fit configuration to use
+        @param dict process_noise: optional, standard deviation of the change of a fit parameter
+                                   between two consecutive data sets (parameter names as keys).
+                                   Defaults to the standard error of each parameter from the last
+                                   full fit.
+        @param float refit_tolerance: optional, maximum allowed ratio of reduced chi-square after an
+                                      update and of the last full fit before refitting
+        @param int iterations: optional, number of Gauss-Newton iterations per update
+        """
+        if not fit_config or fit_config == 'No Fit':
+            raise ValueError('FitTracker requires a valid fit configuration name.')
+        self._lock = Mutex()
+        self._fit_container = fit_container
+        self._fit_config = fit_config
+        self._process_noise = dict() if process_noise is None else dict(process_noise)
+        self._refit_tolerance = float(refit_tolerance)
+        self._iterations = max(1, int(iterations))
+        self._model = None
+        self._parameters = None
+        self._tracked_names = tuple()
+        self._state = None
+        self._covariance = None
+        self._process_covariance = None
+        self._noise_variance = None
+        self._last_redchi = np.nan
+        self._trajectory = list()  # (refit, redchi, values, stderrs) per update
+
+    @property
+    def fit_config(self):
+        return self._fit_config
+
+    @property
+    def tracked_parameters(self):
+        """ Names of the tracked (varying) fit parameters.
+        """
+        return self._tracked_names
+
+    @property
+    def current_values(self):
+        """ Dict with the current values of all fit parameters (empty if not initialized).
+        """
+        with self._lock:
+            if self._parameters is None:
+                return dict()
+            return self._parameters.valuesdict()
+
+    @property
+    def current_covariance(self):
+        """ Covariance matrix of the tracked parameters (see tracked_parameters) or None.
+        """
+        with self._lock:
+            return None if self._covariance is None else self._covariance.copy()
+
+    @property
+    def trajectory(self):
+        """ Structured array with one element per update containing the fields "refit" (full fit
+        performed), "redchi" and for each fit parameter <name> the fields <name> (value) and
+        <name>_stderr.
+        """
+        with self._lock:
+            if self._parameters is None:
+                return np.empty(0, dtype=[('refit', bool), ('redchi', float)])
+            names = tuple(self._parameters)
+            result_dtype = [('refit', bool), ('redchi', float)]
+            for name in names:
+                result_dtype.extend(((name, float), (f'{name}_stderr', float)))
+            trajectory = np.empty(len(self._trajectory), dtype=result_dtype)
+            for ii, (refit, redchi, values, stderrs) in enumerate(self._trajectory):
+                trajectory[ii]['refit'] = refit
+                trajectory[ii]['redchi'] = redchi
+                for name, value, stderr in zip(names, values, stderrs):
+                    trajectory[ii][name] = value
+                    trajectory[ii][f'{name}_stderr'] = stderr
+            return trajectory
+
+    def reset(self):
+        """ Discards the tracked state and trajectory. The next update performs a full fit.
+        """
+        with self._lock:
+            self._parameters = None
+            self._state = None
+            self._covariance = None
+            self._trajectory = list()
+
+    def update(self, x, data, weights=None):
+        """ Updates the tracked fit parameters with a new data set.
+
+        @param numpy.ndarray x: 1D array of x values
+        @param numpy.ndarray data: 1D array of data values
+        @param numpy.ndarray weights: optional, 1D array of residual weights (same size as data)
+
+        @return dict: current values of all fit parameters
+        """
+        x = np.asarray(x)
+        data = np.asarray(data, dtype=float)
+        with self._lock:
+            refit = self._state is None or not self._update_state(x, data, weights)
+            if refit:
+                self._refit(x, data, weights)
+            stderrs = np.sqrt(np.diag(self._covariance))
+            self._trajectory.append((
+                refit,
+                self._last_redchi,
+                tuple(param.value for param in self._parameters.values()),
+                tuple(stderrs[self._tracked_names.index(name)] if name in self._tracked_names else
+                      np.nan for name in self._parameters)
+            ))
+            return self._parameters.valuesdict()
+
+    def _refit(self, x, data, weights):
+        """ Performs a full fit via FitContainer and (re-)initializes the tracked state.
+        """
+        _, result = self._fit_container.fit_data(self._fit_config, x, data, weights)
+        self._model = result.model
+        self._parameters = result.params.copy()
+        self._tracked_names = tuple(name for name, param in self._parameters.items() if
+                                    param.vary and not param.expr)
+        self._state = np.array([self._parameters[name].value for name in self._tracked_names])
+        covariance = result.covar
+        if covariance is None or np.shape(covariance) != (self._state.size, self._state.size):
+            # No covariance estimate available. Assume 10% uncertainty.
+            covariance = np.diag(np.square(np.maximum(np.abs(self._state) * 0.1,
+                                                      np.finfo(float).eps)))
+        self._covariance = np.array(covariance, dtype=float)
+        stderrs = np.sqrt(np.diag(self._covariance))
+        self._process_covariance = np.diag(np.square(
+            [self._process_noise.get(name, stderr) for name, stderr in
+             zip(self._tracked_names, stderrs)]
+        ))
+        self._noise_variance = result.redchi if np.isfinite(result.redchi) and result.redchi > 0 \
+            else 1.
+        self._last_redchi = result.redchi
+
+    def _update_state(self, x, data, weights):
+        """ Performs an iterated extended Kalman filter update of the tracked state.
+
+        @return bool: update successful (False if a full fit is required)
+        """
+        prior_state = self._state
+        prior_information = np.linalg.inv(self._covariance + self._process_covariance)
+        state = prior_state.copy()
+        flat_data = np.ravel(data)
+        flat_weights = None if weights is None else np.ravel(weights)
+        try:
+            for _ in range(self._iterations):
+                residual, jacobian = self._linearize(x, state, flat_data, flat_weights)
+                information = prior_information + (jacobian.T @ jacobian) / self._noise_variance
+                gradient = (jacobian.T @ residual) / self._noise_variance - \
+                    prior_information @ (state - prior_state)
+                state = state + np.linalg.solve(information, gradient)
+                # Apply parameter bounds
+                for ii, name in enumerate(self._tracked_names):
+                    self._parameters[name].value = state[ii]
+                    state[ii] = self._parameters[name].value
+            residual, _ = self._linearize(x, state, flat_data, flat_weights, jacobian=False)
+            covariance = np.linalg.inv(information)
+        except (np.linalg.LinAlgError, ValueError, ZeroDivisionError):
+            return False
+        redchi = np.dot(residual, residual) / max(1, residual.size - state.size)
+        if not np.all(np.isfinite(state)) or not np.isfinite(redchi) or \
+                redchi > self._refit_tolerance * self._noise_variance:
+            return False
+        self._state = state
+        self._covariance = covariance
+        self._last_redchi = redchi
+        return True
+
+    def _linearize(self, x, state, data, weights, jacobian=True):
+        """ Weighted residual (data - model) and its negative derivative (i.e. the model Jacobian)
+        with respect to the tracked parameters at the given state.
+        """
+        for name, value in zip(self._tracked_names, state):
+            self._parameters[name].value = value
+        residual = data - np.ravel(self._model.eval(self._parameters, x=x))
+        if weights is not None:
+            residual *= weights
+        if not jacobian:
+            return residual, None
+        model_jacobian = self._model.eval_jacobian(self._parameters, self._tracked_names, x=x)
+        if weights is not None:
+            model_jacobian = model_jacobian * weights[:, None]
+        return residual, model_jacobian
@@ -22,26 +22,62 @@ If not, see <https://www.gnu.org/licenses/>.
 
 __all__ = ('get_timestamp_filename', 'format_column_headers', 'format_header',
            'metadata_to_str_dict', 'str_dict_to_metadata', 'get_header_from_file',
-           'get_info_from_header', 'CsvDataStorage', 'create_dir_for_file', 'DataStorageBase',
-           'ImageFormat', 'NpyDataStorage', 'TextDataStorage')
+           'get_info_from_header', 'get_metadata_from_file', 'get_metadata_from_files',
+           'CsvDataStorage', 'create_dir_for_file', 'DataStorageBase',
+           'DataStreamBase', 'Hdf5DataStorage', 'Hdf5DataStream', 'ImageFormat', 'NpyDataStorage',
+           'TextDataStorage', 'TextDataStream', 'ThumbnailRenderer')
 
 import os
 import re
+import ast
 import copy
+import time
+import queue
+import pickle
+import struct
+import logging
+import weakref
+import threading
+import multiprocessing
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 
 from enum import Enum
 from datetime import datetime
 from abc import ABCMeta, abstractmethod
-from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import FigureCanvasPdf
 from configparser import ConfigParser
 from io import StringIO
+from itertools import islice
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from PySide2 import QtCore
+try:
+    import h5py
+except ImportError:
+    h5py = None
 
 from qudi.util.mutex import Mutex
 from qudi.util.helpers import is_string_type, is_integer_type, is_float_type, is_complex_type
 from qudi.util.helpers import is_string, is_integer, is_float, is_complex, is_number
 
+_log = logging.getLogger(__name__)
+
+_END_HEADER_MARKER = '---- END HEADER ----'
+# Last characters of str values that can be a plain int or float literal (excludes "inf", "nan")
+_numeric_literal_end_chars = frozenset('0123456789.')
+# Canonical (signed) Python int and float literals that evaluate exactly like int() and float().
+# Integers with leading zeros (e.g. "0777") are no valid literals and must not be matched.
+_digit_part = r'[0-9](?:_?[0-9])*'
+_point_float = rf'(?:{_digit_part})?\.{_digit_part}|{_digit_part}\.'
+_int_literal_regex = re.compile(r'[+-]?(?:[1-9](?:_?[0-9])*|0(?:_?0)*)')
+_float_literal_regex = re.compile(
+    rf'[+-]?(?:(?:{_digit_part}|{_point_float})[eE][+-]?{_digit_part}|{_point_float})'
+)
+
 
 class ImageFormat(Enum):
     """ Image format to use for saving data thumbnails.
@@ -88,6 +124,15 @@ def metadata_to_str_dict(metadata):
 def str_dict_to_metadata(str_dict):
     metadata = dict()
     for param, value in str_dict.items():
+        # Fast path for plain int and float literals (by far the most common metadata values).
+        # Yields the same result as eval for all matched literals.
+        if value and value[-1] in _numeric_literal_end_chars:
+            if _int_literal_regex.fullmatch(value):
+                metadata[param] = int(value)
+                continue
+            if _float_literal_regex.fullmatch(value):
+                metadata[param] = float(value)
+                continue
         try:
             metadata[param] = eval(value)
         except:
@@ -162,6 +207,31 @@ def _is_1d_array(array):
         raise ValueError('Checking if empty array is 1D is not allowed.')
 
 
+def _iter_formatted_row_chunks(data, row_fmt_str, chunk_size):
+    """ Helper generator to format 2D array data in chunks of rows. Each chunk is formatted with a
+    single call to str.format by repeating the row format string for each row in the chunk. This
+    yields the exact same text as formatting each row individually but avoids the Python-level
+    overhead per row.
+
+    @param numpy.ndarray|list data: 2D data array, 1D structured array (one record per row) or
+                                    list of equally sized row sequences
+    @param str row_fmt_str: new-style format string for a single row (including line separator)
+    @param int chunk_size: maximum number of rows to format at once
+
+    @return generator: Generator yielding tuples of formatted text chunk and number of rows in chunk
+    """
+    is_flat_array = isinstance(data, np.ndarray) and data.dtype.names is None
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        if is_flat_array:
+            values = chunk.ravel().tolist()
+        else:
+            if isinstance(chunk, np.ndarray):
+                chunk = chunk.tolist()
+            values = [val for row in chunk for val in row]
+        yield (row_fmt_str * len(chunk)).format(*values), len(chunk)
+
+
 def format_header(timestamp, number_format=None, metadata=None, notes=None, column_dtypes=None,
                   column_headers=None, comments=None, delimiter=None):
     """
@@ -216,43 +286,153 @@ def format_header(timestamp, number_format=None, metadata=None, notes=None, colu
     return f'{comments}{line_sep.join(header_lines)}\n'
 
 
-def get_header_from_file(file_path):
-    offset = 0
+def _read_header_lines(file):
+    """ Helper to read all header lines from an opened text file object up to (and including) the
+    "---- END HEADER ----" marker line. After this call the file position is located at the first
+    line following the header.
+
+    @param file: Opened text file object positioned at the beginning of the file
+
+    @return (str, int): Header string without comments specifiers, number of header lines
+    """
+    header_lines = list()
     comments = None
-    with open(file_path, 'r') as file:
-        for line in file:
-            # Determine comments specifier (if there is any)
-            if line.endswith('---- END HEADER ----\n'):
-                comments = line.rsplit('---- END HEADER ----', 1)[0]
-                break
-            offset += len(line)
-        file.seek(0)
-        if comments is None:
-            raise RuntimeError(
-                'Qudi data file is missing "---- END HEADER ----" marker. File was probably not '
-                'created by the same qudi.util.datastorage.<storage class> helper object'
-            )
-        header_lines = file.read(offset).splitlines()
+    for line in iter(file.readline, ''):
+        # Determine comments specifier (if there is any)
+        if line.endswith('---- END HEADER ----\n'):
+            comments = line.rsplit('---- END HEADER ----', 1)[0]
+            break
+        header_lines.append(line.rstrip('\r\n'))
+    if comments is None:
+        raise RuntimeError(
+            'Qudi data file is missing "---- END HEADER ----" marker. File was probably not '
+            'created by the same qudi.util.datastorage.<storage class> helper object'
+        )
     line_start = len(comments)
     return '\n'.join(line[line_start:] for line in header_lines), len(header_lines)
 
 
+def _read_npy_array_header(file):
+    """ Helper to read the array shape and dtype from the header of an opened binary .npy file
+    object without reading the array data itself.
+
+    Supports .npy format versions 1.0, 2.0 and 3.0 (utf-8 encoded header, written by numpy e.g. for
+    structured arrays with non-latin1 field names).
+
+    @param file: Opened binary .npy file object positioned at the beginning of the file
+
+    @return (tuple, numpy.dtype): array shape, array dtype
+    """
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        shape, _, dtype = np.lib.format.read_array_header_1_0(file)
+    elif version == (2, 0):
+        shape, _, dtype = np.lib.format.read_array_header_2_0(file)
+    elif version == (3, 0):
+        # Same layout as version 2.0 but with utf-8 instead of latin1 encoded header
+        header_length = struct.unpack('<I', file.read(4))[0]
+        header = ast.literal_eval(file.read(header_length).decode('utf-8'))
+        if not isinstance(header, dict) or not {'shape', 'descr'}.issubset(header):
+            raise ValueError(f'Invalid .npy file header: {header!r}')
+        shape = tuple(header['shape'])
+        dtype = np.lib.format.descr_to_dtype(header['descr'])
+    else:
+        raise ValueError(f'Unsupported .npy file format version {version[0]:d}.{version[1]:d}')
+    return shape, dtype
+
+
+def _split_header_text(text):
+    """ Helper to extract the header from a text starting with a qudi data file header and
+    containing the "---- END HEADER ----" marker line. Comment specifiers are removed.
+
+    @param str text: Text containing the entire file header
+
+    @return (str, int): Header string without comments specifiers, number of header lines
+    """
+    marker_index = text.find(_END_HEADER_MARKER)
+    if marker_index < 0:
+        raise RuntimeError(
+            'Qudi data file is missing "---- END HEADER ----" marker. File was probably not '
+            'created by the same qudi.util.datastorage.<storage class> helper object'
+        )
+    line_start = text.rfind('\n', 0, marker_index) + 1
+    comments_length = marker_index - line_start
+    header_lines = text[:line_start].splitlines()
+    return '\n'.join(line[comments_length:] for line in header_lines), len(header_lines)
+
+
+def get_header_from_file(file_path, block_size=8192):
+    """ Reads only the header of a qudi data text file. The file is read in blocks until the
+    "---- END HEADER ----" marker is found, so the data section is (mostly) never read.
+
+    @param str file_path: path to qudi data text file to read the header from
+    @param int block_size: optional, number of characters to read at once
+
+    @return (str, int): Header string without comments specifiers, number of header lines
+    """
+    with open(file_path, 'r') as file:
+        text = file.read(block_size)
+        search_start = 0
+        while text.find(_END_HEADER_MARKER, search_start) < 0:
+            block = file.read(block_size)
+            if not block:
+                break
+            search_start = max(0, len(text) - len(_END_HEADER_MARKER))
+            text += block
+    return _split_header_text(text)
+
+
+def _parse_header_sections(header):
+    """ Fast parser for headers created by format_header (single-line "key=value" options).
+    Returns the same section dicts as ConfigParser would (option names in lower case) or None if
+    the header uses any other INI syntax, in which case ConfigParser must be used.
+
+    @param str header: Header string without comments specifiers
+
+    @return dict: Section names as keys and dicts of option name-value pairs as values (or None)
+    """
+    sections = dict()
+    current = None
+    for line in header.splitlines():
+        if not line:
+            continue
+        if line[0].isspace():
+            # Multi-line value continuation or indented line
+            return None
+        if line[0] == '[' and line[-1] == ']':
+            name = line[1:-1]
+            if not name or name in sections or name == 'DEFAULT':
+                return None
+            current = sections[name] = dict()
+            continue
+        option, sep, value = line.partition('=')
+        option = option.strip().lower()
+        if current is None or not sep or not option or option in current:
+            return None
+        current[option] = value.strip()
+    return sections
+
+
 def get_info_from_header(header):
     """
 
     """
-    # Parse header sections
-    config = ConfigParser(comment_prefixes=None, delimiters=('=',))
-    config.read_string(header)
+    # Parse header sections. Use ConfigParser only if the fast parser can not handle the header.
+    sections = _parse_header_sections(header)
+    if sections is None:
+        config = ConfigParser(comment_prefixes=None, delimiters=('=',))
+        config.read_string(header)
+        sections = {name: dict(config.items(name, raw=True)) for name in config.sections()}
 
     # extract and convert general section
-    general = {'timestamp': config.get('General', 'timestamp', raw=True, fallback=None),
-               'comments': config.get('General', 'comments', raw=True, fallback=None),
-               'delimiter': config.get('General', 'delimiter', raw=True, fallback=None),
-               'number_format': config.get('General', 'number_format', raw=True, fallback=None),
-               'column_dtypes': config.get('General', 'column_dtypes', raw=True, fallback=None),
-               'column_headers': config.get('General', 'column_headers', raw=True, fallback=None),
-               'notes': config.get('General', 'notes', raw=True, fallback=None)}
+    general_section = sections.get('General', dict())
+    general = {key: general_section.get(key, None) for key in ('timestamp',
+                                                               'comments',
+                                                               'delimiter',
+                                                               'number_format',
+                                                               'column_dtypes',
+                                                               'column_headers',
+                                                               'notes')}
     if general['timestamp']:
         general['timestamp'] = datetime.fromisoformat(general['timestamp'])
     if general['column_dtypes']:
@@ -273,14 +453,58 @@ def get_info_from_header(header):
         general['column_headers'] = tuple(eval(general['column_headers']).split(';;'))
 
     # extract metadata
-    if config.has_section('Metadata'):
-        metadata_str_dict = dict(config.items('Metadata', raw=True))
-        metadata = str_dict_to_metadata(metadata_str_dict)
+    if 'Metadata' in sections:
+        metadata = str_dict_to_metadata(sections['Metadata'])
     else:
         metadata = dict()
     return general, metadata
 
 
+def get_metadata_from_file(file_path):
+    """ Reads only the metadata and general header info of a single qudi data file without loading
+    the data. The storage format is determined by the file extension (".npy" for NpyDataStorage,
+    ".h5"/".hdf5" for Hdf5DataStorage and text file header for everything else).
+
+    @param str file_path: path to qudi data file
+
+    @return dict, dict: user metadata, general header data
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.npy':
+        return NpyDataStorage.load_metadata(file_path)
+    if extension in ('.h5', '.hdf5'):
+        return Hdf5DataStorage.load_metadata(file_path)
+    header, _ = get_header_from_file(file_path)
+    general, metadata = get_info_from_header(header)
+    return metadata, general
+
+
+def get_metadata_from_files(file_paths, *, max_workers=None, raise_errors=False):
+    """ Reads only the metadata and general header info of many qudi data files concurrently in a
+    thread pool (see get_metadata_from_file).
+
+    @param iterable file_paths: paths of qudi data files
+    @param int max_workers: optional, number of threads to read file headers with
+    @param bool raise_errors: optional, raise the first error encountered instead of returning
+                              None for files that can not be read (default: False)
+
+    @return dict: file paths as keys and (user metadata, general header data) tuples as values
+    """
+    file_paths = list(file_paths)
+
+    def read_metadata(file_path):
+        try:
+            return get_metadata_from_file(file_path)
+        except Exception:
+            if raise_errors:
+                raise
+            _log.debug(f'Unable to read qudi data file header from "{file_path}"', exc_info=True)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(file_paths, executor.map(read_metadata, file_paths)))
+
+
 def create_dir_for_file(file_path):
     """ Helper method to create the directory (recursively) for a given file path.
     Will NOT raise an error if the directory already exists.
@@ -290,6 +514,413 @@ def create_dir_for_file(file_path):
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
 
+def _get_text_load_dtype(general):
+    """ Helper to determine the numpy dtype specifier to load text data with from the general
+    header section. Returns None if the dtype should be determined automatically.
+    """
+    dtype = general['column_dtypes']
+    if dtype is not None and not isinstance(dtype, type):
+        # If dtypes differ, construct a structured array
+        if all(dtype[0] == typ for typ in dtype):
+            dtype = dtype[0]
+        elif str in dtype:
+            # handle str type separately since this is (arguably) a bug in numpy.genfromtxt
+            dtype = None
+        else:
+            dtype = [(f'f{col:d}', typ) for col, typ in enumerate(dtype)]
+    return dtype
+
+
+def _parse_text_data(source, dtype, comments, delimiter):
+    """ Helper to parse text data from an opened text file object or a sequence of text lines.
+    Uses the fast numpy.loadtxt parser if all column dtypes are known to be int or float. Falls back
+    to the slower but more flexible numpy.genfromtxt otherwise or if numpy.loadtxt fails.
+    """
+    if dtype in (int, float) or (isinstance(dtype, list) and
+                                 all(typ in (int, float) for _, typ in dtype)):
+        offset = source.tell() if hasattr(source, 'tell') else None
+        try:
+            return np.loadtxt(source, dtype=dtype, comments=comments, delimiter=delimiter)
+        except ValueError:
+            if offset is not None:
+                source.seek(offset)
+    return np.genfromtxt(source, dtype=dtype, comments=comments, delimiter=delimiter)
+
+
+def _iter_text_data_chunks(file, chunk_size, dtype, comments, delimiter):
+    """ Helper generator to lazily parse text data from an opened text file object in chunks of
+    <chunk_size> rows. Closes the file after the last chunk has been parsed.
+
+    All chunks have the same number of dimensions regardless of the number of rows they contain:
+    (rows, columns) for files with multiple columns and (rows,) for single column files or
+    structured arrays (mixed column dtypes).
+    """
+    number_of_columns = None
+    with file:
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                break
+            data = _parse_text_data(lines, dtype, comments, delimiter)
+            if data.dtype.names is not None:
+                yield data.reshape(-1)
+                continue
+            if number_of_columns is None:
+                number_of_columns = _count_text_columns(lines, comments, delimiter)
+            yield data.reshape(-1, number_of_columns) if number_of_columns > 1 else data.reshape(-1)
+
+
+def _count_text_columns(lines, comments, delimiter):
+    """ Helper to determine the number of columns from the first data line of text lines.
+    """
+    for line in lines:
+        if comments:
+            line = line.split(comments.strip() or comments, 1)[0]
+        line = line.strip()
+        if line:
+            return len(line.split(delimiter))
+    return 1
+
+
+def _load_text_data(file_path, chunk_size=None, skip_column_headers=False):
+    """ Helper to load data and header info from a qudi text data file. The header is parsed once
+    and the data is read from the same file handle directly after the header.
+    For more information see: TextDataStorage.load_data
+    """
+    file = open(file_path, 'r')
+    try:
+        header, _ = _read_header_lines(file)
+        general, metadata = get_info_from_header(header)
+        # Skip uncommented column headers line if present (e.g. csv files)
+        if skip_column_headers and general['column_headers']:
+            file.readline()
+        dtype = _get_text_load_dtype(general)
+        if chunk_size is not None and int(chunk_size) < 1:
+            raise ValueError(f'chunk_size must be integer >= 1. Got {chunk_size} instead.')
+        if chunk_size is None:
+            with file:
+                data = _parse_text_data(file, dtype, general['comments'], general['delimiter'])
+        else:
+            data = _iter_text_data_chunks(file,
+                                          int(chunk_size),
+                                          dtype,
+                                          general['comments'],
+                                          general['delimiter'])
+    except:
+        file.close()
+        raise
+    return data, metadata, general
+
+
+class _AsyncSaveWorker(QtCore.QThread):
+    """ Writer thread consuming a bounded queue of save jobs. Each job is a tuple of a
+    concurrent.futures.Future object, the callable to run and its positional and keyword arguments.
+    A None job causes the thread to finish after all previously queued jobs have been processed.
+    """
+
+    _thread_count = 0
+
+    def __init__(self, max_queue_size, **kwargs):
+        super().__init__(**kwargs)
+        # Thread names must be unique for ThreadManager
+        _AsyncSaveWorker._thread_count += 1
+        self.setObjectName(f'data-storage-async-save-{_AsyncSaveWorker._thread_count:d}')
+        self.queue = queue.Queue(maxsize=max(0, int(max_queue_size)))
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    break
+                future, func, args, kwargs = job
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(*args, **kwargs))
+                    except BaseException as err:
+                        future.set_exception(err)
+            finally:
+                self.queue.task_done()
+
+
+class _ThreadRegistrar(QtCore.QObject):
+    """ Registers threads with the qudi ThreadManager from any thread. The ThreadManager is a Qt
+    item model and must only be altered from the thread it lives in (usually the main thread), so
+    this object lives in the same thread and registration requests are queued via a signal.
+    """
+
+    _sigRegisterThread = QtCore.Signal(object)
+
+    def __init__(self, thread_manager, **kwargs):
+        super().__init__(**kwargs)
+        self._thread_manager = weakref.ref(thread_manager)
+        self.moveToThread(thread_manager.thread())
+        self._sigRegisterThread.connect(self._register_thread, QtCore.Qt.QueuedConnection)
+
+    @property
+    def thread_manager(self):
+        return self._thread_manager()
+
+    def register_thread(self, thread):
+        """ Register a QThread with the ThreadManager. Returns immediately if called from another
+        thread than the one the ThreadManager lives in.
+
+        @param QtCore.QThread thread: thread to register with unique objectName
+        """
+        if QtCore.QThread.currentThread() == self.thread():
+            self._register_thread(thread)
+        else:
+            self._sigRegisterThread.emit(thread)
+
+    @QtCore.Slot(object)
+    def _register_thread(self, thread):
+        thread_manager = self._thread_manager()
+        if thread_manager is None:
+            return
+        thread_manager.register_thread(thread)
+        # Thread might have finished before the queued registration has been processed
+        if thread.isFinished():
+            thread_manager.unregister_thread(thread.objectName())
+
+
+def _render_figure(mpl_figure, file_path, image_format):
+    """ Renders a matplotlib figure to file in the given image format using a non-interactive
+    canvas (Agg or PDF). Does not use pyplot or the (possibly interactive) canvas the figure has
+    been created with, so this is safe to call from any thread as long as the figure is not used
+    anywhere else. Figures created via pyplot must be closed beforehand in the thread that created
+    them (see _save_figure).
+
+    @param matplotlib.figure.Figure mpl_figure: The matplotlib figure object to save as image
+    @param str file_path: full file path to use without file extension
+    @param ImageFormat image_format: image file format to save
+
+    @return str: Full absolute path of the saved image
+    """
+    file_path += image_format.value
+
+    if image_format is ImageFormat.PDF:
+        canvas = FigureCanvasPdf(mpl_figure)
+    elif image_format is ImageFormat.PNG:
+        canvas = FigureCanvasAgg(mpl_figure)
+    else:
+        raise RuntimeError(f'Unknown image format selected: "{image_format}"')
+    canvas.print_figure(file_path, bbox_inches='tight', pad_inches=0.05)
+    return file_path
+
+
+def _save_figure(mpl_figure, file_path, image_format):
+    """ Closes a matplotlib figure and renders it to file in the given image format.
+    Must be called from the thread that created the figure since pyplot is not thread-safe.
+
+    @param matplotlib.figure.Figure mpl_figure: The matplotlib figure object to save as image
+    @param str file_path: full file path to use without file extension
+    @param ImageFormat image_format: image file format to save
+
+    @return str: Full absolute path of the saved image
+    """
+    # Close matplotlib figure first, rendering replaces the canvas the figure is registered with
+    plt.close(mpl_figure)
+    return _render_figure(mpl_figure, file_path, image_format)
+
+
+def _save_image_figure(image, file_path, image_format, extent=None, cmap=None, xlabel=None,
+                       ylabel=None, title=None, colorbar_label=None):
+    """ Creates a matplotlib figure from a raw 2D image array and renders it to file.
+    The figure is created without pyplot, so this is safe to call from any thread or process.
+
+    @return str: Full absolute path of the saved image
+    """
+    figure = Figure()
+    axes = figure.add_subplot()
+    image_item = axes.imshow(image,
+                             origin='lower',
+                             aspect='auto',
+                             interpolation='nearest',
+                             extent=extent,
+                             cmap=cmap)
+    if xlabel is not None:
+        axes.set_xlabel(xlabel)
+    if ylabel is not None:
+        axes.set_ylabel(ylabel)
+    if title is not None:
+        axes.set_title(title)
+    colorbar = figure.colorbar(image_item, ax=axes)
+    if colorbar_label is not None:
+        colorbar.set_label(colorbar_label)
+    return _render_figure(figure, file_path, image_format)
+
+
+def _save_pickled_figure(figure_bytes, file_path, image_format):
+    """ Thumbnail worker process function to unpickle a matplotlib figure and render it to file.
+    """
+    return _render_figure(pickle.loads(figure_bytes), file_path, image_format)
+
+
+def _init_thumbnail_worker():
+    """ Thumbnail worker process initializer. Selects the non-interactive Agg backend.
+    """
+    matplotlib.use('Agg')
+
+
+class ThumbnailRenderer:
+    """ Renders matplotlib figures (or figures created from raw 2D image arrays) to image files in
+    a pool of worker processes. This way CPU intensive rendering (e.g. PDF output of dense scan
+    images) neither blocks the calling thread nor the GIL of the qudi main process.
+
+    The worker process pool is started lazily with the first render call. If max_workers is 0 or
+    the process pool can not be used (e.g. the figure can not be pickled or the pool is broken),
+    rendering falls back to being executed synchronously in the calling thread.
+    Each render call returns a concurrent.futures.Future holding the full path of the saved image.
+    """
+
+    def __init__(self, max_workers=None, max_pending=32):
+        """
+        @param int max_workers: optional, number of worker processes (default: number of CPUs).
+                                Set to 0 in order to always render in-process.
+        @param int max_pending: optional, maximum number of render jobs pending in the pool before
+                                further render calls block. Values <= 0 mean unlimited.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self._max_workers = max(0, int(max_workers))
+        self._max_pending = int(max_pending)
+        self._pending_semaphore = None if self._max_pending <= 0 else threading.BoundedSemaphore(
+            self._max_pending
+        )
+        self._lock = Mutex()
+        self._executor = None
+        self._pending = set()
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def render_figure(self, mpl_figure, file_path, image_format=ImageFormat.PDF, *, block=True,
+                      timeout=None):
+        """ Render a matplotlib figure to file. The figure is pickled and closed in the calling
+        thread before it is sent to a worker process and can be reused/altered right away.
+
+        @param matplotlib.figure.Figure mpl_figure: The matplotlib figure object to save as image
+        @param str file_path: full file path to use without file extension
+        @param ImageFormat image_format: optional, image file format to save
+        @param bool block: optional, wait for a free slot if max_pending jobs are queued already
+        @param float timeout: optional, maximum time in seconds to wait for a free slot
+
+        @return concurrent.futures.Future: Future object holding the full path of the saved image
+        """
+        if self._max_workers > 0:
+            try:
+                figure_bytes = pickle.dumps(mpl_figure)
+            except Exception:
+                _log.warning('Unable to pickle matplotlib figure for rendering in worker process. '
+                             'Falling back to in-process rendering.')
+            else:
+                plt.close(mpl_figure)
+                return self._submit(_save_pickled_figure,
+                                    (figure_bytes, file_path, image_format),
+                                    block,
+                                    timeout)
+        return self._run_in_process(_save_figure, (mpl_figure, file_path, image_format))
+
+    def render_image(self, image, file_path, image_format=ImageFormat.PDF, *, extent=None,
+                     cmap=None, xlabel=None, ylabel=None, title=None, colorbar_label=None,
+                     block=True, timeout=None):
+        """ Create a figure from a raw 2D image array (using imshow with colorbar) and render it to
+        file. Figure creation happens entirely inside the worker process.
+
+        @param numpy.ndarray image: 2D image array to plot
+        @param str file_path: full file path to use without file extension
+        @param ImageFormat image_format: optional, image file format to save
+        @param tuple extent: optional, image extent (left, right, bottom, top) in data coordinates
+        @param str cmap: optional, name of matplotlib colormap to use
+        @param str xlabel: optional, x-axis label
+        @param str ylabel: optional, y-axis label
+        @param str title: optional, figure title
+        @param str colorbar_label: optional, colorbar label
+        @param bool block: optional, wait for a free slot if max_pending jobs are queued already
+        @param float timeout: optional, maximum time in seconds to wait for a free slot
+
+        @return concurrent.futures.Future: Future object holding the full path of the saved image
+        """
+        args = (np.array(image), file_path, image_format, extent, cmap, xlabel, ylabel, title,
+                colorbar_label)
+        if self._max_workers > 0:
+            return self._submit(_save_image_figure, args, block, timeout)
+        return self._run_in_process(_save_image_figure, args)
+
+    def wait(self, timeout=None):
+        """ Wait for all pending render jobs to finish.
+
+        @param float timeout: optional, maximum time in seconds to wait
+
+        @return bool: True if all jobs have been processed, False if timeout has been reached
+        """
+        with self._lock:
+            pending = self._pending.copy()
+        return not wait_futures(pending, timeout=timeout).not_done
+
+    def shutdown(self, wait=True):
+        """ Shut down the worker process pool. A new pool is started upon the next render call.
+
+        @param bool wait: optional, wait for all pending render jobs to finish
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Do not fork the qudi process (Qt, threads). Always spawn fresh interpreters.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_thumbnail_worker
+                )
+            return self._executor
+
+    def _submit(self, func, args, block, timeout):
+        if self._pending_semaphore is not None:
+            if not self._pending_semaphore.acquire(blocking=block, timeout=timeout):
+                raise queue.Full('Maximum number of pending thumbnail render jobs reached')
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            if self._pending_semaphore is not None:
+                self._pending_semaphore.release()
+            _log.exception('Unable to submit thumbnail render job to worker process pool. '
+                           'Falling back to in-process rendering:')
+            self.shutdown(wait=False)
+            return self._run_in_process(func, args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        if self._pending_semaphore is not None:
+            self._pending_semaphore.release()
+
+    @staticmethod
+    def _run_in_process(func, args):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(func(*args))
+        except BaseException as err:
+            future.set_exception(err)
+        return future
+
+
 class DataStorageBase(metaclass=ABCMeta):
     """ Base helper class to store/load (measurement)data to/from disk.
     Subclasses handle saving and loading of measurement data (including metadata) for specific file
@@ -305,6 +936,17 @@ class DataStorageBase(metaclass=ABCMeta):
     _global_metadata = dict()
     _global_metadata_lock = Mutex()
 
+    # Shared writer thread for asynchronous saving (see save_data_async)
+    _async_save_worker = None
+    _async_save_lock = Mutex()
+    _async_save_queue_size = 32
+    # Registers the writer thread with the qudi ThreadManager from the main thread
+    _thread_registrar = None
+    # Shared worker process pool for thumbnail rendering (see set_thumbnail_workers)
+    _thumbnail_renderer = None
+    # Data catalog to register saved data sets with (see set_data_catalog)
+    _data_catalog = None
+
     def __init__(self, *, root_dir=None, include_global_metadata=True,
                  image_format=ImageFormat.PDF):
         """
@@ -329,19 +971,182 @@ class DataStorageBase(metaclass=ABCMeta):
 
         @return str: Full absolute path of the saved image
         """
-        file_path += self.image_format.value
+        return _save_figure(mpl_figure, file_path, self.image_format)
 
-        if self.image_format is ImageFormat.PDF:
-            with PdfPages(file_path) as pdf:
-                pdf.savefig(mpl_figure, bbox_inches='tight', pad_inches=0.05)
-        elif self.image_format is ImageFormat.PNG:
-            mpl_figure.savefig(file_path, bbox_inches='tight', pad_inches=0.05)
-        else:
-            raise RuntimeError(f'Unknown image format selected: "{self.image_format}"')
+    def save_data_async(self, data, *, block=True, timeout=None, **kwargs):
+        """ Queue a call to save_data to be executed in a dedicated background writer thread that is
+        shared by all storage instances. Returns immediately with a Future object holding the
+        return value of save_data once it has been executed.
+        If the save queue is full, this method will block until a free slot is available
+        (backpressure) or raise queue.Full if <block> is False or <timeout> is exceeded.
+
+        Numpy data arrays are copied before queueing. Any other mutable objects passed (e.g.
+        metadata) must not be altered until the returned Future is done.
+
+        @param numpy.ndarray data: data array to be saved
+        @param bool block: optional, wait for a free slot in the save queue if it is full
+        @param float timeout: optional, maximum time in seconds to wait for a free slot
+        @param kwargs: keyword arguments to pass to save_data
+
+        @return concurrent.futures.Future: Future object holding the return value of save_data
+        """
+        if isinstance(data, np.ndarray):
+            data = data.copy()
+        return self._submit_async(self.save_data, (data,), kwargs, block, timeout)
+
+    def save_thumbnail_async(self, mpl_figure, file_path, *, block=True, timeout=None):
+        """ Queue a call to save_thumbnail to be executed in the background writer thread.
+        See save_data_async for more information.
+
+        If thumbnail worker processes have been configured (see set_thumbnail_workers), the figure
+        is rendered in a separate worker process instead. In that case the figure is pickled
+        immediately.
 
-        # close matplotlib figure and return
+        The figure is closed in the calling thread before queueing, since pyplot is not
+        thread-safe. The background thread renders the figure with a non-interactive canvas (Agg or
+        PDF) without using pyplot. The matplotlib figure must not be altered after calling this
+        method.
+
+        @return concurrent.futures.Future: Future object holding the return value of save_thumbnail
+        """
+        with self._async_save_lock:
+            renderer = DataStorageBase._thumbnail_renderer
+        if renderer is not None:
+            return renderer.render_figure(mpl_figure,
+                                          file_path,
+                                          self.image_format,
+                                          block=block,
+                                          timeout=timeout)
         plt.close(mpl_figure)
-        return file_path
+        return self._submit_async(_render_figure,
+                                  (mpl_figure, file_path, self.image_format),
+                                  dict(),
+                                  block,
+                                  timeout)
+
+    @classmethod
+    def _submit_async(cls, func, args, kwargs, block, timeout):
+        future = Future()
+        with cls._async_save_lock:
+            if DataStorageBase._async_save_worker is None:
+                worker = _AsyncSaveWorker(DataStorageBase._async_save_queue_size)
+                try:
+                    from qudi.core.threadmanager import ThreadManager
+                    thread_manager = ThreadManager.instance()
+                except ImportError:
+                    thread_manager = None
+                if thread_manager is not None:
+                    # The calling thread might not run an event loop to deliver queued signals of
+                    # the QThread object (e.g. "finished" to unregister the thread)
+                    worker.moveToThread(thread_manager.thread())
+                worker.start()
+                if thread_manager is not None:
+                    registrar = DataStorageBase._thread_registrar
+                    if registrar is None or registrar.thread_manager is not thread_manager:
+                        registrar = _ThreadRegistrar(thread_manager)
+                        DataStorageBase._thread_registrar = registrar
+                    registrar.register_thread(worker)
+                DataStorageBase._async_save_worker = worker
+            save_queue = DataStorageBase._async_save_worker.queue
+        save_queue.put((future, func, args, kwargs), block=block, timeout=timeout)
+        return future
+
+    @classmethod
+    def drain_async_saves(cls, timeout=None):
+        """ Wait for all queued asynchronous save jobs to finish and stop the background writer
+        thread. Subsequent asynchronous saves will start a new writer thread.
+        Called by qudi upon shutdown.
+
+        @param float timeout: optional, maximum time in seconds to wait for the writer thread
+
+        @return bool: True if all jobs have been processed, False if timeout has been reached
+        """
+        with cls._async_save_lock:
+            worker = DataStorageBase._async_save_worker
+            DataStorageBase._async_save_worker = None
+            renderer = DataStorageBase._thumbnail_renderer
+        if renderer is None:
+            success = True
+        else:
+            start = time.monotonic()
+            success = renderer.wait(timeout)
+            renderer.shutdown(wait=success)
+            if timeout is not None:
+                timeout = max(0, timeout - (time.monotonic() - start))
+        if worker is None:
+            return success
+        worker.queue.put(None)
+        if timeout is None:
+            return worker.wait() and success
+        return worker.wait(max(0, int(timeout * 1000))) and success
+
+    @classmethod
+    def set_async_save_queue_size(cls, size):
+        """ Set the maximum number of pending asynchronous save jobs. Takes effect for the next
+        writer thread started (i.e. after drain_async_saves or before the first asynchronous save).
+
+        @param int size: maximum number of pending save jobs. Values <= 0 mean unlimited.
+        """
+        with cls._async_save_lock:
+            DataStorageBase._async_save_queue_size = int(size)
+
+    @classmethod
+    def set_thumbnail_workers(cls, max_workers, max_pending=32):
+        """ Configure the number of worker processes shared by all storage instances to render
+        thumbnails in save_thumbnail_async. Setting max_workers to 0 (default) disables worker
+        processes and thumbnails are rendered in the background writer thread instead.
+        Pending render jobs of a previously configured worker pool are finished before it is
+        shut down.
+
+        @param int max_workers: number of worker processes (None for number of CPUs, 0 to disable)
+        @param int max_pending: optional, maximum number of pending render jobs (<= 0: unlimited)
+        """
+        if max_workers is None or max_workers > 0:
+            renderer = ThumbnailRenderer(max_workers=max_workers, max_pending=max_pending)
+        else:
+            renderer = None
+        with cls._async_save_lock:
+            old_renderer = DataStorageBase._thumbnail_renderer
+            DataStorageBase._thumbnail_renderer = renderer
+        if old_renderer is not None:
+            old_renderer.shutdown(wait=True)
+
+    @classmethod
+    def set_data_catalog(cls, catalog):
+        """ Set a data catalog (see qudi.util.datacatalog.DataCatalog) shared by all storage
+        instances. Each data set saved via save_data is added to this catalog afterwards.
+
+        @param qudi.util.datacatalog.DataCatalog catalog: data catalog to use (None to disable)
+        """
+        with cls._global_metadata_lock:
+            DataStorageBase._data_catalog = catalog
+
+    @classmethod
+    def get_data_catalog(cls):
+        """ Returns the data catalog shared by all storage instances (None if not set).
+        """
+        with cls._global_metadata_lock:
+            return DataStorageBase._data_catalog
+
+    def _add_to_data_catalog(self, file_path, timestamp, shape, metadata=None, notes=None,
+                             nametag=None):
+        """ Helper method to add a saved data set to the shared data catalog (if set).
+        Should be called by subclasses at the end of save_data.
+        Errors are logged and do not affect saving the data.
+        """
+        catalog = self.get_data_catalog()
+        if catalog is None:
+            return
+        try:
+            catalog.add_file(file_path,
+                             timestamp=timestamp,
+                             nametag=nametag,
+                             metadata=self.get_unified_metadata(metadata),
+                             notes=notes,
+                             shape=shape,
+                             storage=type(self).__name__)
+        except Exception:
+            _log.exception(f'Unable to add data file "{file_path}" to data catalog:')
 
     def get_unified_metadata(self, local_metadata=None):
         """ Helper method to return a dict containing provided local_metadata as well as global
@@ -428,6 +1233,270 @@ class DataStorageBase(metaclass=ABCMeta):
                 cls._global_metadata.pop(name, None)
 
 
+class DataStreamBase(metaclass=ABCMeta):
+    """ Base class for streaming writers appending data to an existing data file repeatedly (e.g.
+    one row per acquisition tick). The file is opened once and kept open until the stream is
+    closed. Appended rows are buffered in memory and written to disk once the number of buffered
+    rows reaches <buffer_size> or the time since the last flush exceeds <flush_interval>. The flush
+    interval is checked upon each write and by a shared background thread, so buffered rows are
+    written to disk even if no more rows are written (e.g. after an acquisition has stopped).
+
+    Buffered rows are written to disk when calling flush or close and upon leaving the context if
+    used as context manager. Streams held by qudi modules (directly or via a data storage
+    attribute) are closed automatically upon module deactivation and all open streams are closed
+    upon qudi shutdown (see close_all).
+
+    Subclasses must open the file in _open_file and write the buffered data in _write_buffer.
+    """
+
+    # All open streams and the background thread flushing them periodically
+    _open_streams = weakref.WeakSet()
+    _flush_thread = None
+    _flush_thread_lock = threading.Lock()
+    # Maximum time in seconds between two checks of the flush interval by the background thread
+    _flush_check_interval = 0.1
+
+    def __init__(self, file_path, *, buffer_size=1000, flush_interval=1.):
+        """
+        @param str file_path: path of the existing data file to append to
+        @param int buffer_size: optional, maximum number of rows to buffer before writing to disk
+        @param float flush_interval: optional, maximum time in seconds buffered rows are kept in
+                                     memory before writing them to disk
+        """
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f'File to append data to not found: "{file_path}"')
+        if buffer_size < 1:
+            raise ValueError('buffer_size must be integer >= 1')
+
+        self._lock = Mutex()
+        self._file_path = file_path
+        self._buffer_size = int(buffer_size)
+        self._flush_interval = float(flush_interval)
+        self._buffer = list()
+        self._rows_buffered = 0
+        self._rows_written = 0
+        self._last_flush = time.monotonic()
+        self._file = self._open_file()
+        self._register(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, '_file', None) is None:
+            return
+        try:
+            self.close()
+        except Exception:
+            _log.exception(f'Failed to write buffered rows to "{self._file_path}" upon garbage '
+                           f'collection of {self.__class__.__name__}:')
+
+    @classmethod
+    def close_all(cls):
+        """ Flush and close all open streams. Called by qudi upon shutdown.
+        """
+        with DataStreamBase._flush_thread_lock:
+            streams = list(DataStreamBase._open_streams)
+        for stream in streams:
+            try:
+                stream.close()
+            except Exception:
+                _log.exception(f'Failed to close {stream.__class__.__name__} for '
+                               f'"{stream.file_path}":')
+
+    @staticmethod
+    def _register(stream):
+        with DataStreamBase._flush_thread_lock:
+            DataStreamBase._open_streams.add(stream)
+            if DataStreamBase._flush_thread is None:
+                DataStreamBase._flush_thread = threading.Thread(
+                    target=DataStreamBase._flush_loop,
+                    name='data-stream-flush',
+                    daemon=True
+                )
+                DataStreamBase._flush_thread.start()
+
+    @staticmethod
+    def _flush_loop():
+        """ Background thread writing buffered rows of all open streams to disk once their flush
+        interval is exceeded. Finishes if there are no open streams left.
+        """
+        while True:
+            time.sleep(DataStreamBase._flush_check_interval)
+            with DataStreamBase._flush_thread_lock:
+                streams = list(DataStreamBase._open_streams)
+                if not streams:
+                    DataStreamBase._flush_thread = None
+                    return
+            for stream in streams:
+                try:
+                    stream._flush_if_due()
+                except Exception:
+                    _log.exception(f'Failed to write buffered rows to "{stream.file_path}":')
+            # Do not keep streams alive while sleeping
+            streams = stream = None
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    @property
+    def rows_written(self):
+        """ Number of rows written to disk so far (excluding buffered rows).
+        """
+        with self._lock:
+            return self._rows_written
+
+    @property
+    def rows_buffered(self):
+        with self._lock:
+            return self._rows_buffered
+
+    @abstractmethod
+    def write(self, data):
+        """ Append single or multiple rows to the stream buffer. Will write to disk if the buffer
+        size or flush interval is exceeded.
+
+        @param numpy.ndarray data: data array to be appended
+
+        @return int: Number of rows appended
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """ Write all buffered rows to disk.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def close(self):
+        """ Write all buffered rows to disk and close the file. Does nothing if the stream is
+        already closed.
+        """
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._flush()
+                finally:
+                    self._file.close()
+                    self._file = None
+                    with DataStreamBase._flush_thread_lock:
+                        DataStreamBase._open_streams.discard(self)
+
+    @abstractmethod
+    def _open_file(self):
+        """ Open the file to append to. Called once upon stream creation.
+
+        @return object: opened file object providing "flush" and "close" methods
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _write_buffer(self, buffer):
+        """ Write the buffered items (as added via _add_to_buffer) to the opened file.
+
+        @param list buffer: buffered items to write
+        """
+        raise NotImplementedError
+
+    def _add_to_buffer(self, items, number_of_rows):
+        """ Add items to the buffer and write to disk if the buffer size or flush interval is
+        exceeded. Must be called with the stream lock acquired.
+        """
+        if self._file is None:
+            raise ValueError(f'I/O operation on closed {self.__class__.__name__}.')
+        self._buffer.extend(items)
+        self._rows_buffered += number_of_rows
+        if (self._rows_buffered >= self._buffer_size) or \
+                (time.monotonic() - self._last_flush >= self._flush_interval):
+            self._flush()
+
+    def _flush_if_due(self):
+        with self._lock:
+            if self._file is not None and self._buffer and \
+                    (time.monotonic() - self._last_flush >= self._flush_interval):
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._write_buffer(self._buffer)
+            self._rows_written += self._rows_buffered
+            self._buffer = list()
+            self._rows_buffered = 0
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+
+class TextDataStream(DataStreamBase):
+    """ Streaming writer to append data rows to an existing text data file created by
+    TextDataStorage.new_file. Should be created by calling TextDataStorage.open_stream.
+
+    In contrast to TextDataStorage.append_file the file handle is kept open and the row format
+    string is only constructed once (from the first row written). For buffering and flushing
+    behaviour see DataStreamBase.
+    """
+
+    def __init__(self, file_path, row_format_factory, *, buffer_size=1000, flush_interval=1.,
+                 chunk_size=2048):
+        """
+        @param str file_path: path of the existing data file to append to
+        @param callable row_format_factory: callable returning the row format string for a given
+                                            first data row
+        @param int buffer_size: optional, maximum number of rows to buffer before writing to disk
+        @param float flush_interval: optional, maximum time in seconds buffered rows are kept in
+                                     memory before writing them to disk
+        @param int chunk_size: optional, maximum number of rows to format at once
+        """
+        self._row_format_factory = row_format_factory
+        self._chunk_size = int(chunk_size)
+        self._row_fmt_str = None
+        self._number_of_columns = None
+        super().__init__(file_path, buffer_size=buffer_size, flush_interval=flush_interval)
+
+    def write(self, data):
+        """ Append single or multiple rows to the stream buffer. Will write to disk if the buffer
+        size or flush interval is exceeded.
+
+        @param numpy.ndarray data: data array to be appended (1D: single row, 2D: multiple rows)
+
+        @return int: Number of rows appended
+        """
+        try:
+            is_1d = _is_1d_array(data)
+        except ValueError:
+            # Data array is empty
+            return 0
+        rows = [data] if is_1d else data
+        if isinstance(rows, np.ndarray):
+            rows = rows.tolist()
+        with self._lock:
+            if self._file is None:
+                raise ValueError('I/O operation on closed TextDataStream.')
+            if self._row_fmt_str is None:
+                self._row_fmt_str = self._row_format_factory(rows[0])
+                self._number_of_columns = len(rows[0])
+            if any(len(row) != self._number_of_columns for row in rows):
+                raise ValueError(f'All data rows written to TextDataStream must have '
+                                 f'{self._number_of_columns:d} columns.')
+            self._add_to_buffer(rows, len(rows))
+        return len(rows)
+
+    def _open_file(self):
+        return open(self._file_path, 'a')
+
+    def _write_buffer(self, buffer):
+        for text, _ in _iter_formatted_row_chunks(buffer, self._row_fmt_str, self._chunk_size):
+            self._file.write(text)
+
+
 class TextDataStorage(DataStorageBase):
     """ Helper class to store (measurement)data on disk as text file.
     Data will always be saved in a tabular format with column headers. Single/Multiple rows are
@@ -440,6 +1509,8 @@ class TextDataStorage(DataStorageBase):
 
     # Default format specifiers for all dtypes
     _default_fmt_for_type = {int: 'd', float: '.15e', complex: 'r', str: 's'}
+    # Maximum number of rows to format and write at once when appending 2D numpy arrays
+    _bulk_write_chunk_size = 2048
 
     def __init__(self, *, root_dir, comments='# ', delimiter='\t', file_extension='.dat',
                  column_formats=None, **kwargs):
@@ -465,6 +1536,7 @@ class TextDataStorage(DataStorageBase):
         self.delimiter = delimiter
         self.comments = comments if isinstance(comments, str) else None
         self.column_formats = column_formats
+        self._streams = weakref.WeakSet()
 
     @property
     def file_extension(self):
@@ -542,6 +1614,27 @@ class TextDataStorage(DataStorageBase):
             file.write(header)
         return file_path, timestamp
 
+    def _get_row_format_str(self, first_row):
+        """ Construct the new-style format string for a single data row (including line separator).
+        Column formats are deduced from the first data row if no column_formats is configured.
+
+        @param iterable first_row: First data row to write
+
+        @return str: format string for a single data row
+        """
+        number_of_columns = len(first_row)
+        if not self.column_formats:
+            column_formats = [self._default_fmt_for_type[_value_to_dtype(val)] for val in first_row]
+        elif isinstance(self.column_formats, str):
+            column_formats = [self.column_formats] * number_of_columns
+        elif len(self.column_formats) != number_of_columns:
+            raise ValueError(
+                'column_formats sequence has not the same length as number of data columns.'
+            )
+        else:
+            column_formats = self.column_formats
+        return self.delimiter.join(f'{{:{fmt}}}' for fmt in column_formats) + '\n'
+
     def append_file(self, data, file_path):
         """ Append single or multiple rows to an existing data file.
 
@@ -561,20 +1654,9 @@ class TextDataStorage(DataStorageBase):
             # Data array is empty
             return
         # Construct row format specifier
-        # Deduce from first data row if no column_formats is configured
         first_row = data if is_1d else data[0]
         number_of_columns = len(first_row)
-        if not self.column_formats:
-            column_formats = [self._default_fmt_for_type[_value_to_dtype(val)] for val in first_row]
-        elif isinstance(self.column_formats, str):
-            column_formats = [self.column_formats] * number_of_columns
-        elif len(self.column_formats) != number_of_columns:
-            raise ValueError(
-                'column_formats sequence has not the same length as number of data columns.'
-            )
-        else:
-            column_formats = self.column_formats
-        row_fmt_str = self.delimiter.join(f'{{:{fmt}}}' for fmt in column_formats) + '\n'
+        row_fmt_str = self._get_row_format_str(first_row)
 
         # Append data to file
         with open(file_path, 'a') as file:
@@ -582,6 +1664,14 @@ class TextDataStorage(DataStorageBase):
             if is_1d:
                 file.write(row_fmt_str.format(*data))
                 rows_written = 1
+            elif isinstance(data, np.ndarray) and (data.ndim == 2 or data.dtype.names is not None):
+                # Bulk write numpy arrays in chunks of rows
+                rows_written = 0
+                for text, rows in _iter_formatted_row_chunks(data,
+                                                             row_fmt_str,
+                                                             self._bulk_write_chunk_size):
+                    file.write(text)
+                    rows_written += rows
             else:
                 rows_written = 0
                 for data_row in data:
@@ -589,6 +1679,39 @@ class TextDataStorage(DataStorageBase):
                     rows_written += 1
         return rows_written, number_of_columns
 
+    def open_stream(self, file_path, *, buffer_size=1000, flush_interval=1.):
+        """ Open a streaming writer to efficiently append single or multiple rows to an existing
+        data file repeatedly (e.g. one row per acquisition tick). The returned stream can be used as
+        context manager and must be closed after usage. See also: TextDataStream.
+
+        Usage example:
+            file_path, _ = storage.new_file(column_headers=('time (s)', 'counts (c/s)'))
+            with storage.open_stream(file_path) as stream:
+                stream.write(row)
+
+        @param str file_path: file path to append to
+        @param int buffer_size: optional, maximum number of rows to buffer before writing to disk
+        @param float flush_interval: optional, maximum time in seconds buffered rows are kept in
+                                     memory before writing them to disk
+
+        @return TextDataStream: Opened streaming writer for file_path
+        """
+        stream = TextDataStream(file_path,
+                                self._get_row_format_str,
+                                buffer_size=buffer_size,
+                                flush_interval=flush_interval,
+                                chunk_size=self._bulk_write_chunk_size)
+        self._streams.add(stream)
+        return stream
+
+    def close_streams(self):
+        """ Flush and close all streams opened by this storage instance via open_stream.
+        Called automatically upon deactivation of qudi modules holding this storage instance as
+        attribute.
+        """
+        for stream in list(self._streams):
+            stream.close()
+
     def save_data(self, data, *, timestamp=None, metadata=None, notes=None, nametag=None,
                   column_headers=None, column_dtypes=None, filename=None, use_timestamp=True):
         """ See: DataStorageBase.save_data() for more information
@@ -611,39 +1734,32 @@ class TextDataStorage(DataStorageBase):
                                              use_timestamp=use_timestamp)
         # Append data to file
         rows_columns = self.append_file(data, file_path=file_path)
+        self._add_to_data_catalog(file_path,
+                                  timestamp,
+                                  rows_columns,
+                                  metadata=metadata,
+                                  notes=notes,
+                                  nametag=nametag)
         return file_path, timestamp, rows_columns
 
     @staticmethod
-    def load_data(file_path):
+    def load_data(file_path, *, chunk_size=None):
         """ See: DataStorageBase.load_data()
 
+        If chunk_size is given, the returned data is a generator lazily yielding data arrays of up
+        to chunk_size rows each instead of a single data array. This allows processing of very large
+        files without loading the entire data into memory at once. The file is kept open until the
+        generator is exhausted or closed. Each chunk is a 2D array (rows, columns) or a 1D array for
+        single column files and structured arrays, even if it contains a single row only.
+
         @param str file_path: optional, path to file to load data from
+        @param int chunk_size: optional, number of rows (>= 1) to load per chunk for lazy loading
         """
-        # Read back metadata
         try:
-            header, header_lines = get_header_from_file(file_path)
-            general, metadata = get_info_from_header(header)
-            # Determine dtype specifier from general header section
-            dtype = general['column_dtypes']
-            if dtype is not None and not isinstance(dtype, type):
-                # If dtypes differ, construct a structured array
-                if all(dtype[0] == typ for typ in dtype):
-                    dtype = dtype[0]
-                elif str in dtype:
-                    # handle str type separately since this is (arguably) a bug in numpy.genfromtxt
-                    dtype = None
-                else:
-                    dtype = [(f'f{col:d}', typ) for col, typ in enumerate(dtype)]
-            # Load data from file
-            data = np.genfromtxt(file_path,
-                                 dtype=dtype,
-                                 comments=general['comments'],
-                                 delimiter=general['delimiter'],
-                                 skip_header=header_lines + 2)
+            return _load_text_data(file_path, chunk_size=chunk_size)
         except UnicodeError as err:
             raise ValueError(f'Loading data from file "{file_path}" failed. The file you are '
                              f'trying to load is most likely no unicode textfile.') from err
-        return data, metadata, general
 
 
 class CsvDataStorage(TextDataStorage):
@@ -686,43 +1802,36 @@ class CsvDataStorage(TextDataStorage):
         return header
 
     @staticmethod
-    def load_data(file_path):
-        """ See: DataStorageBase.load_data()
+    def load_data(file_path, *, chunk_size=None):
+        """ See: TextDataStorage.load_data()
 
         @param str file_path: optional, path to file to load data from
+        @param int chunk_size: optional, number of rows to load per chunk for lazy loading
         """
-        # Read back metadata
-        header, header_lines = get_header_from_file(file_path)
-        general, metadata = get_info_from_header(header)
-        # Determine dtype specifier from general header section
-        dtype = general['column_dtypes']
-        if dtype is not None and not isinstance(dtype, type):
-            # If dtypes differ, construct a structured array
-            if all(dtype[0] == typ for typ in dtype):
-                dtype = dtype[0]
-            elif str in dtype:
-                # handle str type separately since this is (arguably) a bug in numpy.genfromtxt
-                dtype = None
-            else:
-                dtype = [(f'f{col:d}', typ) for col, typ in enumerate(dtype)]
-        # Load data from file and skip header
-        start_line = header_lines + 2
-        if general['column_headers']:
-            start_line += 1
-        data = np.genfromtxt(file_path,
-                             dtype=dtype,
-                             comments=general['comments'],
-                             delimiter=general['delimiter'],
-                             skip_header=start_line)
-        return data, metadata, general
+        return _load_text_data(file_path, chunk_size=chunk_size, skip_column_headers=True)
 
 
 class NpyDataStorage(DataStorageBase):
     """ Helper class to store (measurement)data on disk as binary .npy file.
+
+    By default the header (notes, metadata, column headers) is saved alongside the .npy file in a
+    separate "_metadata.txt" text file. If the storage is created with embed_metadata=True, the
+    header text is instead appended directly after the array data in the .npy file itself. This
+    results in a single file per data set that can be read back with a single open. Since numpy
+    ignores any trailing bytes after the array data, these files remain valid .npy files that can
+    still be loaded (or memory-mapped) with numpy.load.
     """
 
-    def __init__(self, *, root_dir, **kwargs):
+    def __init__(self, *, root_dir, embed_metadata=False, **kwargs):
+        """
+        @param str root_dir: Root directory for this storage instance to save files into
+        @param bool embed_metadata: optional, flag indicating if the header should be embedded into
+                                    the .npy file instead of a separate text file (default: False)
+
+        @param kwargs: optional, for additional keyword arguments see DataStorageBase.__init__
+        """
         super().__init__(root_dir=root_dir, **kwargs)
+        self.embed_metadata = bool(embed_metadata)
 
     @property
     def file_extension(self):
@@ -745,6 +1854,8 @@ class NpyDataStorage(DataStorageBase):
         Also saves alongside a text file containing the notes, (global) metadata and column headers
         for this data set. The filename of the text file will be the same as for the binary file
         appended by "_metadata".
+        If this storage has been created with embed_metadata=True, the header is appended to the
+        binary file directly after the data array instead.
 
         For more information see: qudi.util.datastorage.DataStorageBase.save_data
 
@@ -756,8 +1867,6 @@ class NpyDataStorage(DataStorageBase):
         if filename is None:
             filename = get_timestamp_filename(timestamp=timestamp,
                                               nametag=nametag) + self.file_extension
-        # Create filename for separate metadata textfile
-        meta_filename = filename.rsplit('.', 1)[0] + '_metadata.txt'
 
         # Create header
         header = self.create_header(timestamp,
@@ -768,28 +1877,370 @@ class NpyDataStorage(DataStorageBase):
         # Determine full file path and create containing directories if needed
         file_path = os.path.join(self.root_dir, filename)
         create_dir_for_file(file_path)
-        meta_file_path = os.path.join(self.root_dir, meta_filename)
-        # Write data and metadata to file. Overwrite silently.
-        with open(file_path, 'wb') as file:
-            # Write numpy data array in binary format
-            np.save(file, data, allow_pickle=False, fix_imports=False)
-        with open(meta_file_path, 'w') as file:
-            file.write(header)
+        if self.embed_metadata:
+            # Write numpy data array in binary format followed by the header. Overwrite silently.
+            with open(file_path, 'wb') as file:
+                np.lib.format.write_array(file, data, allow_pickle=False)
+                file.write(header.encode('utf-8'))
+        else:
+            # Create filename for separate metadata textfile
+            meta_filename = filename.rsplit('.', 1)[0] + '_metadata.txt'
+            meta_file_path = os.path.join(self.root_dir, meta_filename)
+            # Write data and metadata to file. Overwrite silently.
+            with open(file_path, 'wb') as file:
+                # Write numpy data array in binary format
+                np.save(file, data, allow_pickle=False, fix_imports=False)
+            with open(meta_file_path, 'w') as file:
+                file.write(header)
+        self._add_to_data_catalog(file_path,
+                                  timestamp,
+                                  data.shape,
+                                  metadata=metadata,
+                                  notes=notes,
+                                  nametag=nametag)
         return file_path, timestamp, data.shape
 
     @staticmethod
-    def load_data(file_path):
+    def load_data(file_path, *, mmap_mode=None):
         """ See: DataStorageBase.load_data()
 
+        If mmap_mode is given, the data array is not read into memory but memory-mapped from disk
+        instead (see numpy.load). This allows fast access to slices of very large arrays without
+        loading (or copying) the entire array.
+        Files with embedded header (see embed_metadata) are read with a single file open if no
+        memory-mapping is requested.
+
         @param str file_path: path to file to load data from
+        @param str mmap_mode: optional, memory-map mode to use ('r', 'r+', 'c' or 'w+')
+        """
+        if mmap_mode is not None:
+            data = np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False, fix_imports=False)
+            metadata, general = NpyDataStorage.load_metadata(file_path)
+            return data, metadata, general
+        with open(file_path, 'rb') as file:
+            data = np.lib.format.read_array(file, allow_pickle=False)
+            header = file.read()
+        if header:
+            general, metadata = get_info_from_header(
+                _split_header_text(header.decode('utf-8'))[0]
+            )
+        else:
+            metadata, general = NpyDataStorage._load_metadata_file(file_path)
+        general['shape'] = data.shape
+        general['dtype'] = data.dtype
+        return data, metadata, general
+
+    @staticmethod
+    def load_metadata(file_path):
+        """ Load only the metadata and general header info for a saved data array without reading
+        the data array itself. Array shape and dtype are read from the .npy file header and included
+        in the general header info as "shape" and "dtype".
+
+        @param str file_path: path to .npy file to load metadata for
+
+        @return dict, dict: user metadata, general header data
+        """
+        with open(file_path, 'rb') as file:
+            shape, dtype = _read_npy_array_header(file)
+            # Skip array data and read embedded header (if any)
+            file.seek(int(np.prod(shape, dtype=np.int64)) * dtype.itemsize, os.SEEK_CUR)
+            header = file.read()
+        if header:
+            general, metadata = get_info_from_header(
+                _split_header_text(header.decode('utf-8'))[0]
+            )
+        else:
+            metadata, general = NpyDataStorage._load_metadata_file(file_path)
+        general['shape'] = shape
+        general['dtype'] = dtype
+        return metadata, general
+
+    @staticmethod
+    def _load_metadata_file(file_path):
+        """ Try to find and load metadata from the separate text file saved alongside a .npy file.
+
+        @param str file_path: path to .npy file to load separate metadata for
+
+        @return dict, dict: user metadata, general header data
         """
-        # Load numpy array
-        data = np.load(file_path, allow_pickle=False, fix_imports=False)
-        # Try to find and load metadata from text file
         metadata_path = file_path.split('.npy')[0] + '_metadata.txt'
         try:
-            header = get_header_from_file(metadata_path)
+            header, _ = get_header_from_file(metadata_path)
         except FileNotFoundError:
-            return data, dict(), dict()
-        metadata, general = get_info_from_header(header)
+            return dict(), dict()
+        general, metadata = get_info_from_header(header)
+        return metadata, general
+
+
+class Hdf5DataStorage(DataStorageBase):
+    """ Helper class to store (measurement)data on disk as binary HDF5 file (requires h5py).
+    Data is stored in a single chunked and resizable dataset that can be grown along the first axis
+    by appending data via append_file. Metadata is stored as native HDF5 attributes whenever
+    possible (scalars, strings and numpy arrays). All other values (e.g. sequences, dicts or None)
+    are stored as repr strings and reconstructed via eval (see also str_dict_to_metadata).
+
+    To create an (empty) file for appending data later on, just call save_data with an array of
+    length 0 along the first axis, e.g. numpy.empty((0, number_of_columns)).
+    """
+    _dataset_name = 'data'
+    _metadata_group = 'metadata'
+    _repr_metadata_group = 'metadata_repr'
+
+    def __init__(self, *, root_dir, file_extension='.h5', compression=None, compression_opts=None,
+                 chunk_rows=None, **kwargs):
+        """
+        @param str root_dir: Root directory for this storage instance to save files into
+        @param str file_extension: optional, file extension to use for HDF5 files
+        @param str compression: optional, HDF5 compression filter to use ('gzip', 'lzf', ...)
+        @param compression_opts: optional, options for the compression filter (e.g. gzip level)
+        @param int chunk_rows: optional, number of rows (along first axis) per HDF5 chunk.
+                               Chunk shape is determined automatically by h5py if omitted.
+
+        @param kwargs: optional, for additional keyword arguments see DataStorageBase.__init__
+        """
+        if h5py is None:
+            raise ImportError('Hdf5DataStorage requires the h5py package to be installed.')
+        super().__init__(root_dir=root_dir, **kwargs)
+        if not file_extension:
+            self.file_extension = ''
+        elif file_extension.startswith('.'):
+            self.file_extension = file_extension
+        else:
+            self.file_extension = '.' + file_extension
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chunk_rows = None if chunk_rows is None else max(1, int(chunk_rows))
+        # Streams opened via open_stream
+        self._streams = weakref.WeakSet()
+
+    def save_data(self, data, *, metadata=None, notes=None, nametag=None, timestamp=None,
+                  column_headers=None, filename=None):
+        """ Saves a HDF5 file containing the data array in a resizable dataset along with metadata,
+        notes and column headers as attributes.
+
+        For more information see: qudi.util.datastorage.DataStorageBase.save_data
+
+        @param str|list column_headers: optional, data column header strings or single string
+
+        @return (str, datetime.datetime, tuple): Full file path, timestamp used, saved data shape
+        """
+        data = np.asarray(data)
+        if data.ndim < 1:
+            raise ValueError('Hdf5DataStorage can only save data arrays with at least 1 dimension')
+        if timestamp is None:
+            timestamp = datetime.now()
+        # Construct file name if none is given explicitly
+        if filename is None:
+            filename = get_timestamp_filename(timestamp=timestamp,
+                                              nametag=nametag) + self.file_extension
+        # Determine full file path and create containing directories if needed
+        file_path = os.path.join(self.root_dir, filename)
+        create_dir_for_file(file_path)
+        if self.chunk_rows is None:
+            chunks = True
+        else:
+            chunks = (self.chunk_rows, *data.shape[1:])
+        # Gather all metadata (both global and locally provided) into a single dict
+        metadata = self.get_unified_metadata(metadata)
+        # Write data and metadata to file. Overwrite silently.
+        with h5py.File(file_path, 'w') as file:
+            dataset = file.create_dataset(self._dataset_name,
+                                          data=data,
+                                          maxshape=(None, *data.shape[1:]),
+                                          chunks=chunks,
+                                          compression=self.compression,
+                                          compression_opts=self.compression_opts)
+            dataset.attrs['timestamp'] = timestamp.isoformat()
+            if notes:
+                dataset.attrs['notes'] = notes
+            if column_headers:
+                dataset.attrs['column_headers'] = format_column_headers(column_headers)
+            native_group = file.create_group(self._metadata_group)
+            repr_group = file.create_group(self._repr_metadata_group)
+            for name, value in metadata.items():
+                if isinstance(value, (str, bool, int, float, complex, np.generic, np.ndarray)):
+                    try:
+                        native_group.attrs[name] = value
+                        continue
+                    except (TypeError, ValueError):
+                        pass
+                repr_group.attrs[name] = repr(value)
+        self._add_to_data_catalog(file_path,
+                                  timestamp,
+                                  data.shape,
+                                  metadata=metadata,
+                                  notes=notes,
+                                  nametag=nametag)
+        return file_path, timestamp, data.shape
+
+    def append_file(self, data, file_path):
+        """ Append data to the dataset of an existing HDF5 file (created by save_data) along the
+        first axis. The shape of data along all other axes must match the saved dataset.
+        1D data appended to a 2D dataset is treated as a single row.
+
+        Each call opens the file, resizes the dataset and closes the file again. This is costly
+        (several ms per call) if only few rows are appended at a time. Use open_stream to append
+        data repeatedly (e.g. one row per acquisition tick) instead.
+
+        @param numpy.ndarray data: data array to be appended
+        @param str file_path: file path to append to
+
+        @return tuple: New shape of the dataset
+        """
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f'File to append data to not found: "{file_path}"\n'
+                                    f'Create a new file to append to by calling "save_data".')
+        data = np.asarray(data)
+        with h5py.File(file_path, 'a') as file:
+            dataset = file[self._dataset_name]
+            if data.ndim == dataset.ndim - 1:
+                data = data[np.newaxis]
+            if data.shape[1:] != dataset.shape[1:]:
+                raise ValueError(f'Shape of data to append {data.shape} does not match saved '
+                                 f'dataset shape {dataset.shape} along axes other than the first.')
+            old_length = dataset.shape[0]
+            dataset.resize(old_length + data.shape[0], axis=0)
+            dataset[old_length:] = data
+            return dataset.shape
+
+    def open_stream(self, file_path, *, buffer_size=1000, flush_interval=1.):
+        """ Open a streaming writer to efficiently append data to the dataset of an existing HDF5
+        file repeatedly. The file is opened only once and the dataset is resized only once per
+        flush of the buffered data. The returned stream can be used as context manager and must be
+        closed after usage. See also: Hdf5DataStream.
+
+        Usage example:
+            file_path, _, _ = storage.save_data(numpy.empty((0, 2)))
+            with storage.open_stream(file_path) as stream:
+                stream.write(row)
+
+        @param str file_path: file path to append to
+        @param int buffer_size: optional, maximum number of rows to buffer before writing to disk
+        @param float flush_interval: optional, maximum time in seconds buffered rows are kept in
+                                     memory before writing them to disk
+
+        @return Hdf5DataStream: Opened streaming writer for file_path
+        """
+        stream = Hdf5DataStream(file_path,
+                                self._dataset_name,
+                                buffer_size=buffer_size,
+                                flush_interval=flush_interval)
+        self._streams.add(stream)
+        return stream
+
+    def close_streams(self):
+        """ Flush and close all streams opened by this storage instance via open_stream.
+        Called automatically upon deactivation of qudi modules holding this storage instance as
+        attribute.
+        """
+        for stream in list(self._streams):
+            stream.close()
+
+    @staticmethod
+    def load_data(file_path):
+        """ See: DataStorageBase.load_data()
+
+        @param str file_path: path to file to load data from
+        """
+        with h5py.File(file_path, 'r') as file:
+            data = file[Hdf5DataStorage._dataset_name][()]
+        metadata, general = Hdf5DataStorage.load_metadata(file_path)
         return data, metadata, general
+
+    @staticmethod
+    def load_metadata(file_path):
+        """ Load only the metadata and general header info for a saved data array without reading
+        the data array itself. Dataset shape and dtype are included in the general header info as
+        "shape" and "dtype".
+
+        @param str file_path: path to HDF5 file to load metadata for
+
+        @return dict, dict: user metadata, general header data
+        """
+        with h5py.File(file_path, 'r') as file:
+            dataset = file[Hdf5DataStorage._dataset_name]
+            attrs = dataset.attrs
+            general = {'timestamp': datetime.fromisoformat(attrs['timestamp']),
+                       'notes': attrs.get('notes', None),
+                       'column_headers': None,
+                       'shape': dataset.shape,
+                       'dtype': dataset.dtype}
+            if 'column_headers' in attrs:
+                general['column_headers'] = tuple(attrs['column_headers'].split(';;'))
+            metadata = {name: value.item() if isinstance(value, np.generic) else value for
+                        name, value in file[Hdf5DataStorage._metadata_group].attrs.items()}
+            metadata.update(str_dict_to_metadata(
+                dict(file[Hdf5DataStorage._repr_metadata_group].attrs.items())
+            ))
+        return metadata, general
+
+
+class Hdf5DataStream(DataStreamBase):
+    """ Streaming writer to append data to the dataset of an existing HDF5 file created by
+    Hdf5DataStorage.save_data. Should be created by calling Hdf5DataStorage.open_stream.
+
+    In contrast to Hdf5DataStorage.append_file the file is kept open and all buffered data is
+    written with a single resize of the dataset. For buffering and flushing behaviour see
+    DataStreamBase.
+    """
+
+    def __init__(self, file_path, dataset_name, *, buffer_size=1000, flush_interval=1.):
+        """
+        @param str file_path: path of the existing HDF5 file to append to
+        @param str dataset_name: name of the resizable dataset to append to
+        @param int buffer_size: optional, maximum number of rows to buffer before writing to disk
+        @param float flush_interval: optional, maximum time in seconds buffered rows are kept in
+                                     memory before writing them to disk
+        """
+        if h5py is None:
+            raise ImportError('Hdf5DataStream requires the h5py package to be installed.')
+        self._dataset_name = dataset_name
+        self._dataset = None
+        super().__init__(file_path, buffer_size=buffer_size, flush_interval=flush_interval)
+
+    @property
+    def shape(self):
+        """ Shape of the dataset on disk (excluding buffered rows).
+        """
+        with self._lock:
+            if self._file is None:
+                raise ValueError('I/O operation on closed Hdf5DataStream.')
+            return self._dataset.shape
+
+    def write(self, data):
+        """ Append data to the stream buffer along the first axis. The shape of data along all
+        other axes must match the dataset. Data with one dimension less than the dataset is treated
+        as a single row. Will write to disk if the buffer size or flush interval is exceeded.
+
+        @param numpy.ndarray data: data array to be appended
+
+        @return int: Number of rows appended
+        """
+        with self._lock:
+            if self._file is None:
+                raise ValueError('I/O operation on closed Hdf5DataStream.')
+            # Copy data since the caller might reuse the array before it is written to disk
+            data = np.array(data, dtype=self._dataset.dtype)
+            if data.ndim == self._dataset.ndim - 1:
+                data = data[np.newaxis]
+            if data.shape[1:] != self._dataset.shape[1:]:
+                raise ValueError(f'Shape of data to append {data.shape} does not match dataset '
+                                 f'shape {self._dataset.shape} along axes other than the first.')
+            if data.shape[0] > 0:
+                self._add_to_buffer([data], data.shape[0])
+        return data.shape[0]
+
+    def _open_file(self):
+        file = h5py.File(self._file_path, 'a')
+        try:
+            self._dataset = file[self._dataset_name]
+        except KeyError:
+            file.close()
+            raise
+        return file
+
+    def _write_buffer(self, buffer):
+        data = buffer[0] if len(buffer) == 1 else np.concatenate(buffer)
+        old_length = self._dataset.shape[0]
+        self._dataset.resize(old_length + data.shape[0], axis=0)
+        self._dataset[old_length:] = data
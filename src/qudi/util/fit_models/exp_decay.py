@@ -20,17 +20,45 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
-__all__ = ('ExponentialDecay', 'multiple_exponential_decay')
+__all__ = ('ExponentialDecay', 'multiple_exponential_decay',
+           'multiple_exponential_decay_derivatives')
 
 import warnings
 import numpy as np
 from scipy.ndimage import filters
 from qudi.util.fit_models.model import FitModelBase, estimator
+from qudi.util.fit_models.helpers import compile_kernel, evaluate_kernel
+
+
+def _multiple_exponential_decay_kernel(x, amplitudes, decays, stretches, out):
+    for ii in range(x.size):
+        value = 0.
+        for jj in range(amplitudes.size):
+            value += amplitudes[jj] * np.exp(-(x[ii] / decays[jj]) ** stretches[jj])
+        out[ii] = value
+
+
+_compiled_multiple_exponential_decay_kernel = compile_kernel(_multiple_exponential_decay_kernel)
+
+
+def _multiple_exponential_decay_numpy(x, amplitudes, decays, stretches):
+    # Evaluates all exponential decays in-place using a single buffer array
+    x = np.asarray(x)
+    result = np.zeros(x.shape, dtype=np.result_type(x, 1.))
+    buffer = np.empty_like(result)
+    for amp, decay, stretch in zip(amplitudes, decays, stretches):
+        np.divide(x, decay, out=buffer)
+        buffer **= stretch
+        np.negative(buffer, out=buffer)
+        np.exp(buffer, out=buffer)
+        buffer *= amp
+        result += buffer
+    return result[()]
 
 
 def multiple_exponential_decay(x, amplitudes, decays, stretches):
     """ Mathematical definition of the sum of multiple stretched exponential decays without any
-    bias.
+    bias. Evaluated in a single pass by a compiled kernel if numba is available.
 
     WARNING: iterable parameters "amplitudes", "decays" and "stretches" must have same length.
 
@@ -42,13 +70,47 @@ def multiple_exponential_decay(x, amplitudes, decays, stretches):
     @return float|numpy.ndarray: The result given x for f(x)
     """
     assert len(decays) == len(amplitudes) == len(stretches)
-    return sum(amp * np.exp(-(x / decay) ** stretch) for amp, decay, stretch in
-               zip(amplitudes, decays, stretches))
+    if _compiled_multiple_exponential_decay_kernel is None:
+        return _multiple_exponential_decay_numpy(x, amplitudes, decays, stretches)
+    return evaluate_kernel(_compiled_multiple_exponential_decay_kernel,
+                           x,
+                           amplitudes,
+                           decays,
+                           stretches)
+
+
+def multiple_exponential_decay_derivatives(x, amplitudes, decays, stretches):
+    """ Analytic partial derivatives of multiple_exponential_decay with respect to amplitude, decay
+    and stretch of each (stretched) exponential decay.
+
+    @param float x: The independent variable
+    @param iterable amplitudes: Iterable containing amplitudes for all decays
+    @param iterable decays: Iterable containing decay constants for all decays
+    @param iterable stretches: Iterable containing stretch constants for all decays
+
+    @return list: (d/d_amplitude, d/d_decay, d/d_stretch) tuple for each decay
+    """
+    assert len(decays) == len(amplitudes) == len(stretches)
+    derivatives = list()
+    for amp, decay, stretch in zip(amplitudes, decays, stretches):
+        scaled_x = x / decay
+        power = scaled_x ** stretch
+        shape = np.exp(-power)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # limit of power * log(scaled_x) for scaled_x -> 0 is 0
+            power_log = np.where(scaled_x == 0, 0., power * np.log(scaled_x))
+        derivatives.append((shape,
+                            amp * shape * power * stretch / decay,
+                            -amp * shape * power_log))
+    return derivatives
 
 
 class ExponentialDecay(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -60,6 +122,14 @@ class ExponentialDecay(FitModelBase):
     def _model_function(x, offset, amplitude, decay, stretch):
         return offset + multiple_exponential_decay(x, (amplitude,), (decay,), (stretch,))
 
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude, decay, stretch):
+        (d_amplitude, d_decay, d_stretch), = multiple_exponential_decay_derivatives(x,
+                                                                                    (amplitude,),
+                                                                                    (decay,),
+                                                                                    (stretch,))
+        return {'offset': 1., 'amplitude': d_amplitude, 'decay': d_decay, 'stretch': d_stretch}
+
     @estimator('Decay')
     def estimate_decay(self, data, x):
         # Smooth very radically the provided data, so that noise fluctuations will not disturb the
@@ -134,6 +204,9 @@ class ExponentialDecay(FitModelBase):
 class DoubleExponentialDecay(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -151,3 +224,17 @@ class DoubleExponentialDecay(FitModelBase):
                                                    (amplitude_1, amplitude_2),
                                                    (decay_1, decay_2),
                                                    (stretch_1, stretch_2))
+
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude_1, amplitude_2, decay_1, decay_2, stretch_1,
+                        stretch_2):
+        jacobian = {'offset': 1.}
+        for ii, derivatives in enumerate(
+                multiple_exponential_decay_derivatives(x,
+                                                       (amplitude_1, amplitude_2),
+                                                       (decay_1, decay_2),
+                                                       (stretch_1, stretch_2)),
+                1):
+            jacobian.update(zip((f'amplitude_{ii:d}', f'decay_{ii:d}', f'stretch_{ii:d}'),
+                                derivatives))
+        return jacobian
@@ -20,17 +20,47 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
-__all__ = ('DoubleGaussian', 'Gaussian', 'Gaussian2D', 'TripleGaussian', 'multiple_gaussian')
+__all__ = ('DoubleGaussian', 'Gaussian', 'Gaussian2D', 'TripleGaussian', 'multiple_gaussian',
+           'multiple_gaussian_derivatives')
 
+import math
 import numpy as np
 from qudi.util.fit_models.model import FitModelBase, estimator
 from qudi.util.fit_models.helpers import correct_offset_histogram, smooth_data, sort_check_data
-from qudi.util.fit_models.helpers import estimate_double_peaks, estimate_triple_peaks
-from qudi.util.fit_models.linear import Linear
+from qudi.util.fit_models.helpers import estimate_multiple_peaks, compile_kernel, evaluate_kernel
+
+
+def _multiple_gaussian_kernel(x, centers, sigmas, amplitudes, out):
+    for ii in range(x.size):
+        value = 0.
+        for jj in range(centers.size):
+            scaled_dx = (x[ii] - centers[jj]) / sigmas[jj]
+            value += amplitudes[jj] * np.exp(-0.5 * scaled_dx * scaled_dx)
+        out[ii] = value
+
+
+_compiled_multiple_gaussian_kernel = compile_kernel(_multiple_gaussian_kernel)
+
+
+def _multiple_gaussian_numpy(x, centers, sigmas, amplitudes):
+    # Evaluates all gaussians in-place using a single buffer array
+    x = np.asarray(x)
+    result = np.zeros(x.shape, dtype=np.result_type(x, 1.))
+    buffer = np.empty_like(result)
+    for c, sig, amp in zip(centers, sigmas, amplitudes):
+        np.subtract(x, c, out=buffer)
+        buffer /= sig
+        np.square(buffer, out=buffer)
+        buffer *= -0.5
+        np.exp(buffer, out=buffer)
+        buffer *= amp
+        result += buffer
+    return result[()]
 
 
 def multiple_gaussian(x, centers, sigmas, amplitudes):
     """ Mathematical definition of the sum of multiple gaussian functions without any bias.
+    Evaluated in a single pass by a compiled kernel if numba is available.
 
     WARNING: iterable parameters "centers", "sigmas" and "amplitudes" must have same length.
 
@@ -40,13 +70,63 @@ def multiple_gaussian(x, centers, sigmas, amplitudes):
     @param iterable amplitudes: Iterable containing amplitudes for all gaussians
     """
     assert len(centers) == len(sigmas) == len(amplitudes)
-    return sum(amp * np.exp(-((x - c) ** 2) / (2 * sig ** 2)) for c, sig, amp in
-               zip(centers, sigmas, amplitudes))
+    if _compiled_multiple_gaussian_kernel is None:
+        return _multiple_gaussian_numpy(x, centers, sigmas, amplitudes)
+    return evaluate_kernel(_compiled_multiple_gaussian_kernel, x, centers, sigmas, amplitudes)
+
+
+def multiple_gaussian_derivatives(x, centers, sigmas, amplitudes):
+    """ Analytic partial derivatives of multiple_gaussian with respect to center, sigma and
+    amplitude of each gaussian.
+
+    @param float x: The independent variable
+    @param iterable centers: Iterable containing center positions for all gaussians
+    @param iterable sigmas: Iterable containing sigmas for all gaussians
+    @param iterable amplitudes: Iterable containing amplitudes for all gaussians
+
+    @return list: (d/d_center, d/d_sigma, d/d_amplitude) tuple for each gaussian
+    """
+    assert len(centers) == len(sigmas) == len(amplitudes)
+    derivatives = list()
+    for c, sig, amp in zip(centers, sigmas, amplitudes):
+        dx = x - c
+        shape = np.exp(-(dx ** 2) / (2 * sig ** 2))
+        d_center = amp * shape * dx / sig ** 2
+        derivatives.append((d_center, d_center * dx / sig, shape))
+    return derivatives
+
+
+def _estimate_multiple_peaks(model, data, x, peak_count):
+    """ Creates parameter estimates for a model with <peak_count> gaussian peaks (parameters
+    "center_<n>", "sigma_<n>" and "amplitude_<n>") and constant offset, see estimate_multiple_peaks.
+    """
+    data, x = sort_check_data(data, x)
+    estimate, limits = estimate_multiple_peaks(data, x, peak_count)
+
+    # sigma is the standard deviation
+    params = model.make_params()
+    params['offset'].set(value=estimate['offset'],
+                         min=limits['offset'][0],
+                         max=limits['offset'][1])
+    for ii in range(peak_count):
+        params[f'amplitude_{ii + 1:d}'].set(value=estimate['height'][ii],
+                                            min=limits['height'][ii][0],
+                                            max=limits['height'][ii][1])
+        params[f'center_{ii + 1:d}'].set(value=estimate['center'][ii],
+                                         min=limits['center'][ii][0],
+                                         max=limits['center'][ii][1])
+        params[f'sigma_{ii + 1:d}'].set(value=estimate['fwhm'][ii] / 2.3548,
+                                        min=limits['fwhm'][ii][0] / 2.3548,
+                                        max=limits['fwhm'][ii][1] / 2.3548)
+    return params
 
 
 class Gaussian(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -58,6 +138,14 @@ class Gaussian(FitModelBase):
     def _model_function(x, offset, center, sigma, amplitude):
         return offset + multiple_gaussian(x, (center,), (sigma,), (amplitude,))
 
+    @staticmethod
+    def _model_jacobian(x, offset, center, sigma, amplitude):
+        (d_center, d_sigma, d_amplitude), = multiple_gaussian_derivatives(x,
+                                                                          (center,),
+                                                                          (sigma,),
+                                                                          (amplitude,))
+        return {'offset': 1., 'center': d_center, 'sigma': d_sigma, 'amplitude': d_amplitude}
+
     @estimator('Peak')
     def estimate_peak(self, data, x):
         data, x = sort_check_data(data, x)
@@ -117,6 +205,10 @@ class Gaussian(FitModelBase):
 class DoubleGaussian(FitModelBase):
     """ ToDo: Document
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2')
+    use_variable_projection = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -134,34 +226,22 @@ class DoubleGaussian(FitModelBase):
                                           (sigma_1, sigma_2),
                                           (amplitude_1, amplitude_2))
 
+    @staticmethod
+    def _model_jacobian(x, offset, center_1, center_2, sigma_1, sigma_2, amplitude_1, amplitude_2):
+        jacobian = {'offset': 1.}
+        for ii, derivatives in enumerate(
+                multiple_gaussian_derivatives(x,
+                                              (center_1, center_2),
+                                              (sigma_1, sigma_2),
+                                              (amplitude_1, amplitude_2)),
+                1):
+            jacobian.update(zip((f'center_{ii:d}', f'sigma_{ii:d}', f'amplitude_{ii:d}'),
+                                derivatives))
+        return jacobian
+
     @estimator('Peaks')
     def estimate_peaks(self, data, x):
-        data, x = sort_check_data(data, x)
-        data_smoothed, filter_width = smooth_data(data)
-        leveled_data_smooth, offset = correct_offset_histogram(data_smoothed,
-                                                               bin_width=2 * filter_width)
-        estimate, limits = estimate_double_peaks(leveled_data_smooth, x, filter_width)
-
-        params = self.make_params()
-        params['amplitude_1'].set(value=estimate['height'][0],
-                                  min=limits['height'][0][0],
-                                  max=limits['height'][0][1])
-        params['amplitude_2'].set(value=estimate['height'][1],
-                                  min=limits['height'][1][0],
-                                  max=limits['height'][1][1])
-        params['center_1'].set(value=estimate['center'][0],
-                               min=limits['center'][0][0],
-                               max=limits['center'][0][1])
-        params['center_2'].set(value=estimate['center'][1],
-                               min=limits['center'][1][0],
-                               max=limits['center'][1][1])
-        params['sigma_1'].set(value=estimate['fwhm'][0] / 2.3548,
-                              min=limits['fwhm'][0][0] / 2.3548,
-                              max=limits['fwhm'][0][1] / 2.3548)
-        params['sigma_2'].set(value=estimate['fwhm'][1] / 2.3548,
-                              min=limits['fwhm'][1][0] / 2.3548,
-                              max=limits['fwhm'][1][1] / 2.3548)
-        return params
+        return _estimate_multiple_peaks(self, data, x, peak_count=2)
 
     @estimator('Dips')
     def estimate_dips(self, data, x):
@@ -181,6 +261,10 @@ class DoubleGaussian(FitModelBase):
 class TripleGaussian(FitModelBase):
     """ ToDo: Document
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2', 'amplitude_3')
+    use_variable_projection = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -202,43 +286,23 @@ class TripleGaussian(FitModelBase):
                                           (sigma_1, sigma_2, sigma_3),
                                           (amplitude_1, amplitude_2, amplitude_3))
 
+    @staticmethod
+    def _model_jacobian(x, offset, center_1, center_2, center_3, sigma_1, sigma_2, sigma_3,
+                        amplitude_1, amplitude_2, amplitude_3):
+        jacobian = {'offset': 1.}
+        for ii, derivatives in enumerate(
+                multiple_gaussian_derivatives(x,
+                                              (center_1, center_2, center_3),
+                                              (sigma_1, sigma_2, sigma_3),
+                                              (amplitude_1, amplitude_2, amplitude_3)),
+                1):
+            jacobian.update(zip((f'center_{ii:d}', f'sigma_{ii:d}', f'amplitude_{ii:d}'),
+                                derivatives))
+        return jacobian
+
     @estimator('Peaks')
     def estimate_peaks(self, data, x):
-        data, x = sort_check_data(data, x)
-        data_smoothed, filter_width = smooth_data(data)
-        leveled_data_smooth, offset = correct_offset_histogram(data_smoothed,
-                                                               bin_width=2 * filter_width)
-        estimate, limits = estimate_triple_peaks(leveled_data_smooth, x, filter_width)
-
-        params = self.make_params()
-        params['amplitude_1'].set(value=estimate['height'][0],
-                                  min=limits['height'][0][0],
-                                  max=limits['height'][0][1])
-        params['amplitude_2'].set(value=estimate['height'][1],
-                                  min=limits['height'][1][0],
-                                  max=limits['height'][1][1])
-        params['amplitude_3'].set(value=estimate['height'][2],
-                                  min=limits['height'][2][0],
-                                  max=limits['height'][2][1])
-        params['center_1'].set(value=estimate['center'][0],
-                               min=limits['center'][0][0],
-                               max=limits['center'][0][1])
-        params['center_2'].set(value=estimate['center'][1],
-                               min=limits['center'][1][0],
-                               max=limits['center'][1][1])
-        params['center_3'].set(value=estimate['center'][2],
-                               min=limits['center'][2][0],
-                               max=limits['center'][2][1])
-        params['sigma_1'].set(value=estimate['fwhm'][0] / 2.3548,
-                              min=limits['fwhm'][0][0] / 2.3548,
-                              max=limits['fwhm'][0][1] / 2.3548)
-        params['sigma_2'].set(value=estimate['fwhm'][1] / 2.3548,
-                              min=limits['fwhm'][1][0] / 2.3548,
-                              max=limits['fwhm'][1][1] / 2.3548)
-        params['sigma_3'].set(value=estimate['fwhm'][2] / 2.3548,
-                              min=limits['fwhm'][2][0] / 2.3548,
-                              max=limits['fwhm'][2][1] / 2.3548)
-        return params
+        return _estimate_multiple_peaks(self, data, x, peak_count=3)
 
     @estimator('Dips')
     def estimate_dips(self, data, x):
@@ -261,6 +325,9 @@ class TripleGaussian(FitModelBase):
 class GaussianLinear(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'slope', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -274,40 +341,39 @@ class GaussianLinear(FitModelBase):
         x0 = (x - min(x))
         return offset + x0 * slope + multiple_gaussian(x, (center,), (sigma,), (amplitude,))
 
+    @staticmethod
+    def _model_jacobian(x, offset, slope, center, sigma, amplitude):
+        (d_center, d_sigma, d_amplitude), = multiple_gaussian_derivatives(x,
+                                                                          (center,),
+                                                                          (sigma,),
+                                                                          (amplitude,))
+        return {'offset': 1.,
+                'slope': x - min(x),
+                'center': d_center,
+                'sigma': d_sigma,
+                'amplitude': d_amplitude}
+
     @estimator('Peak')
     def estimate_peak(self, data, x):
         data, x = sort_check_data(data, x)
-        data_span = abs(max(data) - min(data))
+        estimate, limits = estimate_multiple_peaks(data, x, peak_count=1, linear_baseline=True)
 
-        # Perform a normal Gaussian peak fit and subtract the result from data
-        model = Gaussian()
-        gauss_fit = model.fit(data, model.estimate_peak(data, x), x=x)
-        data_sub = data - gauss_fit.best_fit
-        # Perform a linear fit in subtracted data in order to estimate slope
-        model = Linear()
-        linear_fit = model.fit(data_sub, model.estimate(data_sub, x), x=x)
-        offset = linear_fit['offset'] + min(x) * linear_fit['slope']
-
-        # Merge fit results into parameter estimates
-        estimate = self.make_params()
-        estimate['offset'].set(value=offset,
-                               min=min(data) - data_span / 2,
-                               max=max(data) + data_span / 2,
-                               vary=True)
-        estimate['slope'].set(value=linear_fit['slope'].value, min=-np.inf, max=np.inf, vary=True)
-        estimate['amplitude'].set(value=gauss_fit['amplitude'].value,
-                                  min=gauss_fit['amplitude'].min,
-                                  max=gauss_fit['amplitude'].max,
-                                  vary=True)
-        estimate['center'].set(value=gauss_fit['center'].value,
-                               min=gauss_fit['center'].min,
-                               max=gauss_fit['center'].max,
-                               vary=True)
-        estimate['sigma'].set(value=gauss_fit['sigma'].value,
-                              min=gauss_fit['sigma'].min,
-                              max=gauss_fit['sigma'].max,
-                              vary=True)
-        return estimate
+        # Offset of the linear baseline refers to min(x), i.e. x[0] of sorted data
+        params = self.make_params()
+        params['offset'].set(value=estimate['offset'],
+                             min=limits['offset'][0],
+                             max=limits['offset'][1])
+        params['slope'].set(value=estimate['slope'], min=-np.inf, max=np.inf)
+        params['amplitude'].set(value=estimate['height'][0],
+                                min=limits['height'][0][0],
+                                max=limits['height'][0][1])
+        params['center'].set(value=estimate['center'][0],
+                             min=limits['center'][0][0],
+                             max=limits['center'][0][1])
+        params['sigma'].set(value=estimate['fwhm'][0] / 2.3548,
+                            min=limits['fwhm'][0][0] / 2.3548,
+                            max=limits['fwhm'][0][1] / 2.3548)
+        return params
 
     @estimator('Dip')
     def estimate_dip(self, data, x):
@@ -315,6 +381,9 @@ class GaussianLinear(FitModelBase):
         estimate['offset'].set(value=-estimate['offset'].value,
                                min=-estimate['offset'].max,
                                max=-estimate['offset'].min)
+        estimate['slope'].set(value=-estimate['slope'].value,
+                              min=-estimate['slope'].max,
+                              max=-estimate['slope'].min)
         estimate['amplitude'].set(value=-estimate['amplitude'].value,
                                   min=-estimate['amplitude'].max,
                                   max=-estimate['amplitude'].min)
@@ -322,8 +391,15 @@ class GaussianLinear(FitModelBase):
 
 
 class Gaussian2D(FitModelBase):
+    """ Rotated 2D Gaussian on top of a constant offset.
+
+    The independent variable x is a pair of arrays (x- and y-coordinates of all data points), e.g.
+    created via numpy.meshgrid(x_axis, y_axis, indexing='ij'). The model values are flattened.
+    Theta is the counter-clockwise rotation angle of the sigma_x axis with respect to the x-axis.
     """
-    """
+
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -334,44 +410,140 @@ class Gaussian2D(FitModelBase):
         self.set_param_hint('sigma_y', value=0, min=0, max=np.inf)
         self.set_param_hint('theta', value=0., min=-np.pi, max=np.pi)
 
+    @staticmethod
+    def _rotated_coordinates(x, center_x, center_y, theta):
+        """ Flattened coordinates of all points along the sigma_x (u) and sigma_y (v) axes.
+        """
+        dx = np.subtract(x[0], center_x).ravel()
+        dy = np.subtract(x[1], center_y).ravel()
+        cos_theta = math.cos(theta)
+        sin_theta = math.sin(theta)
+        u = dx * cos_theta
+        u += sin_theta * dy
+        dy *= cos_theta
+        dx *= sin_theta
+        dy -= dx
+        return u, dy
+
     @staticmethod
     def _model_function(x, offset, amplitude, center_x, center_y, sigma_x, sigma_y, theta):
+        # Exponent -(a*dx**2 + 2*b*dx*dy + c*dy**2) = -a*(dx*(dx + 2*b/a*dy) + c/a*dy**2)
+        cos_sq = math.cos(theta) ** 2
+        sin_sq = 1 - cos_sq
         try:
-            a = np.cos(-theta) ** 2 / (2 * sigma_x ** 2) + np.sin(-theta) ** 2 / (2 * sigma_y ** 2)
-            b = np.sin(2 * -theta) / (4 * sigma_y ** 2) - np.sin(2 * -theta) / (4 * sigma_x ** 2)
-            c = np.sin(-theta) ** 2 / (2 * sigma_x ** 2) + np.cos(-theta) ** 2 / (2 * sigma_y ** 2)
+            inv_var_x = 1 / sigma_x ** 2
+            inv_var_y = 1 / sigma_y ** 2
+            a = 0.5 * (cos_sq * inv_var_x + sin_sq * inv_var_y)
+            b = 0.25 * math.sin(2 * theta) * (inv_var_x - inv_var_y)
+            c = 0.5 * (sin_sq * inv_var_x + cos_sq * inv_var_y)
+            dy_factor = 2 * b / a
+            dy_sq_factor = c / a
         except ZeroDivisionError:
-            return np.full(x[0].shape, offset)
-        x_prime = x[0] - center_x
-        y_prime = x[1] - center_y
-        gauss = offset + amplitude * np.exp(
-            -(a * x_prime ** 2 + 2 * b * x_prime * y_prime + c * y_prime ** 2))
-        return gauss.ravel()
+            return np.full(np.shape(x[0]), offset).ravel()
+        dx = np.subtract(x[0], center_x).ravel()
+        dy = np.subtract(x[1], center_y).ravel()
+        # Evaluate in-place using the coordinate buffers only
+        exponent = np.multiply(dy, dy_factor)
+        exponent += dx
+        exponent *= dx
+        np.square(dy, out=dy)
+        dy *= dy_sq_factor
+        exponent += dy
+        exponent *= -a
+        np.exp(exponent, out=exponent)
+        exponent *= amplitude
+        exponent += offset
+        return exponent
+
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude, center_x, center_y, sigma_x, sigma_y, theta):
+        u, v = Gaussian2D._rotated_coordinates(x, center_x, center_y, theta)
+        inv_var_x = 1 / sigma_x ** 2
+        inv_var_y = 1 / sigma_y ** 2
+        d_amplitude = np.exp(-0.5 * (inv_var_x * u ** 2 + inv_var_y * v ** 2))
+        gauss = amplitude * d_amplitude
+        scaled_u = gauss * u * inv_var_x
+        scaled_v = gauss * v * inv_var_y
+        cos_theta = math.cos(theta)
+        sin_theta = math.sin(theta)
+        return {'offset': 1.,
+                'amplitude': d_amplitude,
+                'center_x': cos_theta * scaled_u - sin_theta * scaled_v,
+                'center_y': sin_theta * scaled_u + cos_theta * scaled_v,
+                'sigma_x': scaled_u * u / sigma_x,
+                'sigma_y': scaled_v * v / sigma_y,
+                'theta': (scaled_v * u - scaled_u * v)}
 
     @estimator('Peak')
     def estimate_peak(self, data, x):
-        # ToDo: Not properly implemented, yet
-        x_range = abs(np.max(x[0]) - np.min(x[0]))
-        y_range = abs(np.max(x[1]) - np.min(x[1]))
-
-        amplitude = np.max(data)
-        center_x = x_range / 2 + np.min(x[0])
-        center_y = y_range / 2 + np.min(x[1])
-        sigma_x = x_range / 10
-        sigma_y = y_range / 10
-        theta = 0
+        """ Estimates a single spot from the image moments of the data above the background.
+        """
+        x_coords = np.asarray(x[0], dtype=float)
+        y_coords = np.asarray(x[1], dtype=float)
+        data = np.reshape(data, x_coords.shape)
+        x_min, x_max = np.min(x_coords), np.max(x_coords)
+        y_min, y_max = np.min(y_coords), np.max(y_coords)
+        x_range = x_max - x_min
+        y_range = y_max - y_min
+
+        # Background from the median of the image border (if there is one)
+        if data.ndim == 2 and min(data.shape) > 2:
+            border = np.concatenate((data[0], data[-1], data[1:-1, 0], data[1:-1, -1]))
+        else:
+            border = data
+        offset = np.median(border)
+        amplitude = np.max(data) - offset
+
+        # Second moments of the points above 20% of the peak height. Truncating a 2D Gaussian at
+        # exp(-t) of its height reduces the variance by (1 - (1 + t) * exp(-t)) / (1 - exp(-t)).
+        weights = data - offset
+        mask = weights > 0.2 * amplitude
+        if amplitude > 0 and np.count_nonzero(mask) > 2:
+            weights = weights[mask]
+            x_masked = x_coords[mask]
+            y_masked = y_coords[mask]
+            total = np.sum(weights)
+            center_x = np.dot(weights, x_masked) / total
+            center_y = np.dot(weights, y_masked) / total
+            dx = x_masked - center_x
+            dy = y_masked - center_y
+            t = np.log(5)
+            correction = (1 - 0.2) / (1 - (1 + t) * 0.2)
+            var_xx = correction * np.dot(weights, dx * dx) / total
+            var_yy = correction * np.dot(weights, dy * dy) / total
+            var_xy = correction * np.dot(weights, dx * dy) / total
+            # Principal axes of the covariance matrix
+            theta = 0.5 * np.arctan2(2 * var_xy, var_xx - var_yy)
+            cos_theta = np.cos(theta)
+            sin_theta = np.sin(theta)
+            sigma_x = np.sqrt(max(var_xx * cos_theta ** 2 + 2 * var_xy * cos_theta * sin_theta +
+                                  var_yy * sin_theta ** 2, 0))
+            sigma_y = np.sqrt(max(var_xx * sin_theta ** 2 - 2 * var_xy * cos_theta * sin_theta +
+                                  var_yy * cos_theta ** 2, 0))
+        else:
+            center_x = x_range / 2 + x_min
+            center_y = y_range / 2 + y_min
+            sigma_x = x_range / 10
+            sigma_y = y_range / 10
+            theta = 0
+
+        # Allow undersampled spots down to a quarter of the pixel spacing
+        min_sigma_x = np.min(np.diff(np.unique(x_coords))) / 4 if x_range > 0 else 0
+        min_sigma_y = np.min(np.diff(np.unique(y_coords))) / 4 if y_range > 0 else 0
+        sigma_x = min(max(sigma_x, min_sigma_x), x_range)
+        sigma_y = min(max(sigma_y, min_sigma_y), y_range)
 
         estimate = self.make_params()
-        estimate['offset'].set(value=np.mean(data), min=-np.inf, max=np.max(data))
+        estimate['offset'].set(value=offset, min=-np.inf, max=np.max(data))
         estimate['amplitude'].set(value=amplitude, min=0, max=amplitude * 2)
         estimate['center_x'].set(value=center_x,
-                                 min=np.min(x[0]) - x_range / 2,
-                                 max=np.max(x[0]) + x_range / 2)
+                                 min=x_min - x_range / 2,
+                                 max=x_max + x_range / 2)
         estimate['center_y'].set(value=center_y,
-                                 min=np.min(x[1]) - y_range / 2,
-                                 max=np.max(x[1]) + y_range / 2)
-        estimate['sigma_x'].set(value=sigma_x, min=x_range / (x[0].shape[0] - 1), max=x_range)
-        estimate['sigma_y'].set(value=sigma_y, min=y_range / (x[0].shape[1] - 1), max=y_range)
+                                 min=y_min - y_range / 2,
+                                 max=y_max + y_range / 2)
+        estimate['sigma_x'].set(value=sigma_x, min=min_sigma_x, max=x_range)
+        estimate['sigma_y'].set(value=sigma_y, min=min_sigma_y, max=y_range)
         estimate['theta'].set(value=theta, min=-np.pi, max=np.pi)
         return estimate
 
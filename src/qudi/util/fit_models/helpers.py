@@ -20,13 +20,51 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
-__all__ = ('correct_offset_histogram', 'find_highest_peaks', 'estimate_double_peaks',
-           'estimate_triple_peaks', 'sort_check_data', 'smooth_data')
+__all__ = ('compile_kernel', 'correct_offset_histogram', 'evaluate_kernel', 'find_highest_peaks',
+           'estimate_double_peaks', 'estimate_triple_peaks', 'estimate_multiple_peaks',
+           'sort_check_data', 'smooth_data')
 
 import numpy as np
 from scipy.signal import find_peaks as _find_peaks
 from scipy.signal import peak_widths as _peak_widths
 from scipy.ndimage.filters import gaussian_filter1d as _gaussian_filter
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+
+def compile_kernel(function):
+    """ Compiles a model kernel function with numba (optional dependency).
+
+    A kernel has the signature kernel(x, *parameters, out) with all arguments being 1D float arrays.
+    It must write the model values for each element of x into out.
+    Floating point errors (e.g. division by zero) follow numpy semantics (inf/nan) instead of
+    raising exceptions, so the compiled kernel yields the same results as its numpy counterpart.
+
+    @param callable function: The pure python kernel function to compile
+
+    @return callable|None: Compiled kernel or None if numba is not available
+    """
+    if _njit is None:
+        return None
+    return _njit(cache=True, nogil=True, error_model='numpy')(function)
+
+
+def evaluate_kernel(kernel, x, *parameters):
+    """ Evaluates a (compiled) model kernel, see compile_kernel, for arbitrary shaped x.
+
+    @param callable kernel: The kernel function to call
+    @param float|numpy.ndarray x: The independent variable
+    @param iterable parameters: Iterables containing the parameter values for all model components
+
+    @return float|numpy.ndarray: The model values with the same shape as x
+    """
+    x = np.asarray(x, dtype=np.float64)
+    flat_x = np.ascontiguousarray(x).ravel()
+    out = np.empty_like(flat_x)
+    kernel(flat_x, *(np.asarray(p, dtype=np.float64) for p in parameters), out)
+    return out.reshape(x.shape)[()]
 
 
 def sort_check_data(data, x):
@@ -199,3 +237,123 @@ def estimate_triple_peaks(data, x, minimum_distance=None):
               'fwhm'  : ((x_spacing, x_span),) * 3,
               'center': ((min(x) - x_span / 2, max(x) + x_span / 2),) * 3}
     return estimate, limits
+
+
+def estimate_multiple_peaks(data, x, peak_count, filter_width=None, linear_baseline=False):
+    """ Single-pass estimation of <peak_count> peaks (positive height) on top of a constant or
+    linear baseline without performing any fits.
+
+    The data is smoothed once and leveled by the baseline estimate (offset histogram or a line
+    through the data edges). Peak candidates are the maxima of the leveled data, i.e. the sign
+    changes of its derivative. The highest candidates are taken as peaks and their full-width at
+    half-maximum is determined from the (interpolated) half-maximum crossings, limited by the
+    distance to neighbouring peaks. Missing peaks are added by splitting the widest peak found.
+
+    Data must be sorted by increasing x values (see sort_check_data).
+
+    @param numpy.ndarray data: peak data
+    @param numpy.ndarray x: x values of data (sorted in increasing order)
+    @param int peak_count: number of peaks to estimate
+    @param int filter_width: optional, gaussian filter width in samples (see smooth_data)
+    @param bool linear_baseline: optional, estimate a sloped instead of a constant baseline
+
+    @return dict, dict: estimate and limits dicts. Keys "offset" (baseline value at x[0]) and
+                        "slope" hold scalars (limits for "offset" only) and keys "height", "fwhm"
+                        and "center" hold one value (limits tuple) per peak, sorted by center.
+    """
+    peak_count = int(peak_count)
+    assert peak_count > 0, 'Parameter "peak_count" must be integer >= 1'
+    assert len(data) >= 5, 'Data must contain at least 5 data points'
+    data = np.asarray(data, dtype=float)
+    x = np.asarray(x, dtype=float)
+
+    x_spacing = np.min(np.abs(np.diff(x)))
+    x_span = abs(x[-1] - x[0])
+    data_min, data_max = np.min(data), np.max(data)
+    data_span = data_max - data_min
+    data_smoothed, filter_width = smooth_data(data, filter_width)
+
+    # Estimate baseline and level data
+    if linear_baseline:
+        edge = max(2, len(x) // 10)
+        left_x, right_x = np.mean(x[:edge]), np.mean(x[-edge:])
+        left_y, right_y = np.median(data_smoothed[:edge]), np.median(data_smoothed[-edge:])
+        slope = (right_y - left_y) / (right_x - left_x) if right_x != left_x else 0.
+        offset = left_y - slope * (left_x - x[0])
+    else:
+        slope = 0.
+        offset = correct_offset_histogram(data_smoothed, bin_width=2 * filter_width)[1]
+    leveled = data_smoothed - offset - slope * (x - x[0])
+
+    # Peak candidates are local maxima (incl. borders) of the leveled data above 5% of the maximum
+    derivative = np.diff(leveled)
+    candidates = np.flatnonzero((derivative[:-1] > 0) & (derivative[1:] <= 0)) + 1
+    if derivative[0] < 0:
+        candidates = np.append(candidates, 0)
+    if derivative[-1] > 0:
+        candidates = np.append(candidates, len(leveled) - 1)
+    max_height = np.max(leveled)
+    candidates = candidates[leveled[candidates] > 0.05 * max_height] if max_height > 0 else []
+    if len(candidates) > peak_count:
+        candidates = candidates[np.argpartition(leveled[candidates], -peak_count)[-peak_count:]]
+    peaks = np.sort(candidates)
+    heights = leveled[peaks]
+    centers = x[peaks]
+
+    # Half-maximum crossings of all peaks at once. Missing crossings are marked by -1 and len(x).
+    if len(peaks) > 0:
+        index = np.arange(len(leveled))
+        half_max = heights[:, None] / 2
+        below = leveled[None, :] <= half_max
+        left = np.where(below & (index < peaks[:, None]), index, -1).max(axis=1)
+        right = np.where(below & (index > peaks[:, None]), index, len(index)).min(axis=1)
+        left_valid = left >= 0
+        right_valid = right < len(index)
+        half_max = half_max[:, 0]
+        # Linear interpolation between the samples enclosing the crossing
+        left_width = np.full(len(peaks), np.nan)
+        right_width = np.full(len(peaks), np.nan)
+        ll = left[left_valid]
+        frac = (half_max[left_valid] - leveled[ll]) / (leveled[ll + 1] - leveled[ll])
+        left_width[left_valid] = centers[left_valid] - (x[ll] + frac * (x[ll + 1] - x[ll]))
+        rr = right[right_valid]
+        frac = (half_max[right_valid] - leveled[rr]) / (leveled[rr - 1] - leveled[rr])
+        right_width[right_valid] = (x[rr] - frac * (x[rr] - x[rr - 1])) - centers[right_valid]
+        # Mirror missing sides and limit by distance to neighbouring peaks
+        left_width = np.where(np.isnan(left_width), right_width, left_width)
+        right_width = np.where(np.isnan(right_width), left_width, right_width)
+        neighbour_distance = np.diff(centers)
+        left_width[1:] = np.fmin(left_width[1:], neighbour_distance)
+        right_width[:-1] = np.fmin(right_width[:-1], neighbour_distance)
+        fwhm = left_width + right_width
+        fwhm = np.where(np.isnan(fwhm), x_span / (2 * peak_count), fwhm)
+        fwhm = np.clip(fwhm, x_spacing, x_span)
+    else:
+        fwhm = np.empty(0)
+
+    # Replace missing peaks with sensible default values
+    if len(peaks) == 0:
+        # If no peaks have been found, just make a wild guess
+        centers = x[0] + x_span * np.arange(1, peak_count + 1) / (peak_count + 1)
+        heights = np.full(peak_count, data_span)
+        fwhm = np.full(peak_count, min(x_spacing * 10, x_span))
+    while len(centers) < peak_count:
+        # Assume the widest peak consists of two overlapping peaks and split it into two peaks
+        # with half the width, keeping the height at the original center.
+        widest = np.argmax(fwhm)
+        center, height, width = centers[widest], heights[widest], max(x_spacing, fwhm[widest] / 2)
+        centers = np.append(np.delete(centers, widest), (center - width / 2, center + width / 2))
+        heights = np.append(np.delete(heights, widest), (height, height))
+        fwhm = np.append(np.delete(fwhm, widest), (width, width))
+    sorted_args = np.argsort(centers)
+
+    estimate = {'offset': offset,
+                'slope' : slope,
+                'height': heights[sorted_args],
+                'fwhm'  : fwhm[sorted_args],
+                'center': centers[sorted_args]}
+    limits = {'offset': (data_min - data_span / 2, data_max + data_span / 2),
+              'height': ((0, 2 * data_span),) * peak_count,
+              'fwhm'  : ((x_spacing, x_span),) * peak_count,
+              'center': ((x[0] - x_span / 2, x[-1] + x_span / 2),) * peak_count}
+    return estimate, limits
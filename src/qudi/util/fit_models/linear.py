@@ -27,6 +27,9 @@ from qudi.util.fit_models.model import FitModelBase, estimator
 
 
 class Linear(FitModelBase):
+    _linear_parameters = ('offset', 'slope')
+    use_variable_projection = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -36,6 +39,10 @@ class Linear(FitModelBase):
     def _model_function(x, offset, slope):
         return offset + slope * x
 
+    @staticmethod
+    def _model_jacobian(x, offset, slope):
+        return {'offset': 1., 'slope': x}
+
     @estimator('default')
     def estimate(self, data, x):
         data = np.asarray(data)
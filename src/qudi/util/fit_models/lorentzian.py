@@ -21,19 +21,46 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 __all__ = ['ComplexLorentzian', 'DoubleLorentzian', 'Lorentzian', 'LorentzianLinear',
-           'TripleLorentzian', 'multiple_lorentzian', 'multiple_complex_lorentzian']
+           'TripleLorentzian', 'multiple_lorentzian', 'multiple_lorentzian_derivatives',
+           'multiple_complex_lorentzian']
 
 import numpy as np
 from typing import Sequence
 from qudi.util.fit_models.model import FitModelBase, estimator
 from qudi.util.fit_models.helpers import correct_offset_histogram, smooth_data, sort_check_data
-from qudi.util.fit_models.helpers import estimate_double_peaks, estimate_triple_peaks
-from qudi.util.fit_models.linear import Linear
+from qudi.util.fit_models.helpers import estimate_multiple_peaks, compile_kernel, evaluate_kernel
+
+
+def _multiple_lorentzian_kernel(x, centers, sigmas, amplitudes, out):
+    for ii in range(x.size):
+        value = 0.
+        for jj in range(centers.size):
+            dx = x[ii] - centers[jj]
+            sigma_sq = sigmas[jj] * sigmas[jj]
+            value += amplitudes[jj] * sigma_sq / (dx * dx + sigma_sq)
+        out[ii] = value
+
+
+_compiled_multiple_lorentzian_kernel = compile_kernel(_multiple_lorentzian_kernel)
+
+
+def _multiple_lorentzian_numpy(x, centers, sigmas, amplitudes):
+    # Evaluates all lorentzians in-place using a single buffer array
+    x = np.asarray(x)
+    result = np.zeros(x.shape, dtype=np.result_type(x, 1.))
+    buffer = np.empty_like(result)
+    for c, sig, amp in zip(centers, sigmas, amplitudes):
+        np.subtract(x, c, out=buffer)
+        np.square(buffer, out=buffer)
+        buffer += sig ** 2
+        np.divide(amp * sig ** 2, buffer, out=buffer)
+        result += buffer
+    return result[()]
 
 
 def multiple_lorentzian(x, centers, sigmas, amplitudes):
     """ Mathematical definition of the sum of multiple (physical) Lorentzian functions without any
-    bias.
+    bias. Evaluated in a single pass by a compiled kernel if numba is available.
 
     WARNING: iterable parameters "centers", "sigmas" and "amplitudes" must have same length.
 
@@ -43,8 +70,32 @@ def multiple_lorentzian(x, centers, sigmas, amplitudes):
     @param iterable amplitudes: Iterable containing amplitudes for all lorentzians
     """
     assert len(centers) == len(sigmas) == len(amplitudes)
-    return sum(amp * sig ** 2 / ((x - c) ** 2 + sig ** 2) for c, sig, amp in
-               zip(centers, sigmas, amplitudes))
+    if _compiled_multiple_lorentzian_kernel is None:
+        return _multiple_lorentzian_numpy(x, centers, sigmas, amplitudes)
+    return evaluate_kernel(_compiled_multiple_lorentzian_kernel, x, centers, sigmas, amplitudes)
+
+
+def multiple_lorentzian_derivatives(x, centers, sigmas, amplitudes):
+    """ Analytic partial derivatives of multiple_lorentzian with respect to center, sigma and
+    amplitude of each Lorentzian.
+
+    @param float x: The independent variable
+    @param iterable centers: Iterable containing center positions for all lorentzians
+    @param iterable sigmas: Iterable containing sigmas for all lorentzians
+    @param iterable amplitudes: Iterable containing amplitudes for all lorentzians
+
+    @return list: (d/d_center, d/d_sigma, d/d_amplitude) tuple for each lorentzian
+    """
+    assert len(centers) == len(sigmas) == len(amplitudes)
+    derivatives = list()
+    for c, sig, amp in zip(centers, sigmas, amplitudes):
+        dx = x - c
+        inv_denom = 1 / (dx ** 2 + sig ** 2)
+        shape = sig ** 2 * inv_denom
+        derivatives.append((2 * amp * shape * dx * inv_denom,
+                            2 * amp * sig * dx ** 2 * inv_denom ** 2,
+                            shape))
+    return derivatives
 
 
 def multiple_complex_lorentzian(x: float, centers: Sequence[float], sigmas: Sequence[float],
@@ -63,10 +114,37 @@ def multiple_complex_lorentzian(x: float, centers: Sequence[float], sigmas: Sequ
                zip(centers, sigmas, amplitudes, thetas))
 
 
+def _estimate_multiple_peaks(model, data, x, peak_count):
+    """ Creates parameter estimates for a model with <peak_count> lorentzian peaks (parameters
+    "center_<n>", "sigma_<n>" and "amplitude_<n>") and constant offset, see estimate_multiple_peaks.
+    """
+    data, x = sort_check_data(data, x)
+    estimate, limits = estimate_multiple_peaks(data, x, peak_count)
+
+    # sigma is the half-width at half-maximum
+    params = model.make_params()
+    params['offset'].set(value=estimate['offset'],
+                         min=limits['offset'][0],
+                         max=limits['offset'][1])
+    for ii in range(peak_count):
+        params[f'amplitude_{ii + 1:d}'].set(value=estimate['height'][ii],
+                                            min=limits['height'][ii][0],
+                                            max=limits['height'][ii][1])
+        params[f'center_{ii + 1:d}'].set(value=estimate['center'][ii],
+                                         min=limits['center'][ii][0],
+                                         max=limits['center'][ii][1])
+        params[f'sigma_{ii + 1:d}'].set(value=estimate['fwhm'][ii] / 2,
+                                        min=limits['fwhm'][ii][0] / 2,
+                                        max=limits['fwhm'][ii][1] / 2)
+    return params
+
+
 class Lorentzian(FitModelBase):
     """
     """
 
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -78,6 +156,14 @@ class Lorentzian(FitModelBase):
     def _model_function(x, offset, center, sigma, amplitude):
         return offset + multiple_lorentzian(x, (center,), (sigma,), (amplitude,))
 
+    @staticmethod
+    def _model_jacobian(x, offset, center, sigma, amplitude):
+        (d_center, d_sigma, d_amplitude), = multiple_lorentzian_derivatives(x,
+                                                                            (center,),
+                                                                            (sigma,),
+                                                                            (amplitude,))
+        return {'offset': 1., 'center': d_center, 'sigma': d_sigma, 'amplitude': d_amplitude}
+
     @estimator('Peak')
     def estimate_peak(self, data, x):
         data, x = sort_check_data(data, x)
@@ -137,6 +223,10 @@ class Lorentzian(FitModelBase):
 class DoubleLorentzian(FitModelBase):
     """ ToDo: Document
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2')
+    use_variable_projection = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -154,34 +244,22 @@ class DoubleLorentzian(FitModelBase):
                                                 (sigma_1, sigma_2),
                                                 (amplitude_1, amplitude_2))
 
+    @staticmethod
+    def _model_jacobian(x, offset, center_1, center_2, sigma_1, sigma_2, amplitude_1, amplitude_2):
+        jacobian = {'offset': 1.}
+        for ii, derivatives in enumerate(
+                multiple_lorentzian_derivatives(x,
+                                                (center_1, center_2),
+                                                (sigma_1, sigma_2),
+                                                (amplitude_1, amplitude_2)),
+                1):
+            jacobian.update(zip((f'center_{ii:d}', f'sigma_{ii:d}', f'amplitude_{ii:d}'),
+                                derivatives))
+        return jacobian
+
     @estimator('Peaks')
     def estimate_peaks(self, data, x):
-        data, x = sort_check_data(data, x)
-        data_smoothed, filter_width = smooth_data(data)
-        leveled_data_smooth, offset = correct_offset_histogram(data_smoothed,
-                                                               bin_width=2 * filter_width)
-        estimate, limits = estimate_double_peaks(leveled_data_smooth, x, filter_width)
-
-        params = self.make_params()
-        params['amplitude_1'].set(value=estimate['height'][0],
-                                  min=limits['height'][0][0],
-                                  max=limits['height'][0][1])
-        params['amplitude_2'].set(value=estimate['height'][1],
-                                  min=limits['height'][1][0],
-                                  max=limits['height'][1][1])
-        params['center_1'].set(value=estimate['center'][0],
-                               min=limits['center'][0][0],
-                               max=limits['center'][0][1])
-        params['center_2'].set(value=estimate['center'][1],
-                               min=limits['center'][1][0],
-                               max=limits['center'][1][1])
-        params['sigma_1'].set(value=estimate['fwhm'][0] / 2.3548,
-                              min=limits['fwhm'][0][0] / 2.3548,
-                              max=limits['fwhm'][0][1] / 2.3548)
-        params['sigma_2'].set(value=estimate['fwhm'][1] / 2.3548,
-                              min=limits['fwhm'][1][0] / 2.3548,
-                              max=limits['fwhm'][1][1] / 2.3548)
-        return params
+        return _estimate_multiple_peaks(self, data, x, peak_count=2)
 
     @estimator('Dips')
     def estimate_dips(self, data, x):
@@ -201,6 +279,10 @@ class DoubleLorentzian(FitModelBase):
 class TripleLorentzian(FitModelBase):
     """ ToDo: Document
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2', 'amplitude_3')
+    use_variable_projection = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -222,43 +304,23 @@ class TripleLorentzian(FitModelBase):
                                             (sigma_1, sigma_2, sigma_3),
                                             (amplitude_1, amplitude_2, amplitude_3))
 
+    @staticmethod
+    def _model_jacobian(x, offset, center_1, center_2, center_3, sigma_1, sigma_2, sigma_3,
+                        amplitude_1, amplitude_2, amplitude_3):
+        jacobian = {'offset': 1.}
+        for ii, derivatives in enumerate(
+                multiple_lorentzian_derivatives(x,
+                                                (center_1, center_2, center_3),
+                                                (sigma_1, sigma_2, sigma_3),
+                                                (amplitude_1, amplitude_2, amplitude_3)),
+                1):
+            jacobian.update(zip((f'center_{ii:d}', f'sigma_{ii:d}', f'amplitude_{ii:d}'),
+                                derivatives))
+        return jacobian
+
     @estimator('Peaks')
     def estimate_peaks(self, data, x):
-        data, x = sort_check_data(data, x)
-        data_smoothed, filter_width = smooth_data(data)
-        leveled_data_smooth, offset = correct_offset_histogram(data_smoothed,
-                                                               bin_width=2 * filter_width)
-        estimate, limits = estimate_triple_peaks(leveled_data_smooth, x, filter_width)
-
-        params = self.make_params()
-        params['amplitude_1'].set(value=estimate['height'][0],
-                                  min=limits['height'][0][0],
-                                  max=limits['height'][0][1])
-        params['amplitude_2'].set(value=estimate['height'][1],
-                                  min=limits['height'][1][0],
-                                  max=limits['height'][1][1])
-        params['amplitude_3'].set(value=estimate['height'][2],
-                                  min=limits['height'][2][0],
-                                  max=limits['height'][2][1])
-        params['center_1'].set(value=estimate['center'][0],
-                               min=limits['center'][0][0],
-                               max=limits['center'][0][1])
-        params['center_2'].set(value=estimate['center'][1],
-                               min=limits['center'][1][0],
-                               max=limits['center'][1][1])
-        params['center_3'].set(value=estimate['center'][2],
-                               min=limits['center'][2][0],
-                               max=limits['center'][2][1])
-        params['sigma_1'].set(value=estimate['fwhm'][0] / 2.3548,
-                              min=limits['fwhm'][0][0] / 2.3548,
-                              max=limits['fwhm'][0][1] / 2.3548)
-        params['sigma_2'].set(value=estimate['fwhm'][1] / 2.3548,
-                              min=limits['fwhm'][1][0] / 2.3548,
-                              max=limits['fwhm'][1][1] / 2.3548)
-        params['sigma_3'].set(value=estimate['fwhm'][2] / 2.3548,
-                              min=limits['fwhm'][2][0] / 2.3548,
-                              max=limits['fwhm'][2][1] / 2.3548)
-        return params
+        return _estimate_multiple_peaks(self, data, x, peak_count=3)
 
     @estimator('Dips')
     def estimate_dips(self, data, x):
@@ -281,6 +343,9 @@ class TripleLorentzian(FitModelBase):
 class LorentzianLinear(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'slope', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -294,40 +359,39 @@ class LorentzianLinear(FitModelBase):
         x0 = (x - min(x))
         return offset + x0 * slope + multiple_lorentzian(x, (center,), (sigma,), (amplitude,))
 
+    @staticmethod
+    def _model_jacobian(x, offset, slope, center, sigma, amplitude):
+        (d_center, d_sigma, d_amplitude), = multiple_lorentzian_derivatives(x,
+                                                                            (center,),
+                                                                            (sigma,),
+                                                                            (amplitude,))
+        return {'offset': 1.,
+                'slope': x - min(x),
+                'center': d_center,
+                'sigma': d_sigma,
+                'amplitude': d_amplitude}
+
     @estimator('Peak')
     def estimate_peak(self, data, x):
         data, x = sort_check_data(data, x)
-        data_span = abs(max(data) - min(data))
-
-        # Perform a normal Lorentzian peak fit and subtract the result from data
-        model = Lorentzian()
-        gauss_fit = model.fit(data, model.estimate_peak(data, x), x=x)
-        data_sub = data - gauss_fit.best_fit
-        # Perform a linear fit in subtracted data in order to estimate slope
-        model = Linear()
-        linear_fit = model.fit(data_sub, model.estimate(data_sub, x), x=x)
-        offset = linear_fit['offset'] + min(x) * linear_fit['slope']
+        estimate, limits = estimate_multiple_peaks(data, x, peak_count=1, linear_baseline=True)
 
-        # Merge fit results into parameter estimates
-        estimate = self.make_params()
-        estimate['offset'].set(value=offset,
-                               min=min(data) - data_span / 2,
-                               max=max(data) + data_span / 2,
-                               vary=True)
-        estimate['slope'].set(value=linear_fit['slope'].value, min=-np.inf, max=np.inf, vary=True)
-        estimate['amplitude'].set(value=gauss_fit['amplitude'].value,
-                                  min=gauss_fit['amplitude'].min,
-                                  max=gauss_fit['amplitude'].max,
-                                  vary=True)
-        estimate['center'].set(value=gauss_fit['center'].value,
-                               min=gauss_fit['center'].min,
-                               max=gauss_fit['center'].max,
-                               vary=True)
-        estimate['sigma'].set(value=gauss_fit['sigma'].value,
-                              min=gauss_fit['sigma'].min,
-                              max=gauss_fit['sigma'].max,
-                              vary=True)
-        return estimate
+        # Offset of the linear baseline refers to min(x), i.e. x[0] of sorted data
+        params = self.make_params()
+        params['offset'].set(value=estimate['offset'],
+                             min=limits['offset'][0],
+                             max=limits['offset'][1])
+        params['slope'].set(value=estimate['slope'], min=-np.inf, max=np.inf)
+        params['amplitude'].set(value=estimate['height'][0],
+                                min=limits['height'][0][0],
+                                max=limits['height'][0][1])
+        params['center'].set(value=estimate['center'][0],
+                             min=limits['center'][0][0],
+                             max=limits['center'][0][1])
+        params['sigma'].set(value=estimate['fwhm'][0] / 2,
+                            min=limits['fwhm'][0][0] / 2,
+                            max=limits['fwhm'][0][1] / 2)
+        return params
 
     @estimator('Dip')
     def estimate_dip(self, data, x):
@@ -335,6 +399,9 @@ class LorentzianLinear(FitModelBase):
         estimate['offset'].set(value=-estimate['offset'].value,
                                min=-estimate['offset'].max,
                                max=-estimate['offset'].min)
+        estimate['slope'].set(value=-estimate['slope'].value,
+                              min=-estimate['slope'].max,
+                              max=-estimate['slope'].min)
         estimate['amplitude'].set(value=-estimate['amplitude'].value,
                                   min=-estimate['amplitude'].max,
                                   max=-estimate['amplitude'].min)
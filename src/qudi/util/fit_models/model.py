@@ -22,11 +22,49 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 __all__ = ('estimator', 'FitCompositeModelBase', 'FitCompositeModelMeta', 'FitModelBase',
-           'FitModelMeta')
+           'FitModelMeta', 'FIT_OBJECTIVES', 'poisson_deviance_residual')
 
 import inspect
+import logging
+import threading
+import numpy as np
 from abc import ABCMeta, abstractmethod
-from lmfit import Model, CompositeModel
+from lmfit import Model, CompositeModel, Parameter
+from scipy.optimize import least_squares
+from scipy.special import xlogy
+
+_log = logging.getLogger(__name__)
+
+# Available objectives for FitModelBase.fit
+FIT_OBJECTIVES = ('least_squares', 'poisson')
+# Objective of the fit currently running in this thread (see FitModelBase.fit)
+_fit_objective = threading.local()
+# Lower limit of model values (expected counts) in Poisson deviance residuals
+_MIN_POISSON_RATE = 1e-12
+# Relative step size of forward finite differences (see FitModelBase.eval_jacobian)
+_FINITE_DIFFERENCE_STEP = np.sqrt(np.finfo(float).eps)
+
+
+def poisson_deviance_residual(data, model):
+    """ Signed Poisson deviance residuals sign(data - model) * sqrt(2 * (model - data +
+    data * log(data / model))) of count data. The sum of squares of these residuals is the Poisson
+    deviance, i.e. -2 * log-likelihood up to a constant, so minimizing it by least squares yields
+    the Poisson maximum-likelihood estimate. Model values are clipped to a small positive value.
+
+    @param numpy.ndarray data: Non-negative count data
+    @param numpy.ndarray model: Model values (expected counts) for each data point
+
+    @return numpy.ndarray, numpy.ndarray: residuals and their derivatives with respect to model
+    """
+    model = np.maximum(model, _MIN_POISSON_RATE)
+    deviance = 2 * (model - data + xlogy(data, data / model))
+    residual = np.copysign(np.sqrt(np.maximum(deviance, 0)), data - model)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Limit of (1 - data / model) / residual for residual -> 0 is -1 / sqrt(model)
+        derivative = np.where(residual == 0,
+                              -1 / np.sqrt(model),
+                              (1 - data / model) / residual)
+    return residual, derivative
 
 
 def estimator(name):
@@ -81,8 +119,32 @@ class FitCompositeModelMeta(type):
 
 class FitModelBase(Model, metaclass=FitModelMeta):
     """ ToDo: Document
+
+    Subclasses can provide analytic partial derivatives of "_model_function" by implementing the
+    staticmethod "_model_jacobian" with the same signature. It must return a dict with parameter
+    names as keys and the partial derivative (array or scalar) of the model with respect to this
+    parameter as values. If available, the analytic Jacobian is used in "fit" for the default
+    "leastsq" method instead of finite differences (saving N+1 model evaluations per iteration).
+
+    Models with analytic Jacobian can list the names of parameters the model function depends on
+    linearly in "_linear_parameters" (e.g. offset and amplitudes). If "use_variable_projection" is
+    set, these parameters are eliminated by variable projection before running the "leastsq" fit,
+    i.e. only the nonlinear parameters are optimized while the linear ones are solved exactly by
+    (weighted) linear least squares for each set of nonlinear parameters. Models that are linear
+    in all parameters are solved in closed form. The final fit is started from this solution and
+    usually converges within a few iterations. This mostly pays off for models with many coupled
+    parameters (e.g. multiple peaks), so it is disabled by default.
     """
 
+    # Optional staticmethod returning the analytic partial derivatives of "_model_function"
+    _model_jacobian = None
+    # Set to False in order to always use finite-difference Jacobians
+    use_analytic_jacobian = True
+    # Names of parameters the model function depends on linearly (requires "_model_jacobian")
+    _linear_parameters = tuple()
+    # Set to True in order to eliminate linear parameters by variable projection before fitting
+    use_variable_projection = False
+
     def __init__(self, **kwargs):
         kwargs['name'] = self.__class__.__name__
         super().__init__(self._model_function, **kwargs)
@@ -108,6 +170,272 @@ class FitModelBase(Model, metaclass=FitModelMeta):
         """
         raise NotImplementedError('FitModel object must implement staticmethod "_model_function".')
 
+    def eval_jacobian(self, params=None, var_names=None, **kwargs):
+        """ Evaluates the partial derivatives of the model (see lmfit.Model.eval) with respect to
+        the given parameters. Uses the analytic Jacobian ("_model_jacobian") if available and no
+        parameter is constrained by an expression. Uses forward finite differences otherwise.
+
+        @param lmfit.Parameters params: optional, parameters to evaluate the Jacobian for
+        @param iterable var_names: optional, names of the parameters to calculate the partial
+                                   derivatives for (default: all varying parameters)
+        @param kwargs: independent variable and parameter value overrides (see lmfit.Model.eval)
+
+        @return numpy.ndarray: Jacobian of the flattened model values with one column per
+                               parameter in var_names
+        """
+        params = self.make_params() if params is None else params
+        if var_names is None:
+            var_names = [name for name, par in params.items() if par.vary]
+        var_names = list(var_names)
+        if self._model_jacobian is not None and self.use_analytic_jacobian and \
+                not set(var_names).difference(self.param_names) and \
+                not any(par.expr for par in params.values()):
+            prefix_length = len(self.prefix)
+            derivatives = self._model_jacobian(**self.make_funcargs(params, kwargs))
+            size = max(np.size(value) for value in derivatives.values())
+            # Fill in column-major layout, so the transposed Jacobian is C-contiguous
+            jacobian = np.empty((len(var_names), size))
+            for row, name in zip(jacobian, var_names):
+                row[:] = np.ravel(derivatives[name[prefix_length:]])
+            return jacobian.T
+
+        model = np.ravel(self.eval(params, **kwargs))
+        jacobian = np.empty((len(var_names), model.size))
+        shifted = params.copy()
+        for row, name in zip(jacobian, var_names):
+            value = params[name].value
+            step = _FINITE_DIFFERENCE_STEP * abs(value) or _FINITE_DIFFERENCE_STEP
+            # Parameter bounds clip the shifted value. Step backwards if necessary.
+            shifted[name].value = value + step
+            if shifted[name].value == value:
+                shifted[name].value = value - step
+            step = shifted[name].value - value
+            if step == 0:
+                row[:] = 0
+            else:
+                row[:] = np.ravel(self.eval(shifted, **kwargs))
+                row -= model
+                row /= step
+            shifted[name].value = value
+        return jacobian.T
+
+    def fit(self, data, params=None, weights=None, method='leastsq', iter_cb=None,
+            scale_covar=True, verbose=False, fit_kws=None, nan_policy=None,
+            objective='least_squares', **kwargs):
+        """ See lmfit.Model.fit. Uses the analytic Jacobian of the model and variable projection of
+        linear parameters (if available).
+
+        With objective "poisson", the Poisson likelihood of non-negative count data is maximized
+        instead of minimizing the sum of squared residuals. The fit residuals are then the signed
+        Poisson deviance residuals (see poisson_deviance_residual), optionally multiplied by
+        weights, and the reduced chi-square is the deviance per degree of freedom.
+
+        @param str objective: optional, fit objective to use (see FIT_OBJECTIVES)
+        """
+        if objective not in FIT_OBJECTIVES:
+            raise ValueError(f'Invalid fit objective "{objective}". Must be one of '
+                             f'{FIT_OBJECTIVES}.')
+        if objective == 'poisson':
+            if np.iscomplexobj(data):
+                raise ValueError('Poisson likelihood fit objective requires real count data.')
+            if np.any(np.asarray(data) < 0):
+                raise ValueError('Poisson likelihood fit objective requires non-negative data.')
+        if self._analytic_jacobian_applicable(data, params, method, fit_kws, nan_policy, kwargs):
+            fit_kws = dict() if fit_kws is None else fit_kws.copy()
+            fit_kws['Dfun'] = self._residual_jacobian
+            fit_kws['col_deriv'] = True
+        if self._variable_projection_applicable(data, params, method, nan_policy, kwargs):
+            kwargs.update(self._variable_projection(data, params, weights, kwargs))
+        last_objective = getattr(_fit_objective, 'value', 'least_squares')
+        _fit_objective.value = objective
+        _fit_objective.last_derivative = (None, None)
+        try:
+            return super().fit(data,
+                               params=params,
+                               weights=weights,
+                               method=method,
+                               iter_cb=iter_cb,
+                               scale_covar=scale_covar,
+                               verbose=verbose,
+                               fit_kws=fit_kws,
+                               nan_policy=nan_policy,
+                               **kwargs)
+        finally:
+            _fit_objective.value = last_objective
+
+    def _analytic_jacobian_applicable(self, data, params, method, fit_kws, nan_policy, kwargs):
+        """ Check if the analytic model Jacobian can be used for the given fit arguments. This is
+        not the case for constrained parameters (expressions) or additional parameters that do not
+        belong to the model, NaN handling other than "raise" and complex data.
+        """
+        if self._model_jacobian is None or not self.use_analytic_jacobian:
+            return False
+        if method != 'leastsq' or (fit_kws is not None and 'Dfun' in fit_kws):
+            return False
+        if (self.nan_policy if nan_policy is None else nan_policy) != 'raise':
+            return False
+        if np.iscomplexobj(data):
+            return False
+        if params is None:
+            params = self.make_params()
+        if set(params).difference(self.param_names):
+            return False
+        if any(par.expr for par in params.values()):
+            return False
+        if any(isinstance(val, Parameter) and val.expr for val in kwargs.values()):
+            return False
+        return True
+
+    def _variable_projection_applicable(self, data, params, method, nan_policy, kwargs):
+        """ Check if linear parameters can be eliminated by variable projection prior to the fit.
+        Same restrictions as for the analytic Jacobian apply. Additionally parameter values must
+        not be overridden by keyword arguments.
+        """
+        if not self._linear_parameters or not self.use_variable_projection:
+            return False
+        if self._model_jacobian is None or method != 'leastsq':
+            return False
+        if (self.nan_policy if nan_policy is None else nan_policy) != 'raise':
+            return False
+        if np.iscomplexobj(data):
+            return False
+        if params is None:
+            params = self.make_params()
+        if set(params).difference(self.param_names) or set(kwargs).intersection(self.param_names):
+            return False
+        return not any(par.expr for par in params.values())
+
+    def _variable_projection(self, data, params, weights, kwargs):
+        """ Optimizes the varying nonlinear parameters with the linear parameters being solved by
+        (weighted) linear least squares in each step (variable projection). Bounds of linear
+        parameters are not enforced during the optimization. If the projection fails or the
+        solution is not strictly within all parameter bounds, an empty dict is returned and the fit
+        starts from the initial parameters.
+
+        @return dict: start values of varying parameters (parameter name as key)
+        """
+        params = self.make_params() if params is None else params
+        prefix_length = len(self.prefix)
+        linear_names = [self.prefix + name for name in self._linear_parameters if
+                        params[self.prefix + name].vary]
+        nonlinear_names = [name for name, par in params.items() if
+                           par.vary and name not in linear_names]
+        if not linear_names:
+            return dict()
+        x = kwargs[self.independent_vars[0]]
+        data = np.ravel(data)
+        weights = None if weights is None else np.broadcast_to(np.ravel(weights), data.shape)
+        values = {name[prefix_length:]: par.value for name, par in params.items()}
+        linear_keys = [name[prefix_length:] for name in linear_names]
+        nonlinear_keys = [name[prefix_length:] for name in nonlinear_names]
+
+        last_solution = dict()
+
+        def solve_linear(nonlinear_values):
+            values.update(zip(nonlinear_keys, nonlinear_values))
+            derivatives = self._model_jacobian(x, **values)
+            basis = np.empty((data.size, len(linear_keys)))
+            for column, key in enumerate(linear_keys):
+                basis[:, column] = derivatives[key]
+                values[key] = 0
+            # Remaining model contribution of fixed linear parameters and nonlinear terms
+            remainder = data - self._model_function(x, **values)
+            if weights is not None:
+                basis *= weights[:, None]
+                remainder = remainder * weights
+            coefficients = np.linalg.lstsq(basis, remainder, rcond=None)[0]
+            values.update(zip(linear_keys, coefficients))
+            last_solution.update(nonlinear_values=tuple(nonlinear_values), basis=basis)
+            return remainder - basis @ coefficients
+
+        def projected_jacobian(nonlinear_values):
+            # Kaufman approximation of the variable projection Jacobian. The least-squares
+            # optimizer evaluates the Jacobian right after the residual at the same point.
+            if last_solution['nonlinear_values'] != tuple(nonlinear_values):
+                solve_linear(nonlinear_values)
+            derivatives = self._model_jacobian(x, **values)
+            jacobian = np.empty((data.size, len(nonlinear_keys)))
+            for column, key in enumerate(nonlinear_keys):
+                jacobian[:, column] = derivatives[key]
+            if weights is not None:
+                jacobian *= weights[:, None]
+            orthonormal_basis = np.linalg.qr(last_solution['basis'])[0]
+            return orthonormal_basis @ (orthonormal_basis.T @ jacobian) - jacobian
+
+        try:
+            if nonlinear_names:
+                lower = np.array([params[name].min for name in nonlinear_names], dtype=float)
+                upper = np.array([params[name].max for name in nonlinear_names], dtype=float)
+                start = np.clip([params[name].value for name in nonlinear_names], lower, upper)
+                result = least_squares(solve_linear,
+                                       start,
+                                       jac=projected_jacobian,
+                                       bounds=(lower, upper),
+                                       x_scale='jac',
+                                       max_nfev=100 * (start.size + 1))
+                if not result.success:
+                    return dict()
+                solve_linear(result.x)
+            else:
+                solve_linear(tuple())
+        except (ValueError, np.linalg.LinAlgError):
+            _log.debug('Variable projection failed. Using initial parameters.', exc_info=True)
+            return dict()
+
+        solution = {name: values[name[prefix_length:]] for name in nonlinear_names + linear_names}
+        if all(params[name].min < value < params[name].max and np.isfinite(value) for
+               name, value in solution.items()):
+            return solution
+        return dict()
+
+    def _residual(self, params, data, weights, **kwargs):
+        """ See lmfit.Model._residual. Returns (data - model) * weights for real data independent of
+        the lmfit version (older versions return (model - data) * weights), since the sign must
+        match the analytic Jacobian (see _residual_jacobian). Returns weighted Poisson deviance
+        residuals instead if the current fit uses the Poisson likelihood objective.
+        """
+        poisson = getattr(_fit_objective, 'value', 'least_squares') == 'poisson'
+        if not poisson and np.iscomplexobj(data):
+            return super()._residual(params, data, weights, **kwargs)
+        model = self.eval(params, **kwargs)
+        if self.nan_policy == 'raise' and not np.all(np.isfinite(model)):
+            raise ValueError('The model function generated NaN values and the fit aborted! '
+                             'Please check your model function and/or set boundaries on '
+                             'parameters where applicable.')
+        if poisson:
+            residual, derivative = poisson_deviance_residual(np.ravel(data), np.ravel(model))
+            # The Jacobian is usually requested next for the same parameter values
+            _fit_objective.last_derivative = (tuple(p.value for p in params.values()), derivative)
+        elif np.iscomplexobj(model):
+            return super()._residual(params, data, weights, **kwargs)
+        else:
+            residual = np.ravel(np.subtract(data, model, dtype=float))
+        if weights is not None:
+            residual *= np.ravel(weights)
+        return residual
+
+    def _residual_jacobian(self, params, data, weights, **kwargs):
+        """ Analytic Jacobian of the residual (see _residual) with respect to all varying
+        parameters in column-major layout (one row per varying parameter).
+        """
+        var_names = [name for name, par in params.items() if par.vary]
+        jacobian = self.eval_jacobian(params, var_names, **kwargs).T
+        if getattr(_fit_objective, 'value', 'least_squares') == 'poisson':
+            # chain rule with the derivative of the deviance residual with respect to the model
+            last_values, residual_derivative = _fit_objective.last_derivative
+            if last_values != tuple(p.value for p in params.values()):
+                _, residual_derivative = poisson_deviance_residual(
+                    np.ravel(data),
+                    np.ravel(self.eval(params, **kwargs))
+                )
+            jacobian *= residual_derivative
+        else:
+            # residual is (data - model) * weights
+            jacobian *= -1
+        if weights is not None:
+            jacobian *= np.ravel(weights)
+        return jacobian
+
 
 class FitCompositeModelBase(CompositeModel, metaclass=FitCompositeModelMeta):
     """ ToDo: Document
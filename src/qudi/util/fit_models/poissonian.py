@@ -20,18 +20,52 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
-__all__ = ('DoublePoissonian', 'Poissonian', 'multiple_poissonian')
+__all__ = ('DoublePoissonian', 'Poissonian', 'multiple_poissonian',
+           'multiple_poissonian_derivatives')
 
+import math
 import numpy as np
 from scipy.special import gammaln, xlogy
 from qudi.util.fit_models.model import FitModelBase, estimator
 from qudi.util.fit_models.helpers import smooth_data, sort_check_data, estimate_double_peaks
+from qudi.util.fit_models.helpers import compile_kernel, evaluate_kernel
 from qudi.util.fit_models.gaussian import multiple_gaussian
 
 
+def _multiple_poissonian_kernel(x, mus, amplitudes, out):
+    for ii in range(x.size):
+        log_factorial = math.lgamma(x[ii] + 1)
+        value = 0.
+        for jj in range(mus.size):
+            # xlogy(x, mu) is defined as 0 for x == 0
+            x_log_mu = 0. if x[ii] == 0 else x[ii] * np.log(mus[jj])
+            value += amplitudes[jj] * np.exp(x_log_mu - log_factorial - mus[jj])
+        out[ii] = value
+
+
+_compiled_multiple_poissonian_kernel = compile_kernel(_multiple_poissonian_kernel)
+
+
+def _multiple_poissonian_numpy(x, mus, amplitudes):
+    # Evaluates all Poissonians in-place using a single buffer array. The log-factorial term does
+    # not depend on mu and is calculated only once.
+    x = np.asarray(x)
+    log_factorial = gammaln(x + 1)
+    result = np.zeros(x.shape, dtype=np.result_type(x, 1.))
+    buffer = np.empty_like(result)
+    for mu, amp in zip(mus, amplitudes):
+        xlogy(x, mu, out=buffer)
+        buffer -= log_factorial
+        buffer -= mu
+        np.exp(buffer, out=buffer)
+        buffer *= amp
+        result += buffer
+    return result[()]
+
+
 def multiple_poissonian(x, mus, amplitudes):
     """ Mathematical definition of the sum of multiple scaled Poissonian distributions without any
-    bias.
+    bias. Evaluated in a single pass by a compiled kernel if numba is available.
 
     WARNING: iterable parameters "mus", and "amplitudes" must have same length.
 
@@ -48,16 +82,48 @@ def multiple_poissonian(x, mus, amplitudes):
     # large values of mu, we define a cut-off value of 1e6. If our independent variables x are at
     # or above this value, we will switch to calculating a normal distribution. This ensures that
     # this function will remain numerically stable for very large values of x and mu.
-    if min(x) < 1e6:
-        return sum(np.exp(xlogy(x, mu) - gammaln(x + 1) - mu) for mu, amp in
-                   zip(mus, amplitudes, amplitudes))
+    if np.min(x) < 1e6:
+        if _compiled_multiple_poissonian_kernel is None:
+            return _multiple_poissonian_numpy(x, mus, amplitudes)
+        return evaluate_kernel(_compiled_multiple_poissonian_kernel, x, mus, amplitudes)
     else:
         return multiple_gaussian(x, mus, np.sqrt(mus), amplitudes)
 
 
+def multiple_poissonian_derivatives(x, mus, amplitudes):
+    """ Analytic partial derivatives of multiple_poissonian with respect to mu and amplitude of
+    each Poissonian.
+
+    @param float x: The independent variable
+    @param iterable mus: Iterable containing center positions for all Poissonians
+    @param iterable amplitudes: Iterable containing amplitudes for all Poissonians
+
+    @return list: (d/d_mu, d/d_amplitude) tuple for each Poissonian
+    """
+    assert len(mus) == len(amplitudes)
+    x = np.asarray(x)
+    derivatives = list()
+    # Same cut-off value as in multiple_poissonian
+    if np.min(x) < 1e6:
+        log_factorial = gammaln(x + 1)
+        for mu, amp in zip(mus, amplitudes):
+            shape = np.exp(xlogy(x, mu) - log_factorial - mu)
+            derivatives.append((amp * shape * (x / mu - 1), shape))
+    else:
+        # Gaussian with center mu, sigma sqrt(mu) and amplitude as peak height
+        for mu, amp in zip(mus, amplitudes):
+            dx = x - mu
+            shape = np.exp(-dx ** 2 / (2 * mu))
+            d_mu = amp * shape * (dx / mu + dx ** 2 / (2 * mu ** 2))
+            derivatives.append((d_mu, shape))
+    return derivatives
+
+
 class Poissonian(FitModelBase):
     """
     """
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -68,6 +134,11 @@ class Poissonian(FitModelBase):
     def _model_function(x, offset, mu, amplitude):
         return offset + multiple_poissonian(x, (mu,), (amplitude,))
 
+    @staticmethod
+    def _model_jacobian(x, offset, mu, amplitude):
+        (d_mu, d_amplitude), = multiple_poissonian_derivatives(x, (mu,), (amplitude,))
+        return {'offset': 1., 'mu': d_mu, 'amplitude': d_amplitude}
+
     @estimator('default')
     def estimate(self, data, x):
         data, x = sort_check_data(data, x)
@@ -106,6 +177,8 @@ class Poissonian(FitModelBase):
 class DoublePoissonian(FitModelBase):
     """
     """
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0, min=-np.inf, max=np.inf)
@@ -118,6 +191,16 @@ class DoublePoissonian(FitModelBase):
     def _model_function(x, offset, mu_1, mu_2, amplitude_1, amplitude_2):
         return offset + multiple_poissonian(x, (mu_1, mu_2), (amplitude_1, amplitude_2))
 
+    @staticmethod
+    def _model_jacobian(x, offset, mu_1, mu_2, amplitude_1, amplitude_2):
+        (d_mu_1, d_amplitude_1), (d_mu_2, d_amplitude_2) = multiple_poissonian_derivatives(
+            x,
+            (mu_1, mu_2),
+            (amplitude_1, amplitude_2)
+        )
+        return {'offset': 1., 'mu_1': d_mu_1, 'mu_2': d_mu_2, 'amplitude_1': d_amplitude_1,
+                'amplitude_2': d_amplitude_2}
+
     @estimator('default')
     def estimate(self, data, x):
         data, x = sort_check_data(data, x)
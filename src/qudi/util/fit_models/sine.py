@@ -20,7 +20,8 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
-__all__ = ('Sine', 'DoubleSine', 'ExponentialDecaySine', 'estimate_frequency_ft')
+__all__ = ('Sine', 'DoubleSine', 'ExponentialDecaySine', 'estimate_frequency_ft',
+           'estimate_phase_lsq')
 
 import numpy as np
 from qudi.util.math import compute_ft
@@ -35,9 +36,33 @@ def estimate_frequency_ft(data, x):
     return abs(dft_x[dft_y.argmax()]), (dft_x, dft_y)
 
 
+def estimate_phase_lsq(data, x, frequency, envelope=None):
+    """ Estimates amplitude and phase of a sine with known frequency (and optional envelope) in
+    data by linear least-squares projection of data onto the sine and cosine basis functions:
+        data = a * envelope * sin(2*pi*frequency*x) + b * envelope * cos(2*pi*frequency*x)
+        --> amplitude = sqrt(a**2 + b**2), phase = arctan2(b, a)
+
+    @param numpy.ndarray data: oscillating data without offset
+    @param numpy.ndarray x: x values of data
+    @param float frequency: frequency of the sine
+    @param numpy.ndarray envelope: optional, envelope of the sine (e.g. exponential decay)
+
+    @return float, float: amplitude and phase (in the interval [-pi, pi]) of the sine
+    """
+    argument = 2 * np.pi * frequency * np.asarray(x)
+    basis = np.column_stack((np.sin(argument), np.cos(argument)))
+    if envelope is not None:
+        basis *= np.asarray(envelope)[:, None]
+    (sin_coeff, cos_coeff), _, _, _ = np.linalg.lstsq(basis, data, rcond=None)
+    return np.hypot(sin_coeff, cos_coeff), np.arctan2(cos_coeff, sin_coeff)
+
+
 class Sine(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -49,6 +74,15 @@ class Sine(FitModelBase):
     def _model_function(x, offset, amplitude, frequency, phase):
         return offset + amplitude * np.sin(2 * np.pi * frequency * x + phase)
 
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude, frequency, phase):
+        argument = 2 * np.pi * frequency * x + phase
+        d_phase = amplitude * np.cos(argument)
+        return {'offset': 1.,
+                'amplitude': np.sin(argument),
+                'frequency': 2 * np.pi * x * d_phase,
+                'phase': d_phase}
+
     @estimator('default')
     def estimate(self, data, x):
         data, x = sort_check_data(data, x)
@@ -71,17 +105,8 @@ class Sine(FitModelBase):
 
         frequency, _ = estimate_frequency_ft(data, x)
 
-        # Find an estimate for the phase
-        # Procedure: Create sin waves with different phases and perform a summation.
-        #            The sum shows how well the sine was fitting to the actual data.
-        #            The best fitting sine should be a maximum of the summed time
-        #            trace.
-        iter_steps = max(1, int(round(1 / (frequency * x_step))))
-        test_phases = 2 * np.pi * np.arange(iter_steps) / iter_steps
-        sum_res = np.zeros(iter_steps)
-        for ii, phase in enumerate(test_phases):
-            sum_res[ii] = np.abs(data - amplitude * np.sin(2 * np.pi * frequency * x + phase)).sum()
-        phase = test_phases[sum_res.argmax()] - np.pi  # Maximum sum value corresponds to worst fit
+        # Find an estimate for the phase by least-squares projection onto sine and cosine
+        _, phase = estimate_phase_lsq(data, x, frequency)
 
         estimate = self.make_params()
         estimate['frequency'].set(value=frequency, min=0, max=1 / (2 * x_step), vary=True)
@@ -115,6 +140,9 @@ class Sine(FitModelBase):
 class DoubleSine(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -132,6 +160,19 @@ class DoubleSine(FitModelBase):
         result += amplitude_2 * np.sin(2 * np.pi * frequency_2 * x + phase_2)
         return result + offset
 
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude_1, amplitude_2, frequency_1, frequency_2, phase_1,
+                        phase_2):
+        jacobian = {'offset': 1.}
+        for ii, (amp, freq, phase) in enumerate(((amplitude_1, frequency_1, phase_1),
+                                                 (amplitude_2, frequency_2, phase_2)), 1):
+            argument = 2 * np.pi * freq * x + phase
+            d_phase = amp * np.cos(argument)
+            jacobian[f'amplitude_{ii:d}'] = np.sin(argument)
+            jacobian[f'frequency_{ii:d}'] = 2 * np.pi * x * d_phase
+            jacobian[f'phase_{ii:d}'] = d_phase
+        return jacobian
+
     @estimator('default')
     def estimate(self, data, x):
         x_span = abs(max(x) - min(x))
@@ -190,6 +231,9 @@ class DoubleSine(FitModelBase):
 class ExponentialDecaySine(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -204,6 +248,24 @@ class ExponentialDecaySine(FitModelBase):
         return offset + amplitude * np.exp(-(x / decay) ** stretch) * np.sin(
             2 * np.pi * frequency * x + phase)
 
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude, frequency, phase, decay, stretch):
+        scaled_x = x / decay
+        power = scaled_x ** stretch
+        envelope = np.exp(-power)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # limit of power * log(scaled_x) for scaled_x -> 0 is 0
+            power_log = np.where(scaled_x == 0, 0., power * np.log(scaled_x))
+        argument = 2 * np.pi * frequency * x + phase
+        sine = amplitude * envelope * np.sin(argument)
+        d_phase = amplitude * envelope * np.cos(argument)
+        return {'offset': 1.,
+                'amplitude': envelope * np.sin(argument),
+                'frequency': 2 * np.pi * x * d_phase,
+                'phase': d_phase,
+                'decay': sine * power * stretch / decay,
+                'stretch': -sine * power_log}
+
     @estimator('Decay')
     def estimate_decay(self, data, x):
         x_span = abs(max(x) - min(x))
@@ -241,17 +303,10 @@ class ExponentialDecaySine(FitModelBase):
         #     s += dft_y[i] * abs(dft_x[1] - dft_x[0]) / max(dft_y)
         # lifetime_val = 0.5 / s
 
-        # Find an estimate for the phase
-        # Procedure: Create sin waves with different phases and perform a summation.
-        #            The sum shows how well the sine was fitting to the actual data.
-        #            The best fitting sine should be a maximum of the summed time
-        #            trace.
-        iter_steps = max(1, int(round(1 / (frequency * x_step))))
-        test_phases = 2 * np.pi * np.arange(iter_steps) / iter_steps
-        sum_res = np.zeros(iter_steps)
-        for ii, phase in enumerate(test_phases):
-            sum_res[ii] = np.abs(data - amplitude * np.sin(2 * np.pi * frequency * x + phase)).sum()
-        phase = test_phases[sum_res.argmax()] - np.pi  # Maximum sum value corresponds to worst fit
+        # Find an estimate for the phase by least-squares projection onto the decaying sine and
+        # cosine (envelope relative to x[0], phase is independent of the envelope scale)
+        envelope = np.exp(-(x - x[0]) / decay) if np.isfinite(decay) and decay > 0 else None
+        _, phase = estimate_phase_lsq(data, x, frequency, envelope)
 
         estimate = self.make_params()
         estimate['frequency'].set(value=frequency, min=0, max=1 / (2 * x_step), vary=True)
@@ -276,6 +331,9 @@ class ExponentialDecaySine(FitModelBase):
 class ExponentialDecayDoubleSine(FitModelBase):
     """
     """
+
+    _linear_parameters = ('offset', 'amplitude_1', 'amplitude_2')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.set_param_hint('offset', value=0., min=-np.inf, max=np.inf)
@@ -295,6 +353,29 @@ class ExponentialDecayDoubleSine(FitModelBase):
         result += amplitude_2 * np.sin(2 * np.pi * frequency_2 * x + phase_2)
         return np.exp(-(x / decay) ** stretch) * result + offset
 
+    @staticmethod
+    def _model_jacobian(x, offset, amplitude_1, amplitude_2, frequency_1, frequency_2, phase_1,
+                        phase_2, decay, stretch):
+        scaled_x = x / decay
+        power = scaled_x ** stretch
+        envelope = np.exp(-power)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # limit of power * log(scaled_x) for scaled_x -> 0 is 0
+            power_log = np.where(scaled_x == 0, 0., power * np.log(scaled_x))
+        jacobian = {'offset': 1.}
+        sines = 0
+        for ii, (amp, freq, phase) in enumerate(((amplitude_1, frequency_1, phase_1),
+                                                 (amplitude_2, frequency_2, phase_2)), 1):
+            argument = 2 * np.pi * freq * x + phase
+            sines = sines + amp * np.sin(argument)
+            d_phase = amp * envelope * np.cos(argument)
+            jacobian[f'amplitude_{ii:d}'] = envelope * np.sin(argument)
+            jacobian[f'frequency_{ii:d}'] = 2 * np.pi * x * d_phase
+            jacobian[f'phase_{ii:d}'] = d_phase
+        jacobian['decay'] = sines * envelope * power * stretch / decay
+        jacobian['stretch'] = -sines * envelope * power_log
+        return jacobian
+
     @estimator('Decay')
     def estimate_decay(self, data, x):
         x_span = abs(max(x) - min(x))
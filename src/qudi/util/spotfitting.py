@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains a fitting engine to localize many spots (e.g. single emitters in a confocal scan
+image) by fitting a 2D Gaussian (see qudi.util.fit_models.gaussian.Gaussian2D) to a small region of
+interest (ROI) around each spot.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ('find_spots', 'fit_spots')
+
+import os
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.ndimage import gaussian_filter, maximum_filter
+
+from qudi.util.fit_models.gaussian import Gaussian2D
+
+# Minimum number of spots per worker process to justify the process startup overhead
+_MIN_SPOTS_PER_WORKER = 64
+
+
+def find_spots(image, threshold=None, min_distance=3, max_spots=None, smoothing=1.):
+    """ Finds bright spots in a 2D image as local maxima of the (smoothed) image above a threshold.
+
+    @param numpy.ndarray image: 2D image array
+    @param float threshold: optional, minimum height of a spot in the smoothed image. Defaults to
+                            the background (median) plus 5 times the noise (scaled median absolute
+                            deviation) of the smoothed image.
+    @param int min_distance: optional, minimum distance in pixels between two spots
+    @param int max_spots: optional, maximum number of (brightest) spots to return
+    @param float smoothing: optional, sigma in pixels of the Gaussian filter applied before
+                            searching for local maxima (0 to disable)
+
+    @return numpy.ndarray: integer array of shape (n, 2) with the pixel indices of all spots,
+                           sorted by descending spot height
+    """
+    image = np.asarray(image, dtype=float)
+    if image.ndim != 2:
+        raise ValueError(f'image must be 2D array. Got array of shape {image.shape} instead.')
+    smoothed = gaussian_filter(image, smoothing) if smoothing > 0 else image
+    if threshold is None:
+        background = np.median(smoothed)
+        noise = 1.4826 * np.median(np.abs(smoothed - background))
+        threshold = background + 5 * noise
+    size = 2 * max(0, int(min_distance)) + 1
+    is_maximum = (maximum_filter(smoothed, size=size, mode='nearest') == smoothed)
+    is_maximum &= smoothed > threshold
+    indices = np.argwhere(is_maximum)
+    indices = indices[np.argsort(smoothed[is_maximum])[::-1]]
+    if max_spots is not None:
+        indices = indices[:max(0, int(max_spots))]
+    return indices
+
+
+def _fit_spot_rois(rois, estimator):
+    """ Fits a Gaussian2D model to each ROI of a list of (data, x_axis, y_axis) tuples. Used by
+    fit_spots and executed in worker processes.
+
+    @return list: (success, reduced chi-square, best values, stderrs) tuple for each ROI
+    """
+    model = Gaussian2D()
+    parameter_names = tuple(model.param_names)
+    nan_values = (np.nan,) * len(parameter_names)
+    results = list()
+    for data, x_axis, y_axis in rois:
+        try:
+            x = np.array(np.meshgrid(x_axis, y_axis, indexing='ij'))
+            data = data.ravel()
+            result = model.fit(data, model.estimators[estimator](data, x), x=x)
+        except Exception:
+            results.append((False, np.nan, nan_values, nan_values))
+            continue
+        values = tuple(result.params[name].value for name in parameter_names)
+        stderrs = tuple(np.nan if result.params[name].stderr is None else
+                        result.params[name].stderr for name in parameter_names)
+        results.append((result.success, result.redchi, values, stderrs))
+    return results
+
+
+def fit_spots(image, x_axis, y_axis, spots=None, *, roi_radius=5, estimator='Peak',
+              max_workers=None, **kwargs):
+    """ Localizes spots in a 2D image by fitting a rotated 2D Gaussian (Gaussian2D) to a square
+    region of interest around each spot. The ROIs are fitted in parallel by a pool of worker
+    processes that only receive the cropped ROIs. Each fit is seeded by the moment-based Gaussian2D
+    estimator and uses the analytic Jacobian of the model.
+
+    Neighbouring spots closer than roi_radius are not excluded from the ROI and can bias the fit.
+    Spots that can not be fitted are marked with success=False and NaN values.
+
+    @param numpy.ndarray image: 2D image array, image[i, j] being the value at (x_axis[i], y_axis[j])
+    @param numpy.ndarray x_axis: 1D array of x coordinates (size image.shape[0])
+    @param numpy.ndarray y_axis: 1D array of y coordinates (size image.shape[1])
+    @param numpy.ndarray spots: optional, integer array of shape (n, 2) with pixel indices of the
+                                spots to fit. Calls find_spots with additional kwargs if omitted.
+    @param int roi_radius: optional, half size of the square ROI around each spot in pixels
+    @param str estimator: optional, name of the Gaussian2D estimator to use ("Peak" or "Dip")
+    @param int max_workers: optional, number of worker processes (default: number of CPUs).
+                            Set to 0 to fit all spots sequentially in the calling thread.
+
+    @return numpy.ndarray: structured array with one element per spot containing the fields
+                           "x_index", "y_index" (pixel indices of the spot), "success", "redchi"
+                           and for each Gaussian2D parameter <name> (e.g. "center_x", "sigma_x")
+                           the fields <name> (best value) and <name>_stderr
+    """
+    image = np.asarray(image)
+    x_axis = np.asarray(x_axis, dtype=float)
+    y_axis = np.asarray(y_axis, dtype=float)
+    if image.ndim != 2 or image.shape != (x_axis.size, y_axis.size):
+        raise ValueError(f'image must be 2D array of shape ({x_axis.size:d}, {y_axis.size:d}) '
+                         f'(size of x_axis and y_axis). Got array of shape {image.shape} instead.')
+    model = Gaussian2D()
+    if estimator not in model.estimators:
+        raise ValueError(f'Invalid Gaussian2D estimator "{estimator}". Valid estimators are: '
+                         f'{tuple(model.estimators)}')
+    if spots is None:
+        spots = find_spots(-image if estimator == 'Dip' else image, **kwargs)
+    spots = np.asarray(spots, dtype=int).reshape(-1, 2)
+    roi_radius = max(1, int(roi_radius))
+
+    parameter_names = tuple(model.param_names)
+    result_dtype = [('x_index', int), ('y_index', int), ('success', bool), ('redchi', float)]
+    for name in parameter_names:
+        result_dtype.extend(((name, float), (f'{name}_stderr', float)))
+    results = np.empty(len(spots), dtype=result_dtype)
+    if len(spots) == 0:
+        return results
+
+    rois = list()
+    for x_index, y_index in spots:
+        x_slice = slice(max(0, x_index - roi_radius), x_index + roi_radius + 1)
+        y_slice = slice(max(0, y_index - roi_radius), y_index + roi_radius + 1)
+        rois.append((image[x_slice, y_slice], x_axis[x_slice], y_axis[y_slice]))
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max(0, int(max_workers)), len(rois) // _MIN_SPOTS_PER_WORKER)
+    if max_workers < 2:
+        spot_results = _fit_spot_rois(rois, estimator)
+    else:
+        # Do not fork the qudi process (Qt, threads). Always spawn fresh interpreters.
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_fit_spot_rois, chunk, estimator) for chunk in
+                       (rois[ii::max_workers] for ii in range(max_workers))]
+            chunk_results = [future.result() for future in futures]
+        # Restore the original order of the interleaved chunks
+        spot_results = [None] * len(rois)
+        for ii, chunk in enumerate(chunk_results):
+            spot_results[ii::max_workers] = chunk
+
+    results['x_index'] = spots[:, 0]
+    results['y_index'] = spots[:, 1]
+    for ii, (success, redchi, values, stderrs) in enumerate(spot_results):
+        results[ii]['success'] = success
+        results[ii]['redchi'] = redchi
+        for name, value, stderr in zip(parameter_names, values, stderrs):
+            results[ii][name] = value
+            results[ii][f'{name}_stderr'] = stderr
+    return results
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains benchmarks for the qudi data storage utilities in qudi.util.datastorage.
+Run this file as script to print the results, e.g.:
+
+    python benchmark_datastorage.py
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import tempfile
+import numpy as np
+from configparser import ConfigParser
+
+from qudi.util.datastorage import TextDataStorage, NpyDataStorage, get_header_from_file
+from qudi.util.datastorage import get_info_from_header, get_metadata_from_files
+
+
+def _append_rows_legacy(storage, data, file_path):
+    """ Reference implementation of the former row-by-row TextDataStorage.append_file write loop.
+    """
+    row_fmt_str = storage.delimiter.join(f'{{:{fmt}}}' for fmt in storage.column_formats) + '\n'
+    with open(file_path, 'a') as file:
+        for data_row in data:
+            file.write(row_fmt_str.format(*data_row))
+    return data.shape
+
+
+def benchmark_text_append(row_counts=(10**4, 10**5, 10**6, 10**7), columns=3):
+    """ Compares rows/s written by TextDataStorage.append_file against the legacy row-by-row loop.
+    """
+    print('TextDataStorage.append_file')
+    print(f'{"rows":>10} {"legacy (rows/s)":>18} {"bulk (rows/s)":>18} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as root_dir:
+        storage = TextDataStorage(root_dir=root_dir, column_formats=['.15e'] * columns)
+        for rows in row_counts:
+            data = np.random.rand(rows, columns)
+            legacy_path, _ = storage.new_file(filename='legacy.dat')
+            start = time.perf_counter()
+            _append_rows_legacy(storage, data, legacy_path)
+            legacy_time = time.perf_counter() - start
+            bulk_path, _ = storage.new_file(filename='bulk.dat')
+            start = time.perf_counter()
+            storage.append_file(data, bulk_path)
+            bulk_time = time.perf_counter() - start
+            print(f'{rows:>10d} {rows / legacy_time:>18.0f} {rows / bulk_time:>18.0f} '
+                  f'{legacy_time / bulk_time:>8.2f}')
+            os.remove(legacy_path)
+            os.remove(bulk_path)
+
+
+def _load_text_legacy(file_path):
+    """ Reference implementation of the former TextDataStorage.load_data using numpy.genfromtxt.
+    """
+    header, header_lines = get_header_from_file(file_path)
+    general, metadata = get_info_from_header(header)
+    data = np.genfromtxt(file_path,
+                         dtype=general['column_dtypes'][0],
+                         comments=general['comments'],
+                         delimiter=general['delimiter'],
+                         skip_header=header_lines + 1)
+    return data, metadata, general
+
+
+def benchmark_text_load(row_counts=(10**4, 10**5, 10**6), columns=3, chunk_size=10**5):
+    """ Compares rows/s loaded by TextDataStorage.load_data (full and chunked) against the legacy
+    numpy.genfromtxt based loader.
+    """
+    print('TextDataStorage.load_data')
+    print(f'{"rows":>10} {"legacy (rows/s)":>18} {"loadtxt (rows/s)":>18} '
+          f'{"chunked (rows/s)":>18} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as root_dir:
+        storage = TextDataStorage(root_dir=root_dir)
+        for rows in row_counts:
+            file_path, _, _ = storage.save_data(np.random.rand(rows, columns),
+                                                filename='load.dat')
+            start = time.perf_counter()
+            _load_text_legacy(file_path)
+            legacy_time = time.perf_counter() - start
+            start = time.perf_counter()
+            storage.load_data(file_path)
+            fast_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in storage.load_data(file_path, chunk_size=chunk_size)[0]:
+                pass
+            chunked_time = time.perf_counter() - start
+            print(f'{rows:>10d} {rows / legacy_time:>18.0f} {rows / fast_time:>18.0f} '
+                  f'{rows / chunked_time:>18.0f} {legacy_time / fast_time:>8.2f}')
+            os.remove(file_path)
+
+
+def benchmark_npy_small_saves(file_count=5000, shape=(100, 3)):
+    """ Compares files/s saved and loaded (incl. metadata) by NpyDataStorage using a separate
+    metadata text file against the header embedded in the .npy file (embed_metadata=True).
+    """
+    print('NpyDataStorage small files')
+    print(f'{"files":>10} {"mode":>10} {"save (files/s)":>18} {"load (files/s)":>18} '
+          f'{"metadata (files/s)":>20}')
+    data = np.random.rand(*shape)
+    metadata = {'frequency': 2.87e9, 'power': -30, 'averages': 100}
+    for embed in (False, True):
+        with tempfile.TemporaryDirectory() as root_dir:
+            storage = NpyDataStorage(root_dir=root_dir, embed_metadata=embed)
+            start = time.perf_counter()
+            file_paths = [storage.save_data(data,
+                                            metadata=metadata,
+                                            filename=f'small_{ii:d}{storage.file_extension}')[0]
+                          for ii in range(file_count)]
+            save_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for file_path in file_paths:
+                storage.load_data(file_path)
+            load_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for file_path in file_paths:
+                storage.load_metadata(file_path)
+            meta_time = time.perf_counter() - start
+            mode = 'embedded' if embed else 'npy+txt'
+            print(f'{file_count:>10d} {mode:>10} {file_count / save_time:>18.0f} '
+                  f'{file_count / load_time:>18.0f} {file_count / meta_time:>20.0f}')
+
+
+def _read_metadata_legacy(file_path):
+    """ Reference implementation of the former line-by-line header reading and ConfigParser based
+    metadata parsing.
+    """
+    with open(file_path, 'r') as file:
+        header_lines = list()
+        for line in file:
+            if line.endswith('---- END HEADER ----\n'):
+                comments = line.rsplit('---- END HEADER ----', 1)[0]
+                break
+            header_lines.append(line.rstrip('\r\n'))
+    header = '\n'.join(line[len(comments):] for line in header_lines)
+    config = ConfigParser(comment_prefixes=None, delimiters=('=',))
+    config.read_string(header)
+    metadata = dict()
+    for name, value in config.items('Metadata', raw=True):
+        try:
+            metadata[name] = eval(value)
+        except:
+            metadata[name] = value
+    return metadata
+
+
+def benchmark_metadata_scan(file_count=10000, metadata_count=30, rows=1000, max_workers=None):
+    """ Compares files/s scanned for metadata by get_metadata_from_files (header-only, thread pool)
+    against the legacy sequential header parsing and a full TextDataStorage.load_data.
+    """
+    print('Metadata scan')
+    print(f'{"files":>10} {"load_data (files/s)":>20} {"legacy (files/s)":>18} '
+          f'{"batch (files/s)":>18} {"speedup":>8}')
+    metadata = {f'parameter_{ii:d}': ii * 1.5 for ii in range(metadata_count)}
+    metadata.update({'name': 'odmr', 'frequencies': [2.87e9, 2.88e9], 'enabled': True})
+    with tempfile.TemporaryDirectory() as root_dir:
+        storage = TextDataStorage(root_dir=root_dir)
+        data = np.random.rand(rows, 3)
+        file_paths = [storage.save_data(data, metadata=metadata, filename=f'scan_{ii:d}.dat')[0]
+                      for ii in range(file_count)]
+        load_count = max(1, file_count // 10)
+        start = time.perf_counter()
+        for file_path in file_paths[:load_count]:
+            storage.load_data(file_path)
+        load_time = (time.perf_counter() - start) * file_count / load_count
+        start = time.perf_counter()
+        for file_path in file_paths:
+            _read_metadata_legacy(file_path)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        get_metadata_from_files(file_paths, max_workers=max_workers)
+        batch_time = time.perf_counter() - start
+        print(f'{file_count:>10d} {file_count / load_time:>20.0f} {file_count / legacy_time:>18.0f} '
+              f'{file_count / batch_time:>18.0f} {legacy_time / batch_time:>8.2f}')
+
+
+if __name__ == '__main__':
+    benchmark_text_append()
+    benchmark_text_load()
+    benchmark_npy_small_saves()
+    benchmark_metadata_scan()
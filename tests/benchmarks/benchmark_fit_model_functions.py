@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains micro-benchmarks for the multi-component model functions of the qudi fit models
+in qudi.util.fit_models. Run this file as script to print the results, e.g.:
+
+    python benchmark_fit_model_functions.py
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+from scipy.special import gammaln, xlogy
+
+from qudi.util.fit_models.helpers import evaluate_kernel
+from qudi.util.fit_models import lorentzian, gaussian, exp_decay, poissonian
+
+
+def _multiple_lorentzian_legacy(x, centers, sigmas, amplitudes):
+    """ Reference implementation of the former multiple_lorentzian (one generator term per peak).
+    """
+    return sum(amp * sig ** 2 / ((x - c) ** 2 + sig ** 2) for c, sig, amp in
+               zip(centers, sigmas, amplitudes))
+
+
+def _multiple_gaussian_legacy(x, centers, sigmas, amplitudes):
+    """ Reference implementation of the former multiple_gaussian (one generator term per peak).
+    """
+    return sum(amp * np.exp(-((x - c) ** 2) / (2 * sig ** 2)) for c, sig, amp in
+               zip(centers, sigmas, amplitudes))
+
+
+def _multiple_exponential_decay_legacy(x, amplitudes, decays, stretches):
+    """ Reference implementation of the former multiple_exponential_decay.
+    """
+    return sum(amp * np.exp(-(x / decay) ** stretch) for amp, decay, stretch in
+               zip(amplitudes, decays, stretches))
+
+
+def _multiple_poissonian_legacy(x, mus, amplitudes):
+    """ Reference implementation of the former multiple_poissonian (without the parameter
+    unpacking error and with amplitudes applied).
+    """
+    return sum(amp * np.exp(xlogy(x, mu) - gammaln(x + 1) - mu) for mu, amp in
+               zip(mus, amplitudes))
+
+
+def _time_call(function, args, repetitions, runs=3):
+    """ Returns the best mean time per call of several runs.
+    """
+    times = list()
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            function(*args)
+        times.append((time.perf_counter() - start) / repetitions)
+    return min(times)
+
+
+def _benchmark_model_function(title, legacy, fused, kernel, compiled_kernel, make_args,
+                              point_counts, component_counts):
+    """ Compares the time per call of the legacy, the fused numpy and (if numba is available) the
+    compiled implementation of a multi-component model function.
+    """
+    print(title)
+    print(f'{"points":>8} {"components":>11} {"legacy (us)":>12} {"fused (us)":>11} '
+          f'{"numba (us)":>11} {"speedup":>8} {"max. abs. dev.":>15}')
+    for points in point_counts:
+        repetitions = max(10, 10**6 // points)
+        for components in component_counts:
+            args = make_args(points, components)
+            legacy_time = _time_call(legacy, args, repetitions)
+            fused_time = _time_call(fused, args, repetitions)
+            deviation = np.max(np.abs(fused(*args) - legacy(*args)))
+            if compiled_kernel is None:
+                # Only check the pure python kernel source for correctness
+                deviation = max(deviation,
+                                np.max(np.abs(evaluate_kernel(kernel, *args) - legacy(*args))))
+                compiled_time = np.nan
+                best_time = fused_time
+            else:
+                evaluate_kernel(compiled_kernel, *args)  # JIT compilation
+                compiled_time = _time_call(evaluate_kernel, (compiled_kernel, *args), repetitions)
+                deviation = max(
+                    deviation,
+                    np.max(np.abs(evaluate_kernel(compiled_kernel, *args) - legacy(*args)))
+                )
+                best_time = min(fused_time, compiled_time)
+            print(f'{points:>8d} {components:>11d} {legacy_time * 1e6:>12.1f} '
+                  f'{fused_time * 1e6:>11.1f} {compiled_time * 1e6:>11.1f} '
+                  f'{legacy_time / best_time:>8.2f} {deviation:>15.2e}')
+
+
+def _peak_args(points, components):
+    x = np.linspace(2.8e9, 2.95e9, points)
+    centers = np.linspace(2.82e9, 2.93e9, components)
+    return x, tuple(centers), (5e6,) * components, (-0.2,) * components
+
+
+def benchmark_multiple_lorentzian(point_counts=(100, 1000, 10000, 100000),
+                                  component_counts=(1, 2, 3)):
+    _benchmark_model_function('multiple_lorentzian',
+                              _multiple_lorentzian_legacy,
+                              lorentzian._multiple_lorentzian_numpy,
+                              lorentzian._multiple_lorentzian_kernel,
+                              lorentzian._compiled_multiple_lorentzian_kernel,
+                              _peak_args,
+                              point_counts,
+                              component_counts)
+
+
+def benchmark_multiple_gaussian(point_counts=(100, 1000, 10000, 100000),
+                                component_counts=(1, 2, 3)):
+    _benchmark_model_function('multiple_gaussian',
+                              _multiple_gaussian_legacy,
+                              gaussian._multiple_gaussian_numpy,
+                              gaussian._multiple_gaussian_kernel,
+                              gaussian._compiled_multiple_gaussian_kernel,
+                              _peak_args,
+                              point_counts,
+                              component_counts)
+
+
+def _decay_args(points, components):
+    x = np.linspace(0, 10e-6, points)
+    return (x,
+            (1. / components,) * components,
+            tuple(np.geomspace(0.5e-6, 4e-6, components)),
+            tuple(np.linspace(1, 2, components)))
+
+
+def benchmark_multiple_exponential_decay(point_counts=(100, 1000, 10000, 100000),
+                                         component_counts=(1, 2)):
+    _benchmark_model_function('multiple_exponential_decay',
+                              _multiple_exponential_decay_legacy,
+                              exp_decay._multiple_exponential_decay_numpy,
+                              exp_decay._multiple_exponential_decay_kernel,
+                              exp_decay._compiled_multiple_exponential_decay_kernel,
+                              _decay_args,
+                              point_counts,
+                              component_counts)
+
+
+def _poissonian_args(points, components):
+    x = np.linspace(0, 200, points)
+    return x, tuple(np.linspace(20, 150, components)), (1.,) * components
+
+
+def benchmark_multiple_poissonian(point_counts=(100, 1000, 10000, 100000),
+                                  component_counts=(1, 2)):
+    _benchmark_model_function('multiple_poissonian',
+                              _multiple_poissonian_legacy,
+                              poissonian._multiple_poissonian_numpy,
+                              poissonian._multiple_poissonian_kernel,
+                              poissonian._compiled_multiple_poissonian_kernel,
+                              _poissonian_args,
+                              point_counts,
+                              component_counts)
+
+
+if __name__ == '__main__':
+    benchmark_multiple_lorentzian()
+    benchmark_multiple_gaussian()
+    benchmark_multiple_exponential_decay()
+    benchmark_multiple_poissonian()
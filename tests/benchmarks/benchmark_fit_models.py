@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains benchmarks for the qudi fit models in qudi.util.fit_models.
+Run this file as script to print the results, e.g.:
+
+    python benchmark_fit_models.py
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import lmfit
+import numpy as np
+
+from qudi.util.datafitting import get_all_fit_models, FitContainer, FitConfigurationsModel
+from qudi.util.datafitting import FitTracker
+from qudi.util.fit_models.helpers import smooth_data, correct_offset_histogram, sort_check_data
+from qudi.util.fit_models.helpers import estimate_double_peaks, estimate_triple_peaks
+from qudi.util.fit_models.sine import estimate_phase_lsq
+
+# Test cases for each fit model: (x-axis, true parameter values)
+_x_peaks = np.linspace(2.8e9, 2.95e9, 500)
+_x_decay = np.linspace(0, 10e-6, 500)
+_x_osc = np.linspace(0, 2e-6, 500)
+FIT_CASES = {
+    'Linear': (np.linspace(0, 10, 500), {'offset': 1.5, 'slope': -0.3}),
+    'Lorentzian': (_x_peaks, {'offset': 1., 'center': 2.87e9, 'sigma': 5e6, 'amplitude': 0.2}),
+    'DoubleLorentzian': (_x_peaks, {'offset': 1., 'center_1': 2.86e9, 'center_2': 2.89e9,
+                                    'sigma_1': 4e6, 'sigma_2': 5e6, 'amplitude_1': -0.2,
+                                    'amplitude_2': -0.15}),
+    'TripleLorentzian': (_x_peaks, {'offset': 1., 'center_1': 2.84e9, 'center_2': 2.87e9,
+                                    'center_3': 2.9e9, 'sigma_1': 4e6, 'sigma_2': 5e6,
+                                    'sigma_3': 3e6, 'amplitude_1': -0.2, 'amplitude_2': -0.15,
+                                    'amplitude_3': -0.1}),
+    'LorentzianLinear': (_x_peaks, {'offset': 1., 'slope': 1e-10, 'center': 2.87e9, 'sigma': 5e6,
+                                    'amplitude': -0.2}),
+    'Gaussian': (_x_peaks, {'offset': 1., 'center': 2.87e9, 'sigma': 5e6, 'amplitude': 0.5}),
+    'DoubleGaussian': (_x_peaks, {'offset': 1., 'center_1': 2.86e9, 'center_2': 2.89e9,
+                                  'sigma_1': 4e6, 'sigma_2': 5e6, 'amplitude_1': 0.5,
+                                  'amplitude_2': 0.3}),
+    'TripleGaussian': (_x_peaks, {'offset': 1., 'center_1': 2.84e9, 'center_2': 2.87e9,
+                                  'center_3': 2.9e9, 'sigma_1': 4e6, 'sigma_2': 5e6,
+                                  'sigma_3': 3e6, 'amplitude_1': 0.5, 'amplitude_2': 0.3,
+                                  'amplitude_3': 0.4}),
+    'GaussianLinear': (_x_peaks, {'offset': 1., 'slope': 1e-10, 'center': 2.87e9, 'sigma': 5e6,
+                                  'amplitude': 0.5}),
+    'ExponentialDecay': (_x_decay, {'offset': 0.1, 'amplitude': 1., 'decay': 2e-6,
+                                    'stretch': 1.5}),
+    'DoubleExponentialDecay': (_x_decay, {'offset': 0.1, 'amplitude_1': 1., 'amplitude_2': 0.5,
+                                          'decay_1': 0.5e-6, 'decay_2': 4e-6, 'stretch_1': 1.,
+                                          'stretch_2': 2.}),
+    'Sine': (_x_osc, {'offset': 0.5, 'amplitude': 0.3, 'frequency': 3e6, 'phase': 0.5}),
+    'DoubleSine': (_x_osc, {'offset': 0.5, 'amplitude_1': 0.3, 'amplitude_2': 0.2,
+                            'frequency_1': 3e6, 'frequency_2': 7e6, 'phase_1': 0.5,
+                            'phase_2': -1.}),
+    'ExponentialDecaySine': (_x_osc, {'offset': 0.5, 'amplitude': 0.3, 'frequency': 3e6,
+                                      'phase': 0.5, 'decay': 1e-6, 'stretch': 1.}),
+    'ExponentialDecayDoubleSine': (_x_osc, {'offset': 0.5, 'amplitude_1': 0.3, 'amplitude_2': 0.2,
+                                            'frequency_1': 3e6, 'frequency_2': 7e6,
+                                            'phase_1': 0.5, 'phase_2': -1., 'decay': 1e-6,
+                                            'stretch': 1.}),
+}
+
+
+def make_fit_case(model, x, true_values, noise=0.01, deviation=0.03, seed=0):
+    """ Creates noisy test data from true parameter values and initial parameters deviating from
+    the true values by a random relative amount (relative to the x-axis span for peak centers).
+
+    @return numpy.ndarray, lmfit.Parameters: test data, initial parameters
+    """
+    rng = np.random.default_rng(seed)
+    data = model.eval(x=x, **true_values)
+    data = data + rng.normal(0, noise * np.ptp(data), data.size)
+    params = model.make_params()
+    for name, value in true_values.items():
+        scale = np.ptp(x) if name.startswith('center') else value
+        params[name].set(value=value + scale * rng.uniform(-deviation, deviation))
+    return data, params
+
+
+def benchmark_analytic_jacobian(repetitions=20):
+    """ Compares the number of function evaluations and wall time per fit for all fit models with
+    analytic Jacobian against the finite-difference Jacobian.
+    """
+    fit_models = get_all_fit_models()
+    print('Analytic Jacobian')
+    print(f'{"model":>28} {"nfev (fd)":>10} {"nfev (an)":>10} {"time/fit fd (ms)":>17} '
+          f'{"time/fit an (ms)":>17} {"speedup":>8} {"max rel. dev.":>14}')
+    for name, (x, true_values) in FIT_CASES.items():
+        model = fit_models[name]()
+        if model._model_jacobian is None:
+            continue
+        model.use_variable_projection = False
+        data, params = make_fit_case(model, x, true_values)
+        results = dict()
+        for analytic in (False, True):
+            model.use_analytic_jacobian = analytic
+            start = time.perf_counter()
+            for _ in range(repetitions):
+                result = model.fit(data, params, x=x)
+            results[analytic] = (result, (time.perf_counter() - start) / repetitions)
+        (fd_result, fd_time), (an_result, an_time) = results[False], results[True]
+        deviation = max(abs(an_result.best_values[p] - fd_result.best_values[p]) /
+                        max(abs(fd_result.best_values[p]), 1e-300) for p in true_values)
+        print(f'{name:>28} {fd_result.nfev:>10d} {an_result.nfev:>10d} {fd_time * 1e3:>17.2f} '
+              f'{an_time * 1e3:>17.2f} {fd_time / an_time:>8.2f} {deviation:>14.2e}')
+
+
+def _fit_data_legacy(config, x, data):
+    """ Reference implementation of the former FitContainer.fit_data building a new fit model and
+    fetching the custom parameters for each fit.
+    """
+    model = get_all_fit_models()[config.model]()
+    parameters = model.estimators[config.estimator](data, x)
+    custom_parameters = config.custom_parameters
+    if custom_parameters is not None:
+        for name, param in custom_parameters.items():
+            parameters[name] = param
+    result = model.fit(data, parameters, x=x)
+    high_res_x = np.linspace(x[0], x[-1], len(x) * 10)
+    result.high_res_best_fit = (high_res_x, model.eval(**result.best_values, x=high_res_x))
+    return result
+
+
+def benchmark_fit_container_overhead(points=100, repetitions=500):
+    """ Compares the time per call of FitContainer.fit_data (cached models and parameters) against
+    the legacy implementation constructing the fit model for each fit on small spectra.
+    """
+    print('FitContainer.fit_data overhead')
+    print(f'{"model":>28} {"points":>7} {"legacy (ms)":>12} {"cached (ms)":>12} {"saved (ms)":>11}')
+    fit_models = get_all_fit_models()
+    config_model = FitConfigurationsModel()
+    container = FitContainer(config_model=config_model)
+    for name in ('Lorentzian', 'DoubleLorentzian', 'Gaussian', 'Sine'):
+        x, true_values = FIT_CASES[name]
+        x = np.linspace(x[0], x[-1], points)
+        model = fit_models[name]()
+        data, _ = make_fit_case(model, x, true_values)
+        config_model.add_configuration(name, name)
+        config = config_model.get_configuration_by_name(name)
+        config.estimator = tuple(model.estimators)[0]
+        custom_parameters = lmfit.Parameters()
+        custom_parameters.add('offset', value=true_values['offset'], min=0)
+        config.custom_parameters = custom_parameters
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            _fit_data_legacy(config, x, data)
+        legacy_time = (time.perf_counter() - start) / repetitions
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            container.fit_data(name, x, data)
+        cached_time = (time.perf_counter() - start) / repetitions
+        print(f'{name:>28} {points:>7d} {legacy_time * 1e3:>12.2f} {cached_time * 1e3:>12.2f} '
+              f'{(legacy_time - cached_time) * 1e3:>11.2f}')
+
+
+def benchmark_high_res_best_fit(point_counts=(100, 1000, 10000), repetitions=20):
+    """ Compares the time per FitContainer.fit_data call with and without accessing the lazily
+    evaluated high-resolution best-fit curve (e.g. headless runs vs. GUI plotting).
+    """
+    print('FitContainer.fit_data high-resolution best-fit curve')
+    print(f'{"points":>7} {"curve points":>13} {"no access (ms)":>15} {"access (ms)":>12}')
+    config_model = FitConfigurationsModel()
+    config_model.add_configuration('Lorentzian', 'Lorentzian')
+    container = FitContainer(config_model=config_model)
+    model = get_all_fit_models()['Lorentzian']()
+    x, true_values = FIT_CASES['Lorentzian']
+    for points in point_counts:
+        x = np.linspace(x[0], x[-1], points)
+        data, params = make_fit_case(model, x, true_values)
+        params = {name: param.value for name, param in params.items()}
+        config_model.get_configuration_by_name('Lorentzian').custom_parameters = model.make_params(
+            **params
+        )
+        timings = list()
+        for access in (False, True):
+            start = time.perf_counter()
+            for _ in range(repetitions):
+                result = container.fit_data('Lorentzian', x, data)[1]
+                if access:
+                    curve_x, _ = result.high_res_best_fit
+            timings.append((time.perf_counter() - start) / repetitions)
+        print(f'{points:>7d} {curve_x.size:>13d} {timings[0] * 1e3:>15.2f} {timings[1] * 1e3:>12.2f}')
+
+
+def benchmark_fit_tracker(spectra=200, points=400, drift=0.05e6, seed=0):
+    """ Compares tracking a drifting resonance across consecutive spectra by FitTracker updates
+    against full fits (estimator and fit) of each spectrum with FitContainer.fit_data. After 3/4
+    of the spectra the resonance jumps by 5 MHz, which should trigger a single refit.
+    """
+    print('FitTracker vs. FitContainer.fit_data on drifting spectra')
+    print(f'{"model":>28} {"method":>8} {"time (ms)":>10} {"refits":>7} {"center rms err (Hz)":>20}')
+    rng = np.random.default_rng(seed)
+    fit_models = get_all_fit_models()
+    config_model = FitConfigurationsModel()
+    container = FitContainer(config_model=config_model)
+    x = np.linspace(2.85e9, 2.89e9, points)
+    for name, estimator, true_values in (
+            ('Lorentzian', 'Dip', {'offset': 1., 'center': 2.87e9, 'sigma': 2e6,
+                                   'amplitude': -0.2}),
+            ('DoubleLorentzian', 'Dips', {'offset': 1., 'center_1': 2.865e9, 'center_2': 2.875e9,
+                                          'sigma_1': 1.5e6, 'sigma_2': 1.5e6, 'amplitude_1': -0.2,
+                                          'amplitude_2': -0.15})):
+        model = fit_models[name]()
+        config_model.add_configuration(name, name)
+        config_model.get_configuration_by_name(name).estimator = estimator
+        center_names = [param for param in true_values if param.startswith('center')]
+        offsets = np.cumsum(rng.normal(0, drift, spectra))
+        offsets[3 * spectra // 4:] += 5e6
+        all_data = list()
+        for offset in offsets:
+            values = dict(true_values)
+            values.update({param: values[param] + offset for param in center_names})
+            all_data.append(model.eval(x=x, **values) + rng.normal(0, 0.01, points))
+        tracker = FitTracker(container, name, process_noise={param: 2 * drift for param in
+                                                             center_names})
+        start = time.perf_counter()
+        for data in all_data:
+            tracker.update(x, data)
+        tracker_time = (time.perf_counter() - start) / spectra
+        trajectory = tracker.trajectory
+        start = time.perf_counter()
+        full_fits = [container.fit_data(name, x, data)[1].best_values for data in all_data]
+        full_time = (time.perf_counter() - start) / spectra
+        for method, timing, refits, centers in (
+                ('tracker', tracker_time, np.count_nonzero(trajectory['refit']),
+                 trajectory[center_names[0]]),
+                ('full', full_time, spectra,
+                 np.array([values[center_names[0]] for values in full_fits]))):
+            error = np.sqrt(np.mean(np.square(centers - true_values[center_names[0]] - offsets)))
+            print(f'{name:>28} {method:>8} {timing * 1e3:>10.3f} {refits:>7d} {error:>20.0f}')
+
+
+def benchmark_fit_data_map(shape=(20, 20), points=200, max_workers=None, seed=0):
+    """ Compares fitting a map of spectra (e.g. an ODMR map) by calling FitContainer.fit_data per
+    pixel against FitContainer.fit_data_map with and without neighbour-seeded start values.
+    """
+    print(f'FitContainer.fit_data_map on {shape[0]:d}x{shape[1]:d} pixel map')
+    print(f'{"model":>28} {"method":>16} {"time (s)":>9} {"success":>8} {"seeded":>7}')
+    rng = np.random.default_rng(seed)
+    fit_models = get_all_fit_models()
+    config_model = FitConfigurationsModel()
+    container = FitContainer(config_model=config_model)
+    x = np.linspace(2.85e9, 2.89e9, points)
+    rows, columns = np.mgrid[0:shape[0], 0:shape[1]]
+    shift = 3e6 * np.sin(columns / 10) * np.cos(rows / 8)
+    for name, estimator, true_values in (
+            ('Lorentzian', 'Dip', {'offset': 1., 'center': 2.87e9, 'sigma': 2e6,
+                                   'amplitude': -0.2}),
+            ('DoubleLorentzian', 'Dips', {'offset': 1., 'center_1': 2.865e9, 'center_2': 2.875e9,
+                                          'sigma_1': 1.5e6, 'sigma_2': 1.5e6, 'amplitude_1': -0.2,
+                                          'amplitude_2': -0.15})):
+        model = fit_models[name]()
+        config_model.add_configuration(name, name)
+        config_model.get_configuration_by_name(name).estimator = estimator
+        data = np.empty((*shape, points))
+        for index in np.ndindex(*shape):
+            values = {param: value + shift[index] if param.startswith('center') else value for
+                      param, value in true_values.items()}
+            data[index] = model.eval(x=x, **values) + rng.normal(0, 0.01, points)
+
+        start = time.perf_counter()
+        success = [container.fit_data(name, x, data[index])[1].success for index in
+                   np.ndindex(*shape)]
+        print(f'{name:>28} {"fit_data":>16} {time.perf_counter() - start:>9.2f} '
+              f'{np.mean(success):>8.1%} {0:>7.1%}')
+        for seed_neighbours in (False, True):
+            start = time.perf_counter()
+            results = container.fit_data_map(name,
+                                              x,
+                                              data,
+                                              max_workers=max_workers,
+                                              seed_neighbours=seed_neighbours)
+            method = 'map (seeded)' if seed_neighbours else 'map'
+            print(f'{name:>28} {method:>16} {time.perf_counter() - start:>9.2f} '
+                  f'{np.mean(results["success"]):>8.1%} {np.mean(results["warm_start"]):>7.1%}')
+    container.shutdown_batch_workers()
+
+
+def _estimate_peaks_legacy(model, data, x, peak_count):
+    """ Reference implementation of the former multi-peak estimators (find_peaks based).
+    """
+    data, x = sort_check_data(data, x)
+    data_smoothed, filter_width = smooth_data(data)
+    leveled_data_smooth, offset = correct_offset_histogram(data_smoothed,
+                                                           bin_width=2 * filter_width)
+    if peak_count == 2:
+        estimate, limits = estimate_double_peaks(leveled_data_smooth, x, filter_width)
+    else:
+        estimate, limits = estimate_triple_peaks(leveled_data_smooth, x, filter_width)
+    params = model.make_params()
+    for ii in range(peak_count):
+        params[f'amplitude_{ii + 1:d}'].set(value=estimate['height'][ii],
+                                            min=limits['height'][ii][0],
+                                            max=limits['height'][ii][1])
+        params[f'center_{ii + 1:d}'].set(value=estimate['center'][ii],
+                                         min=limits['center'][ii][0],
+                                         max=limits['center'][ii][1])
+        params[f'sigma_{ii + 1:d}'].set(value=estimate['fwhm'][ii] / 2.3548,
+                                        min=limits['fwhm'][ii][0] / 2.3548,
+                                        max=limits['fwhm'][ii][1] / 2.3548)
+    return params
+
+
+def _estimate_peak_linear_legacy(model, data, x):
+    """ Reference implementation of the former LorentzianLinear/GaussianLinear estimator running
+    a peak fit and a linear fit to obtain the start values.
+    """
+    fit_models = get_all_fit_models()
+    data, x = sort_check_data(data, x)
+    data_span = abs(max(data) - min(data))
+    peak_model = fit_models[type(model).__name__.replace('Linear', '')]()
+    peak_fit = peak_model.fit(data, peak_model.estimate_peak(data, x), x=x)
+    data_sub = data - peak_fit.best_fit
+    linear_model = fit_models['Linear']()
+    linear_fit = linear_model.fit(data_sub, linear_model.estimate(data_sub, x), x=x)
+    estimate = model.make_params()
+    estimate['offset'].set(value=linear_fit.params['offset'] + min(x) * linear_fit.params['slope'],
+                           min=min(data) - data_span / 2,
+                           max=max(data) + data_span / 2)
+    estimate['slope'].set(value=linear_fit.params['slope'].value)
+    for name in ('amplitude', 'center', 'sigma'):
+        estimate[name].set(value=peak_fit.params[name].value,
+                           min=peak_fit.params[name].min,
+                           max=peak_fit.params[name].max)
+    return estimate
+
+
+def _random_peak_values(rng, model_name, x):
+    """ Random true parameter values for multi-peak benchmark cases with (partially) resolved
+    peaks within the central 80% of the x-axis span.
+    """
+    x_span = np.ptp(x)
+    if model_name.endswith('Linear'):
+        values = {'offset': 1., 'slope': rng.uniform(-0.2, 0.2) / x_span,
+                  'center': x[0] + x_span * rng.uniform(0.2, 0.8),
+                  'sigma': x_span * rng.uniform(0.01, 0.05), 'amplitude': rng.uniform(0.1, 0.5)}
+        return values
+    peak_count = 2 if model_name.startswith('Double') else 3
+    centers = np.sort(x[0] + x_span * (0.1 + 0.8 * rng.random(peak_count)))
+    while min(np.diff(centers)) < 0.05 * x_span:
+        centers = np.sort(x[0] + x_span * (0.1 + 0.8 * rng.random(peak_count)))
+    values = {'offset': 1.}
+    for ii, center in enumerate(centers, 1):
+        values[f'center_{ii:d}'] = center
+        values[f'sigma_{ii:d}'] = x_span * rng.uniform(0.01, 0.04)
+        values[f'amplitude_{ii:d}'] = rng.uniform(0.1, 0.5)
+    return values
+
+
+def benchmark_peak_estimators(trials=100, points=500, noise=0.02, seed=0):
+    """ Compares estimation time and final fit success rate of the single-pass multi-peak
+    estimators against the former estimators on random test cases. A fit is counted as success if
+    its chi-square is within 1% of the fit started at the true parameter values.
+    """
+    print('Multi-peak estimators')
+    print(f'{"model":>28} {"legacy (ms)":>12} {"new (ms)":>9} {"speedup":>8} '
+          f'{"legacy success":>15} {"new success":>12}')
+    fit_models = get_all_fit_models()
+    rng = np.random.default_rng(seed)
+    x = np.linspace(2.8e9, 2.95e9, points)
+    legacy_estimators = {
+        'DoubleLorentzian': lambda m, d, x: _estimate_peaks_legacy(m, d, x, 2),
+        'TripleLorentzian': lambda m, d, x: _estimate_peaks_legacy(m, d, x, 3),
+        'DoubleGaussian': lambda m, d, x: _estimate_peaks_legacy(m, d, x, 2),
+        'TripleGaussian': lambda m, d, x: _estimate_peaks_legacy(m, d, x, 3),
+        'LorentzianLinear': _estimate_peak_linear_legacy,
+        'GaussianLinear': _estimate_peak_linear_legacy,
+    }
+    for name, legacy_estimator in legacy_estimators.items():
+        model = fit_models[name]()
+        new_estimator = model.estimators['Peak' if name.endswith('Linear') else 'Peaks']
+        times = {'legacy': 0., 'new': 0.}
+        successes = {'legacy': 0, 'new': 0}
+        for _ in range(trials):
+            true_values = _random_peak_values(rng, name, x)
+            data = model.eval(x=x, **true_values) + rng.normal(0, noise, points)
+            reference = model.fit(data, model.make_params(**true_values), x=x)
+            for mode, estimator_func in (('legacy', lambda d, x: legacy_estimator(model, d, x)),
+                                         ('new', new_estimator)):
+                start = time.perf_counter()
+                params = estimator_func(data, x)
+                times[mode] += time.perf_counter() - start
+                try:
+                    result = model.fit(data, params, x=x)
+                except ValueError:
+                    continue
+                successes[mode] += result.chisqr <= 1.01 * reference.chisqr
+        print(f'{name:>28} {times["legacy"] / trials * 1e3:>12.2f} '
+              f'{times["new"] / trials * 1e3:>9.2f} {times["legacy"] / times["new"]:>8.2f} '
+              f'{successes["legacy"] / trials:>15.1%} {successes["new"] / trials:>12.1%}')
+
+
+def _estimate_phase_legacy(data, x, frequency, amplitude):
+    """ Reference implementation of the former phase search in the Sine/ExponentialDecaySine
+    estimators testing one phase per sample within an oscillation period.
+    """
+    x_step = min(abs(np.ediff1d(x)))
+    iter_steps = max(1, int(round(1 / (frequency * x_step))))
+    test_phases = 2 * np.pi * np.arange(iter_steps) / iter_steps
+    sum_res = np.zeros(iter_steps)
+    for ii, phase in enumerate(test_phases):
+        sum_res[ii] = np.abs(data - amplitude * np.sin(2 * np.pi * frequency * x + phase)).sum()
+    return test_phases[sum_res.argmax()] - np.pi
+
+
+def benchmark_sine_phase_estimation(point_counts=(100, 1000, 10000, 50000), periods=3,
+                                    noise=0.1, seed=0):
+    """ Compares time and accuracy of the least-squares phase estimate against the former phase
+    search for decaying sine traces of increasing length with a fixed number of periods.
+    """
+    print('Sine phase estimation')
+    print(f'{"points":>7} {"legacy (ms)":>12} {"lsq (ms)":>9} {"speedup":>8} '
+          f'{"legacy error (rad)":>19} {"lsq error (rad)":>16}')
+    rng = np.random.default_rng(seed)
+    for points in point_counts:
+        x = np.linspace(0, 1e-6, points)
+        frequency = periods / 1e-6
+        decay = 0.5e-6
+        phase = rng.uniform(-np.pi, np.pi)
+        data = np.exp(-x / decay) * np.sin(2 * np.pi * frequency * x + phase)
+        data += rng.normal(0, noise, points)
+        start = time.perf_counter()
+        legacy_phase = _estimate_phase_legacy(data, x, frequency, np.ptp(data) / 2)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, lsq_phase = estimate_phase_lsq(data, x, frequency, np.exp(-x / decay))
+        lsq_time = time.perf_counter() - start
+        legacy_error = abs(np.angle(np.exp(1j * (legacy_phase - phase))))
+        lsq_error = abs(np.angle(np.exp(1j * (lsq_phase - phase))))
+        print(f'{points:>7d} {legacy_time * 1e3:>12.2f} {lsq_time * 1e3:>9.2f} '
+              f'{legacy_time / lsq_time:>8.1f} {legacy_error:>19.3f} {lsq_error:>16.3f}')
+
+
+def benchmark_variable_projection(trials=20, deviation=0.1, points=500):
+    """ Compares success rate, mean number of function evaluations of the final lmfit fit and mean
+    wall time per fit for all models with linear parameters with and without variable projection.
+    A fit counts as successful if its reduced chi-square is within 10% of a fit started from the
+    true parameter values.
+    """
+    fit_models = get_all_fit_models()
+    print(f'Variable projection ({points:d} points)')
+    print(f'{"model":>28} {"success (direct)":>17} {"success (varpro)":>17} {"nfev (direct)":>14} '
+          f'{"nfev (varpro)":>14} {"time/fit direct (ms)":>21} {"time/fit varpro (ms)":>21}')
+    for name, (x, true_values) in FIT_CASES.items():
+        model = fit_models[name]()
+        if not model._linear_parameters:
+            continue
+        x = np.linspace(x[0], x[-1], points)
+        stats = {False: [0, 0, 0.], True: [0, 0, 0.]}
+        for seed in range(trials):
+            data, params = make_fit_case(model, x, true_values, deviation=deviation, seed=seed)
+            reference = model.fit(data, model.make_params(**true_values), x=x).redchi
+            for projection in (False, True):
+                model.use_variable_projection = projection
+                start = time.perf_counter()
+                result = model.fit(data, params, x=x)
+                stats[projection][2] += time.perf_counter() - start
+                stats[projection][1] += result.nfev
+                stats[projection][0] += result.redchi <= 1.1 * reference
+        (direct_ok, direct_nfev, direct_time), (vp_ok, vp_nfev, vp_time) = stats[False], stats[True]
+        print(f'{name:>28} {direct_ok / trials:>17.0%} {vp_ok / trials:>17.0%} '
+              f'{direct_nfev / trials:>14.1f} {vp_nfev / trials:>14.1f} '
+              f'{direct_time / trials * 1e3:>21.2f} {vp_time / trials * 1e3:>21.2f}')
+
+
+if __name__ == '__main__':
+    benchmark_analytic_jacobian()
+    benchmark_fit_container_overhead()
+    benchmark_high_res_best_fit()
+    benchmark_fit_tracker()
+    benchmark_fit_data_map()
+    benchmark_peak_estimators()
+    benchmark_sine_phase_estimation()
+    benchmark_variable_projection()
+    benchmark_variable_projection(points=20000)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains a benchmark and performance regression harness for all fit models and
+estimators registered in qudi.util.datafitting. Each model/estimator combination is fitted to
+noisy synthetic data of increasing size and the success rate, number of function evaluations, wall
+time and peak memory per fit are recorded. Results can be saved as JSON baseline and later runs
+compared against it, failing (exit code 1) if any metric regressed beyond a threshold.
+Runs offline and only requires the qudi dependencies, e.g.:
+
+    python benchmark_fit_regression.py --save baseline.json
+    python benchmark_fit_regression.py --compare baseline.json --threshold 0.25
+    python benchmark_fit_regression.py --models Lorentzian Gaussian --sizes 100 1000 --trials 10
+
+Wall time and memory baselines are only meaningful on the same machine and environment.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+import scipy
+import lmfit
+
+from qudi.util.datafitting import get_all_fit_models
+
+# Synthetic test cases for each registered fit model: x-axis start, x-axis stop, true parameter
+# values of a peak (positive amplitudes). Estimator specific variations (dips, no offset, ...) are
+# applied by _estimator_values.
+REGRESSION_CASES = {
+    'Linear': (0, 10, {'offset': 1.5, 'slope': -0.3}),
+    'Lorentzian': (2.8e9, 2.95e9, {'offset': 1., 'center': 2.87e9, 'sigma': 5e6,
+                                   'amplitude': 0.2}),
+    'DoubleLorentzian': (2.8e9, 2.95e9, {'offset': 1., 'center_1': 2.86e9, 'center_2': 2.89e9,
+                                         'sigma_1': 4e6, 'sigma_2': 5e6, 'amplitude_1': 0.2,
+                                         'amplitude_2': 0.15}),
+    'TripleLorentzian': (2.8e9, 2.95e9, {'offset': 1., 'center_1': 2.84e9, 'center_2': 2.87e9,
+                                         'center_3': 2.9e9, 'sigma_1': 4e6, 'sigma_2': 5e6,
+                                         'sigma_3': 3e6, 'amplitude_1': 0.2, 'amplitude_2': 0.15,
+                                         'amplitude_3': 0.1}),
+    'LorentzianLinear': (2.8e9, 2.95e9, {'offset': 1., 'slope': 1e-9, 'center': 2.87e9,
+                                         'sigma': 5e6, 'amplitude': 0.2}),
+    'ComplexLorentzian': (2.8e9, 2.95e9, {'center': 2.87e9, 'sigma': 5e6, 'amplitude': 1e6,
+                                          'theta': 30.}),
+    'Gaussian': (2.8e9, 2.95e9, {'offset': 1., 'center': 2.87e9, 'sigma': 5e6,
+                                 'amplitude': 0.5}),
+    'DoubleGaussian': (2.8e9, 2.95e9, {'offset': 1., 'center_1': 2.86e9, 'center_2': 2.89e9,
+                                       'sigma_1': 4e6, 'sigma_2': 5e6, 'amplitude_1': 0.5,
+                                       'amplitude_2': 0.3}),
+    'TripleGaussian': (2.8e9, 2.95e9, {'offset': 1., 'center_1': 2.84e9, 'center_2': 2.87e9,
+                                       'center_3': 2.9e9, 'sigma_1': 4e6, 'sigma_2': 5e6,
+                                       'sigma_3': 3e6, 'amplitude_1': 0.5, 'amplitude_2': 0.3,
+                                       'amplitude_3': 0.4}),
+    'GaussianLinear': (2.8e9, 2.95e9, {'offset': 1., 'slope': 1e-9, 'center': 2.87e9,
+                                       'sigma': 5e6, 'amplitude': 0.5}),
+    'Gaussian2D': (0, 10e-6, {'offset': 100., 'amplitude': 1000., 'center_x': 4e-6,
+                              'center_y': 6e-6, 'sigma_x': 0.5e-6, 'sigma_y': 0.8e-6,
+                              'theta': 0.3}),
+    'ExponentialDecay': (0, 10e-6, {'offset': 0.1, 'amplitude': 1., 'decay': 2e-6,
+                                    'stretch': 1.5}),
+    'DoubleExponentialDecay': (0, 10e-6, {'offset': 0.1, 'amplitude_1': 1., 'amplitude_2': 0.5,
+                                          'decay_1': 0.5e-6, 'decay_2': 4e-6, 'stretch_1': 1.,
+                                          'stretch_2': 2.}),
+    'Poissonian': (0, 60, {'offset': 5., 'mu': 20., 'amplitude': 1000.}),
+    'DoublePoissonian': (0, 100, {'offset': 5., 'mu_1': 25., 'mu_2': 60., 'amplitude_1': 1000.,
+                                  'amplitude_2': 800.}),
+    'Sine': (0, 2e-6, {'offset': 0.5, 'amplitude': 0.3, 'frequency': 3e6, 'phase': 0.5}),
+    'DoubleSine': (0, 2e-6, {'offset': 0.5, 'amplitude_1': 0.3, 'amplitude_2': 0.2,
+                             'frequency_1': 3e6, 'frequency_2': 7e6, 'phase_1': 0.5,
+                             'phase_2': -1.}),
+    'ExponentialDecaySine': (0, 2e-6, {'offset': 0.5, 'amplitude': 0.3, 'frequency': 3e6,
+                                       'phase': 0.5, 'decay': 1e-6, 'stretch': 1.5}),
+    'ExponentialDecayDoubleSine': (0, 2e-6, {'offset': 0.5, 'amplitude_1': 0.3,
+                                             'amplitude_2': 0.2, 'frequency_1': 3e6,
+                                             'frequency_2': 7e6, 'phase_1': 0.5, 'phase_2': -1.,
+                                             'decay': 1e-6, 'stretch': 1.5}),
+}
+
+# Estimator name used for models without any estimator (fit starts from perturbed true values)
+NO_ESTIMATOR = '<none>'
+# Metrics compared against the baseline and whether larger values are worse
+METRICS = {'success_rate': False, 'errors': True, 'nfev': True, 'time': True, 'memory': True}
+
+
+def _estimator_values(estimator, true_values):
+    """ Adjusts the true parameter values to the data shape the estimator is meant for.
+    """
+    values = dict(true_values)
+    name = estimator.lower()
+    if 'dip' in name:
+        values.update({p: -v for p, v in values.items() if p.startswith('amplitude')})
+    if 'no offset' in name:
+        values['offset'] = 0.
+    if name == 'constant':
+        values['slope'] = 0.
+    if name == 'zero phase':
+        values.update({p: 0. for p in values if p.startswith('phase')})
+    if name in ('decay', 'decay (no offset)'):
+        values['stretch'] = 1.
+    return values
+
+
+def _make_x(model_name, x_start, x_stop, points):
+    if model_name == 'Gaussian2D':
+        side = max(2, int(round(np.sqrt(points))))
+        axis = np.linspace(x_start, x_stop, side)
+        return np.array(np.meshgrid(axis, axis, indexing='ij'))
+    return np.linspace(x_start, x_stop, points)
+
+
+def _fit_once(model, estimator, data, x, true_values, rng):
+    """ Runs estimator and fit once.
+
+    @return lmfit.model.ModelResult: The fit result
+    """
+    if estimator == NO_ESTIMATOR:
+        params = model.make_params()
+        for name, value in true_values.items():
+            params[name].set(value=value * (1 + rng.uniform(-0.05, 0.05)))
+    else:
+        params = model.estimators[estimator](data, x)
+    return model.fit(data, params, x=x)
+
+
+def run_case(model_name, estimator, points, trials=5, noise=0.02, seed=0):
+    """ Benchmarks a single model/estimator combination for a given number of data points.
+
+    A fit counts as successful if lmfit reports success and the reduced chi-square does not exceed
+    the noise variance by more than 50%.
+
+    @return dict: success_rate, number of errors raised, mean nfev, median wall time per fit (s) and
+                  peak memory per fit (B)
+    """
+    model = get_all_fit_models()[model_name]()
+    x_start, x_stop, true_values = REGRESSION_CASES[model_name]
+    true_values = _estimator_values(estimator, true_values)
+    x = _make_x(model_name, x_start, x_stop, points)
+    clean_data = model.eval(x=x, **true_values)
+    noise_amplitude = noise * (np.ptp(np.abs(clean_data)) or np.max(np.abs(clean_data)))
+    rng = np.random.default_rng(seed)
+    successes, errors, nfevs, times = 0, 0, list(), list()
+    for _ in range(trials):
+        data = clean_data + rng.normal(0, noise_amplitude, clean_data.shape)
+        start = time.perf_counter()
+        try:
+            result = _fit_once(model, estimator, data, x, true_values, rng)
+        except Exception:
+            times.append(time.perf_counter() - start)
+            errors += 1
+            continue
+        times.append(time.perf_counter() - start)
+        nfevs.append(result.nfev)
+        successes += bool(result.success and result.redchi <= 1.5 * noise_amplitude ** 2)
+    # Peak memory is measured in a separate run since tracing slows down execution
+    data = clean_data + rng.normal(0, noise_amplitude, clean_data.shape)
+    tracemalloc.start()
+    try:
+        _fit_once(model, estimator, data, x, true_values, rng)
+    except Exception:
+        pass
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'success_rate': successes / trials,
+            'errors': errors,
+            'nfev': float(np.mean(nfevs)) if nfevs else np.nan,
+            'time': float(np.median(times)),
+            'memory': float(memory)}
+
+
+def run_benchmarks(models=None, sizes=(100, 1000, 10000, 100000), trials=5, seed=0):
+    """ Benchmarks all registered fit models and estimators (or the given subset of models).
+
+    @return dict: Results for each "<model>/<estimator>/<points>" key, see run_case
+    """
+    fit_models = get_all_fit_models()
+    models = sorted(fit_models) if models is None else models
+    results = dict()
+    print(f'{"model":>28} {"estimator":>28} {"points":>7} {"success":>8} {"errors":>7} '
+          f'{"nfev":>8} {"time/fit (ms)":>14} {"peak mem. (MB)":>15}')
+    for model_name in models:
+        if model_name not in REGRESSION_CASES:
+            print(f'{model_name:>28} no synthetic test case defined, skipped.')
+            continue
+        estimators = list(fit_models[model_name]().estimators) or [NO_ESTIMATOR]
+        for estimator in estimators:
+            for points in sizes:
+                metrics = run_case(model_name, estimator, points, trials=trials, seed=seed)
+                results[f'{model_name}/{estimator}/{points:d}'] = metrics
+                print(f'{model_name:>28} {estimator:>28} {points:>7d} '
+                      f'{metrics["success_rate"]:>8.0%} {metrics["errors"]:>7d} '
+                      f'{metrics["nfev"]:>8.1f} '
+                      f'{metrics["time"] * 1e3:>14.2f} {metrics["memory"] / 2**20:>15.2f}')
+    return results
+
+
+def compare_results(baseline, results, threshold=0.25, success_tolerance=0.2):
+    """ Compares benchmark results against a baseline. Cost metrics (errors, nfev, time, memory)
+    regress if they grow by more than the relative threshold. The success rate regresses if it
+    drops by more than success_tolerance.
+
+    @return list: Human readable description of each regression found
+    """
+    regressions = list()
+    for key, metrics in results.items():
+        if key not in baseline:
+            continue
+        for metric, larger_is_worse in METRICS.items():
+            old, new = baseline[key][metric], metrics[metric]
+            if not (np.isfinite(old) and np.isfinite(new)):
+                continue
+            if larger_is_worse:
+                regressed = new > old * (1 + threshold)
+            else:
+                regressed = new < old - success_tolerance
+            if regressed:
+                regressions.append(f'{key}: {metric} {old:.4g} -> {new:.4g}')
+    return regressions
+
+
+def _environment_info():
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'lmfit': lmfit.__version__}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fit model benchmark and regression harness')
+    parser.add_argument('--models', nargs='+', default=None, help='fit model names to run')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000, 100000],
+                        help='numbers of data points')
+    parser.add_argument('--trials', type=int, default=5, help='fits per model/estimator/size')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for noise')
+    parser.add_argument('--save', default=None, help='save results as JSON baseline to file')
+    parser.add_argument('--compare', default=None, help='JSON baseline file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative increase of nfev, time or memory counted as regression')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.models, args.sizes, args.trials, args.seed)
+    if args.save is not None:
+        with open(args.save, 'w') as file:
+            json.dump({'environment': _environment_info(), 'results': results}, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if baseline['environment'] != _environment_info():
+            print('WARNING: Baseline was recorded in a different environment.')
+        regressions = compare_results(baseline['results'], results, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions found.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for indexing and querying qudi data files with qudi.util.datacatalog.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+
+from qudi.util.datastorage import DataStorageBase, TextDataStorage, NpyDataStorage
+from qudi.util.datacatalog import DataCatalog, flatten_metadata
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with DataCatalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        yield catalog
+
+
+@pytest.fixture
+def shared_catalog(catalog):
+    DataStorageBase.set_data_catalog(catalog)
+    try:
+        yield catalog
+    finally:
+        DataStorageBase.set_data_catalog(None)
+
+
+def _save_files(root_dir):
+    """ Saves four data files with different storage types, nametags, timestamps and metadata.
+    """
+    start = datetime(2021, 5, 1, 12)
+    text_storage = TextDataStorage(root_dir=root_dir, include_global_metadata=False)
+    npy_storage = NpyDataStorage(root_dir=root_dir, include_global_metadata=False)
+    file_paths = list()
+    for ii, (storage, nametag, power) in enumerate([(text_storage, 'odmr', 10),
+                                                   (text_storage, 'odmr', 20),
+                                                   (npy_storage, 'odmr', 30),
+                                                   (npy_storage, 'rabi', 20)]):
+        file_path, _, _ = storage.save_data(np.arange(6.).reshape(3, 2),
+                                            timestamp=start + timedelta(days=ii),
+                                            nametag=nametag,
+                                            notes=f'file {ii:d}',
+                                            metadata={'power': power,
+                                                      'sample': 'diamond' if ii < 3 else 'sic',
+                                                      'laser': {'wavelength': 532e-9}})
+        file_paths.append(os.path.abspath(file_path))
+    return file_paths
+
+
+def test_flatten_metadata():
+    assert flatten_metadata({'a': 1, 'b': {'c': 2, 'd': {'e': 'x'}}}) == {'a': 1,
+                                                                         'b.c': 2,
+                                                                         'b.d.e': 'x'}
+
+
+def test_add_file_and_query(catalog, tmp_path):
+    file_path = str(tmp_path / '20210501-1200-00_odmr.dat')
+    timestamp = datetime(2021, 5, 1, 12)
+    catalog.add_file(file_path,
+                     timestamp=timestamp,
+                     metadata={'power': 13, 'sample': 'diamond', 'laser': {'on': True}},
+                     notes='notes',
+                     shape=(10, 2),
+                     storage='TextDataStorage')
+    catalog.add_file(str(tmp_path / 'other.dat'), metadata={'power': 20})
+    assert len(catalog) == 2
+    entry = catalog.get_entry(file_path)
+    assert entry['path'] == os.path.abspath(file_path)
+    assert entry['timestamp'] == timestamp
+    assert entry['nametag'] == 'odmr'
+    assert entry['storage'] == 'TextDataStorage'
+    assert entry['shape'] == '(10, 2)'
+    assert entry['notes'] == 'notes'
+    assert entry['metadata'] == {'power': 13, 'sample': 'diamond', 'laser.on': 1}
+    assert catalog.query(metadata={'power': 13}) == [entry['path']]
+    assert catalog.query(metadata={'laser': {'on': True}}) == [entry['path']]
+    assert catalog.query(metadata={'sample': 'diamond', 'power': 20}) == []
+    # Adding the same path again replaces the entry
+    catalog.add_file(file_path, metadata={'power': 14})
+    assert len(catalog) == 2
+    assert catalog.query(metadata={'power': 13}) == []
+    catalog.remove_file(file_path)
+    assert len(catalog) == 1
+    assert catalog.get_entry(file_path) is None
+
+
+def test_saved_files_are_added(shared_catalog, tmp_path):
+    file_paths = _save_files(str(tmp_path))
+    assert len(shared_catalog) == 4
+    assert shared_catalog.query() == file_paths
+    assert shared_catalog.query(nametag='ODMR') == file_paths[:3]
+    assert shared_catalog.query(storage='NpyDataStorage') == file_paths[2:]
+    assert shared_catalog.query(metadata={'power': 20}) == [file_paths[1], file_paths[3]]
+    assert shared_catalog.query(metadata={'power': (15, None)}) == file_paths[1:]
+    assert shared_catalog.query(metadata={'power': (None, 25), 'sample': 'diamond'}) == \
+           file_paths[:2]
+    assert shared_catalog.query(metadata={'laser': {'wavelength': (500e-9, 600e-9)}}) == \
+           file_paths
+    assert shared_catalog.query(start=datetime(2021, 5, 2),
+                                stop=datetime(2021, 5, 3, 12)) == file_paths[1:3]
+    assert shared_catalog.get_entry(file_paths[3])['notes'] == 'file 3'
+
+
+def test_rebuild(catalog, tmp_path):
+    data_dir = tmp_path / 'data'
+    file_paths = _save_files(str(data_dir))
+    (data_dir / 'broken.dat').write_text('no qudi header')
+    assert len(catalog) == 0
+    assert catalog.rebuild(str(data_dir), max_workers=2) == 4
+    assert catalog.query() == file_paths
+    assert catalog.query(nametag='rabi', metadata={'power': 20}) == [file_paths[3]]
+    entry = catalog.get_entry(file_paths[2])
+    assert entry['storage'] == 'NpyDataStorage'
+    assert entry['shape'] == '(3, 2)'
+    assert entry['notes'] == 'file 2'
+    # Unchanged files are skipped unless the catalog is cleared
+    assert catalog.rebuild(str(data_dir)) == 0
+    os.utime(file_paths[0], (0, 0))
+    assert catalog.rebuild(str(data_dir)) == 1
+    assert catalog.rebuild(str(data_dir), clear=True) == 4
+    assert len(catalog) == 4
+
+
+def test_rebuild_removes_deleted_files(catalog, tmp_path):
+    data_dir = tmp_path / 'data'
+    file_paths = _save_files(str(data_dir))
+    other_dir = tmp_path / 'other'
+    other_dir.mkdir()
+    other_file = str(other_dir / 'deleted.dat')
+    catalog.add_file(other_file, nametag='other', metadata={'power': 20})
+    outside_file = str(data_dir / 'data.txt')
+    with open(outside_file, 'w') as file:
+        file.write('not a data file extension')
+    catalog.add_file(outside_file, nametag='text')
+    assert catalog.rebuild(str(data_dir)) == 4
+    os.remove(file_paths[1])
+    os.remove(file_paths[3])
+    assert catalog.rebuild(str(data_dir)) == 0
+    assert set(catalog.query()) == {file_paths[0], file_paths[2], other_file, outside_file}
+    assert catalog.get_entry(file_paths[1]) is None
+    assert catalog.query(nametag='rabi', metadata={'power': 20}) == list()
+    # Entries outside of the rebuilt directory are kept
+    assert catalog.get_entry(other_file)['metadata'] == {'power': 20}
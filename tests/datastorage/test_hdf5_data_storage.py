@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for saving, appending and loading HDF5 data files with Hdf5DataStorage.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+
+h5py = pytest.importorskip('h5py')
+
+from qudi.util.datastorage import Hdf5DataStorage, DataStreamBase, get_metadata_from_file
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return Hdf5DataStorage(root_dir=str(tmp_path), include_global_metadata=False, chunk_rows=4)
+
+
+@pytest.fixture
+def metadata():
+    return {'power': 13.5,
+            'counts': 42,
+            'label': 'nv1',
+            'enabled': True,
+            'trace': np.linspace(0, 1, 5),
+            'axes': ('x', 'y'),
+            'settings': {'gain': 2, 'mode': None}}
+
+
+def test_save_load_round_trip(storage, metadata):
+    data = np.arange(30, dtype=float).reshape(10, 3)
+    file_path, timestamp, shape = storage.save_data(data,
+                                                    metadata=metadata,
+                                                    notes='some notes',
+                                                    column_headers=['a', 'b', 'c'],
+                                                    filename='data.h5')
+    assert shape == data.shape
+    loaded, loaded_metadata, general = Hdf5DataStorage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, data)
+    assert general['timestamp'] == timestamp
+    assert general['notes'] == 'some notes'
+    assert general['column_headers'] == ('a', 'b', 'c')
+    assert general['shape'] == data.shape
+    assert general['dtype'] == data.dtype
+    assert set(loaded_metadata) == set(metadata)
+    np.testing.assert_array_equal(loaded_metadata.pop('trace'), metadata['trace'])
+    for name, value in loaded_metadata.items():
+        assert value == metadata[name]
+        assert type(value) is type(metadata[name])
+    assert get_metadata_from_file(file_path)[1]['shape'] == data.shape
+
+
+def test_append_file(storage):
+    file_path, _, _ = storage.save_data(np.empty((0, 3)), filename='data.h5')
+    chunks = [np.random.rand(n, 3) for n in (1, 5, 7)]
+    for chunk in chunks:
+        storage.append_file(chunk, file_path)
+    # 1D data is appended as a single row
+    row = np.array([1., 2., 3.])
+    assert storage.append_file(row, file_path) == (14, 3)
+    loaded, _, general = Hdf5DataStorage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, np.concatenate([*chunks, row[np.newaxis]]))
+    assert general['shape'] == (14, 3)
+
+
+def test_append_file_errors(storage, tmp_path):
+    file_path, _, _ = storage.save_data(np.zeros((2, 3)), filename='data.h5')
+    with pytest.raises(ValueError):
+        storage.append_file(np.zeros((2, 4)), file_path)
+    with pytest.raises(FileNotFoundError):
+        storage.append_file(np.zeros((2, 3)), str(tmp_path / 'missing.h5'))
+    np.testing.assert_array_equal(Hdf5DataStorage.load_data(file_path)[0], np.zeros((2, 3)))
+
+
+def test_stream(storage):
+    file_path, _, _ = storage.save_data(np.empty((0, 3)), filename='data.h5')
+    rows = np.random.rand(25, 3)
+    with storage.open_stream(file_path, buffer_size=10, flush_interval=60) as stream:
+        for row in rows[:15]:
+            # Reusing the written array must not alter buffered rows
+            buffer = row.copy()
+            assert stream.write(buffer) == 1
+            buffer[:] = -1
+        assert stream.rows_written == 10
+        assert stream.rows_buffered == 5
+        assert stream.shape == (10, 3)
+        assert stream.write(rows[15:]) == 10
+        assert stream.write(np.empty((0, 3))) == 0
+        with pytest.raises(ValueError):
+            stream.write(np.zeros((2, 4)))
+        stream.flush()
+        assert stream.shape == (25, 3)
+    assert stream.closed
+    with pytest.raises(ValueError):
+        stream.write(rows[0])
+    np.testing.assert_array_equal(Hdf5DataStorage.load_data(file_path)[0], rows)
+
+
+def test_stream_flush_interval_without_writes(storage):
+    file_path, _, _ = storage.save_data(np.empty((0, 3)), filename='data.h5')
+    stream = storage.open_stream(file_path, buffer_size=100, flush_interval=0.05)
+    stream.write(np.ones((3, 3)))
+    deadline = time.monotonic() + 5
+    while stream.rows_written < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert stream.rows_written == 3
+    assert stream.shape == (3, 3)
+    storage.close_streams()
+    assert stream.closed
+
+
+def test_close_all_streams(storage):
+    file_path, _, _ = storage.save_data(np.empty((0, 2)), filename='data.h5')
+    stream = storage.open_stream(file_path, flush_interval=60)
+    stream.write(np.arange(4.).reshape(2, 2))
+    DataStreamBase.close_all()
+    assert stream.closed
+    np.testing.assert_array_equal(Hdf5DataStorage.load_data(file_path)[0],
+                                  np.arange(4.).reshape(2, 2))
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for reading metadata and header info of qudi data files.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime
+
+import qudi.util.datastorage as datastorage
+from qudi.util.datastorage import TextDataStorage, CsvDataStorage, NpyDataStorage
+from qudi.util.datastorage import str_dict_to_metadata, metadata_to_str_dict, get_info_from_header
+from qudi.util.datastorage import get_header_from_file, get_metadata_from_file
+from qudi.util.datastorage import get_metadata_from_files
+
+# Values covering the int/float fast path as well as everything eval has to handle
+_literals = ['0', '00', '-0', '+5', '12', '-42', '1_000', '0777', '0_0', '1__0', '0x1F', '0b101',
+             '1.', '.5', '007.5', '-1.5e-3', '1e5', '1E+5', '1e400', '3_.1', '1.2.3', 'inf', 'nan',
+             '5j', 'True', 'None', "'text'", '[1, 2]', "{'a': 1.5}", 'not a literal', '']
+
+_metadata = {'int': 42,
+             'negative_int': -7,
+             'float': 2.87e9,
+             'small_float': -1.5e-12,
+             'zero': 0.0,
+             'complex': 1 + 2j,
+             'bool': True,
+             'none': None,
+             'str': 'diamond',
+             'zero_padded_str': '0777',
+             'list': [1, 2.5, 'a'],
+             'dict': {'gain': 2, 'mode': 'fast'}}
+
+
+def _eval_or_str(value):
+    try:
+        return eval(value)
+    except:
+        return value
+
+
+@pytest.mark.parametrize('value', _literals)
+def test_str_dict_to_metadata_matches_eval(value):
+    expected = _eval_or_str(value)
+    result = str_dict_to_metadata({'param': value})['param']
+    assert type(result) is type(expected)
+    if isinstance(expected, float) and np.isnan(expected):
+        assert np.isnan(result)
+    else:
+        assert result == expected
+
+
+def test_metadata_str_dict_round_trip():
+    assert str_dict_to_metadata(metadata_to_str_dict(_metadata)) == _metadata
+
+
+@pytest.fixture
+def saved_files(tmp_path):
+    """ Saves the same data set with all available storage types and returns the file paths.
+    """
+    storages = [TextDataStorage(root_dir=str(tmp_path), include_global_metadata=False),
+                CsvDataStorage(root_dir=str(tmp_path), include_global_metadata=False),
+                NpyDataStorage(root_dir=str(tmp_path), include_global_metadata=False)]
+    try:
+        storages.append(datastorage.Hdf5DataStorage(root_dir=str(tmp_path),
+                                                    include_global_metadata=False))
+    except ImportError:
+        pass
+    data = np.arange(12.).reshape(4, 3)
+    file_paths = list()
+    for ii, storage in enumerate(storages):
+        file_path, _, _ = storage.save_data(data,
+                                            timestamp=datetime(2021, 5, 1, 12, ii),
+                                            metadata=_metadata,
+                                            notes='some notes',
+                                            column_headers=['a', 'b', 'c'],
+                                            filename=f'data_{ii:d}{storage.file_extension}')
+        file_paths.append(file_path)
+    return file_paths
+
+
+def test_header_parser_matches_configparser(saved_files, monkeypatch):
+    text_files = [path for path in saved_files if path.endswith(('.dat', '.csv'))]
+    text_files.append(saved_files[2].rsplit('.', 1)[0] + '_metadata.txt')
+    headers = [get_header_from_file(path)[0] for path in text_files]
+    fast_infos = [get_info_from_header(header) for header in headers]
+    # Force the ConfigParser fallback
+    monkeypatch.setattr(datastorage, '_parse_header_sections', lambda header: None)
+    for header, (fast_general, fast_metadata) in zip(headers, fast_infos):
+        general, metadata = get_info_from_header(header)
+        assert fast_general == general
+        assert fast_metadata == metadata
+        assert metadata == _metadata
+
+
+def test_configparser_fallback_for_multiline_values():
+    header = "[General]\nnotes='some notes'\n[Metadata]\nPower = 13\nlist=[1,\n    2]\n"
+    assert datastorage._parse_header_sections(header) is None
+    general, metadata = get_info_from_header(header)
+    assert general['notes'] == 'some notes'
+    assert metadata == {'power': 13, 'list': [1, 2]}
+
+
+def test_get_metadata_from_files(saved_files, tmp_path):
+    missing = str(tmp_path / 'missing.dat')
+    results = get_metadata_from_files([*saved_files, missing], max_workers=2)
+    assert list(results) == [*saved_files, missing]
+    assert results[missing] is None
+    for ii, file_path in enumerate(saved_files):
+        metadata, general = results[file_path]
+        assert (metadata, general) == get_metadata_from_file(file_path)
+        assert metadata['zero_padded_str'] == '0777'
+        assert metadata == _metadata
+        assert general['timestamp'] == datetime(2021, 5, 1, 12, ii)
+        assert general['notes'] == 'some notes'
+        assert general['column_headers'] == ('a', 'b', 'c')
+    with pytest.raises(FileNotFoundError):
+        get_metadata_from_files([saved_files[0], missing], raise_errors=True)
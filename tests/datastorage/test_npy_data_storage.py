@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for saving and loading binary .npy data files with NpyDataStorage.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+
+from qudi.util.datastorage import NpyDataStorage
+
+
+@pytest.fixture
+def data():
+    return np.arange(60, dtype=float).reshape(20, 3)
+
+
+@pytest.fixture
+def metadata():
+    return {'power': 13.5, 'frequency': 2870000000, 'label': 'nv1', 'axes': ('x', 'y')}
+
+
+def _save(tmp_path, data, metadata, **kwargs):
+    storage = NpyDataStorage(root_dir=str(tmp_path), include_global_metadata=False, **kwargs)
+    file_path, timestamp, _ = storage.save_data(data,
+                                                metadata=metadata,
+                                                notes='some notes',
+                                                column_headers=['a', 'b', 'c'],
+                                                filename='data.npy')
+    return file_path, timestamp
+
+
+def test_load_data_round_trip(tmp_path, data, metadata):
+    file_path, timestamp = _save(tmp_path, data, metadata)
+    loaded, loaded_metadata, general = NpyDataStorage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, data)
+    assert loaded_metadata == metadata
+    assert general['timestamp'] == timestamp
+    assert general['notes'] == 'some notes'
+    assert general['column_headers'] == ('a', 'b', 'c')
+    assert general['shape'] == data.shape
+    assert general['dtype'] == data.dtype
+
+
+def test_load_data_mmap(tmp_path, data, metadata):
+    file_path, timestamp = _save(tmp_path, data, metadata)
+    loaded, loaded_metadata, general = NpyDataStorage.load_data(file_path, mmap_mode='r')
+    assert isinstance(loaded, np.memmap)
+    assert loaded.mode == 'r'
+    np.testing.assert_array_equal(loaded[5:10, 1], data[5:10, 1])
+    assert loaded_metadata == metadata
+    assert general['timestamp'] == timestamp
+    assert general['shape'] == data.shape
+    with pytest.raises(ValueError):
+        loaded[0, 0] = -1
+    del loaded
+
+
+def test_load_metadata(tmp_path, data, metadata):
+    file_path, timestamp = _save(tmp_path, data, metadata)
+    loaded_metadata, general = NpyDataStorage.load_metadata(file_path)
+    assert loaded_metadata == metadata
+    assert general['timestamp'] == timestamp
+    assert general['notes'] == 'some notes'
+    assert general['shape'] == data.shape
+    assert general['dtype'] == data.dtype
+
+
+def test_load_metadata_without_metadata_file(tmp_path, data):
+    file_path = str(tmp_path / 'plain.npy')
+    np.save(file_path, data)
+    loaded_metadata, general = NpyDataStorage.load_metadata(file_path)
+    assert loaded_metadata == dict()
+    assert general['shape'] == data.shape
+    assert general['dtype'] == data.dtype
+
+
+def test_load_metadata_format_version_3(tmp_path):
+    # numpy writes format version 3.0 for non-latin1 structured array field names
+    data = np.zeros(7, dtype=[('\u0394f', float), ('counts', int)])
+    file_path = str(tmp_path / 'structured.npy')
+    np.save(file_path, data)
+    with open(file_path, 'rb') as file:
+        assert np.lib.format.read_magic(file) == (3, 0)
+    loaded_metadata, general = NpyDataStorage.load_metadata(file_path)
+    assert general['shape'] == data.shape
+    assert general['dtype'] == data.dtype
+
+
+def test_load_metadata_unknown_format_version(tmp_path, data):
+    file_path = str(tmp_path / 'plain.npy')
+    np.save(file_path, data)
+    with open(file_path, 'r+b') as file:
+        file.seek(6)
+        file.write(bytes([4, 0]))
+    with pytest.raises(ValueError):
+        NpyDataStorage.load_metadata(file_path)
+
+
+def test_embed_metadata(tmp_path, data, metadata):
+    file_path, timestamp = _save(tmp_path, data, metadata, embed_metadata=True)
+    assert not (tmp_path / 'data_metadata.txt').exists()
+    # Read back with qudi
+    loaded, loaded_metadata, general = NpyDataStorage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, data)
+    assert loaded_metadata == metadata
+    assert general['timestamp'] == timestamp
+    assert general['notes'] == 'some notes'
+    assert general['column_headers'] == ('a', 'b', 'c')
+    assert NpyDataStorage.load_metadata(file_path) == (loaded_metadata, general)
+    mapped, mapped_metadata, _ = NpyDataStorage.load_data(file_path, mmap_mode='r')
+    np.testing.assert_array_equal(mapped, data)
+    assert mapped_metadata == metadata
+    del mapped
+    # Read back with plain numpy
+    np.testing.assert_array_equal(np.load(file_path), data)
+    mapped = np.load(file_path, mmap_mode='r')
+    np.testing.assert_array_equal(mapped, data)
+    del mapped
+
+
+@pytest.mark.parametrize('shape,dtype', [((0, 3), float), ((7,), np.int32), ((2, 3, 4), complex)])
+def test_embed_metadata_shapes_and_dtypes(tmp_path, metadata, shape, dtype):
+    data = np.arange(np.prod(shape)).reshape(shape).astype(dtype)
+    file_path, _ = _save(tmp_path, data, metadata, embed_metadata=True)
+    loaded, loaded_metadata, general = NpyDataStorage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, data)
+    assert loaded.dtype == data.dtype
+    assert loaded_metadata == metadata
+    assert general['shape'] == shape
+    np.testing.assert_array_equal(np.load(file_path), data)
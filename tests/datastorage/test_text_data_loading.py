@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains regression tests for loading text data files saved by qudi.util.datastorage.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+
+from qudi.util.datastorage import TextDataStorage, CsvDataStorage
+
+
+@pytest.fixture(params=[TextDataStorage, CsvDataStorage])
+def storage(request, tmp_path):
+    return request.param(root_dir=str(tmp_path), include_global_metadata=False)
+
+
+def _save(storage, data, **kwargs):
+    file_path, _, _ = storage.save_data(data, filename='data' + storage.file_extension, **kwargs)
+    return file_path
+
+
+def test_first_row_is_loaded(storage):
+    data = np.arange(20, dtype=float).reshape(10, 2)
+    file_path = _save(storage, data, column_headers=('a', 'b'))
+    loaded, _, general = storage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, data)
+    assert tuple(general['column_headers']) == ('a', 'b')
+
+
+def test_single_row_file(storage):
+    file_path = _save(storage, np.array([[1., 2., 3.]]))
+    loaded, _, _ = storage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, [1, 2, 3])
+    chunks = list(storage.load_data(file_path, chunk_size=5)[0])
+    assert len(chunks) == 1
+    np.testing.assert_array_equal(chunks[0], [[1, 2, 3]])
+
+
+def test_vector_file(storage):
+    # 1D data is saved as single row
+    file_path = _save(storage, np.arange(4, dtype=float))
+    loaded, _, _ = storage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, np.arange(4))
+    # Single column data
+    file_path = _save(storage, np.arange(7, dtype=float).reshape(-1, 1))
+    loaded, _, _ = storage.load_data(file_path)
+    np.testing.assert_array_equal(loaded, np.arange(7))
+    chunks = list(storage.load_data(file_path, chunk_size=3)[0])
+    assert [chunk.shape for chunk in chunks] == [(3,), (3,), (1,)]
+    np.testing.assert_array_equal(np.concatenate(chunks), np.arange(7))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 5, 10, 20])
+def test_chunk_sizes(storage, chunk_size):
+    data = np.arange(20, dtype=float).reshape(10, 2)
+    file_path = _save(storage, data)
+    chunks = list(storage.load_data(file_path, chunk_size=chunk_size)[0])
+    expected_rows = [min(chunk_size, 10 - start) for start in range(0, 10, chunk_size)]
+    assert [chunk.shape for chunk in chunks] == [(rows, 2) for rows in expected_rows]
+    np.testing.assert_array_equal(np.concatenate(chunks), data)
+
+
+@pytest.mark.parametrize('chunk_size', [0, -1])
+def test_invalid_chunk_size(storage, chunk_size):
+    file_path = _save(storage, np.ones((3, 2)))
+    with pytest.raises(ValueError):
+        storage.load_data(file_path, chunk_size=chunk_size)
+
+
+def test_genfromtxt_fallback(storage):
+    # Mixed column dtypes are loaded as structured array by numpy.genfromtxt
+    data = np.array([(1, 0.5, 'a'), (2, 1.5, 'b'), (3, 2.5, 'c')],
+                    dtype=[('f0', int), ('f1', float), ('f2', 'U1')])
+    file_path = _save(storage, data, column_dtypes=[int, float, str])
+    loaded, _, _ = storage.load_data(file_path)
+    np.testing.assert_array_equal(loaded['f0'], [1, 2, 3])
+    np.testing.assert_array_equal(loaded['f1'], [0.5, 1.5, 2.5])
+    chunks = list(storage.load_data(file_path, chunk_size=2)[0])
+    assert [chunk.shape for chunk in chunks] == [(2,), (1,)]
+
+    # numpy.loadtxt fails on missing values and numpy.genfromtxt fills them with NaN
+    file_path = _save(storage, np.array([[1., 2.], [3., 4.]]))
+    with open(file_path, 'a') as file:
+        file.write(f'5.0{storage.delimiter}\n')
+    loaded, _, _ = storage.load_data(file_path)
+    np.testing.assert_array_equal(loaded[:2], [[1, 2], [3, 4]])
+    assert loaded[2, 0] == 5 and np.isnan(loaded[2, 1])
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests for the qudi.util.datastorage.TextDataStream streaming writer.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+
+from qudi.util.datastorage import TextDataStorage, TextDataStream
+
+
+def _new_file(tmp_path):
+    storage = TextDataStorage(root_dir=str(tmp_path), include_global_metadata=False)
+    file_path, _ = storage.new_file(filename='stream.dat', column_headers=('a', 'b'))
+    return storage, file_path
+
+
+def test_stream_buffers_and_closes(tmp_path):
+    storage, file_path = _new_file(tmp_path)
+    with storage.open_stream(file_path, buffer_size=3, flush_interval=1e3) as stream:
+        stream.write(np.array([1., 2.]))
+        stream.write(np.array([[3., 4.], [5., 6.]]))
+        assert stream.rows_written == 3
+        stream.write(np.array([7., 8.]))
+        assert stream.rows_buffered == 1
+    assert stream.closed
+    data, _, _ = TextDataStorage.load_data(file_path)
+    np.testing.assert_array_equal(data, [[1, 2], [3, 4], [5, 6], [7, 8]])
+
+
+def test_stream_flush_interval_without_writes(tmp_path):
+    storage, file_path = _new_file(tmp_path)
+    stream = storage.open_stream(file_path, buffer_size=1000, flush_interval=0.05)
+    try:
+        stream.write(np.array([1., 2.]))
+        # Acquisition stopped. The background thread must write the buffered row.
+        deadline = time.monotonic() + 5
+        while stream.rows_written == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert stream.rows_written == 1
+        data, _, _ = TextDataStorage.load_data(file_path)
+        np.testing.assert_array_equal(np.atleast_2d(data), [[1, 2]])
+    finally:
+        stream.close()
+
+
+def test_close_streams_and_close_all(tmp_path):
+    storage, file_path = _new_file(tmp_path)
+    stream = storage.open_stream(file_path, flush_interval=1e3)
+    stream.write(np.array([1., 2.]))
+    storage.close_streams()
+    assert stream.closed
+    data, _, _ = TextDataStorage.load_data(file_path)
+    np.testing.assert_array_equal(np.atleast_2d(data), [[1, 2]])
+
+    other_path, _ = storage.new_file(filename='other.dat', column_headers=('a', 'b'))
+    other = storage.open_stream(other_path, flush_interval=1e3)
+    other.write(np.array([3., 4.]))
+    TextDataStream.close_all()
+    assert other.closed
+    data, _, _ = TextDataStorage.load_data(other_path)
+    np.testing.assert_array_equal(np.atleast_2d(data), [[3, 4]])
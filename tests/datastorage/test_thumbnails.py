@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for saving data thumbnails (matplotlib figures) with qudi data storage objects.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import threading
+import numpy as np
+import pytest
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from PySide2 import QtCore
+
+import qudi.util.datastorage as datastorage
+from qudi.util.datastorage import DataStorageBase, ImageFormat, TextDataStorage, ThumbnailRenderer
+from qudi.core.threadmanager import ThreadManager
+
+_file_signatures = {ImageFormat.PDF: b'%PDF', ImageFormat.PNG: b'\x89PNG'}
+
+
+@pytest.fixture
+def pyplot_threads(monkeypatch):
+    """ Records the threads calling pyplot.close in the datastorage module.
+    """
+    threads = list()
+    close = plt.close
+
+    def recording_close(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return close(*args, **kwargs)
+
+    monkeypatch.setattr(datastorage.plt, 'close', recording_close)
+    return threads
+
+
+def _pyplot_figure():
+    figure, axes = plt.subplots()
+    axes.plot(np.arange(10), np.arange(10) ** 2)
+    return figure
+
+
+def _check_image_file(file_path, image_format):
+    assert file_path.endswith(image_format.value)
+    with open(file_path, 'rb') as file:
+        assert file.read(4) == _file_signatures[image_format]
+
+
+@pytest.mark.parametrize('image_format', [ImageFormat.PDF, ImageFormat.PNG])
+def test_save_thumbnail(tmp_path, pyplot_threads, image_format):
+    storage = TextDataStorage(root_dir=str(tmp_path), image_format=image_format)
+    figure = _pyplot_figure()
+    file_path = storage.save_thumbnail(figure, str(tmp_path / 'thumbnail'))
+    _check_image_file(file_path, image_format)
+    assert not plt.fignum_exists(figure.number)
+    assert pyplot_threads == [threading.current_thread()]
+
+
+@pytest.mark.parametrize('image_format', [ImageFormat.PDF, ImageFormat.PNG])
+def test_save_thumbnail_async(tmp_path, pyplot_threads, image_format):
+    storage = TextDataStorage(root_dir=str(tmp_path), image_format=image_format)
+    figures = [_pyplot_figure() for _ in range(3)] + [Figure()]
+    try:
+        futures = [storage.save_thumbnail_async(figure, str(tmp_path / f'thumbnail_{ii:d}'))
+                   for ii, figure in enumerate(figures)]
+        # Figures are closed in the calling thread before rendering
+        assert not any(plt.fignum_exists(figure.number) for figure in figures[:3])
+        for future in futures:
+            _check_image_file(future.result(timeout=30), image_format)
+    finally:
+        assert DataStorageBase.drain_async_saves(timeout=30)
+    # pyplot has never been used by the background writer thread
+    assert pyplot_threads
+    assert all(thread is threading.current_thread() for thread in pyplot_threads)
+
+
+def test_thumbnail_renderer_in_process(tmp_path, pyplot_threads):
+    renderer = ThumbnailRenderer(max_workers=0)
+    figure = _pyplot_figure()
+    future = renderer.render_figure(figure, str(tmp_path / 'figure'), ImageFormat.PNG)
+    _check_image_file(future.result(), ImageFormat.PNG)
+    assert not plt.fignum_exists(figure.number)
+    future = renderer.render_image(np.random.rand(10, 20),
+                                   str(tmp_path / 'image'),
+                                   ImageFormat.PDF,
+                                   extent=(0, 1, 0, 2),
+                                   title='image',
+                                   colorbar_label='counts')
+    _check_image_file(future.result(), ImageFormat.PDF)
+    assert renderer.pending_count == 0
+
+
+def _process_events_until(condition, timeout=10):
+    app = QtCore.QCoreApplication.instance()
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    return condition()
+
+
+def test_async_save_worker_registered_in_main_thread(tmp_path, monkeypatch):
+    if QtCore.QCoreApplication.instance() is None:
+        _app = QtCore.QCoreApplication([])
+    assert DataStorageBase.drain_async_saves(timeout=30)
+    thread_manager = ThreadManager()
+    registering_threads = list()
+    register_thread = thread_manager.register_thread
+
+    def recording_register_thread(thread):
+        registering_threads.append(threading.current_thread())
+        return register_thread(thread)
+
+    monkeypatch.setattr(thread_manager, 'register_thread', recording_register_thread)
+    storage = TextDataStorage(root_dir=str(tmp_path))
+    futures = list()
+    saving_thread = threading.Thread(
+        target=lambda: futures.append(storage.save_data_async(np.arange(10), nametag='async'))
+    )
+    try:
+        saving_thread.start()
+        saving_thread.join()
+        futures[0].result(timeout=30)
+        # Registration is queued until the main thread processes events
+        assert not registering_threads
+        assert _process_events_until(lambda: registering_threads)
+        assert registering_threads == [threading.main_thread()]
+        assert len(thread_manager.thread_names) == 1
+    finally:
+        assert DataStorageBase.drain_async_saves(timeout=30)
+    assert _process_events_until(lambda: not thread_manager.thread_names)
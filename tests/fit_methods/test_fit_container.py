@@ -0,0 +1,622 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests for fitting data with qudi.util.datafitting.FitContainer.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import unittest
+import threading
+import lmfit
+import numpy as np
+from unittest import mock
+from concurrent.futures import CancelledError
+from PySide2 import QtCore
+
+import qudi.util.datafitting as datafitting
+from qudi.util.datafitting import FitConfigurationsModel, FitContainer, FitTracker,\
+    HighResBestFit
+from qudi.util.fit_models.gaussian import Gaussian
+
+
+def gaussian(x, offset=1., amplitude=3., center=0., sigma=0.7):
+    return offset + amplitude * np.exp(-0.5 * ((x - center) / sigma) ** 2)
+
+
+def create_fit_container(estimator='Peak', **kwargs):
+    config_model = FitConfigurationsModel()
+    config_model.add_configuration('gauss', 'Gaussian')
+    config_model.get_configuration_by_name('gauss').estimator = estimator
+    return FitContainer(config_model=config_model, **kwargs)
+
+
+class TestFitDataBatch(unittest.TestCase):
+    _x = np.linspace(-5, 5, 101)
+    _centers = np.linspace(-1, 1, 6)
+
+    def setUp(self):
+        rng = np.random.default_rng(1234)
+        self.data = np.array([gaussian(self._x, center=center) for center in self._centers])
+        self.data += rng.normal(0, 0.02, self.data.shape)
+        self.container = create_fit_container()
+
+    def tearDown(self):
+        self.container.shutdown_batch_workers()
+
+    def _check_results(self, results):
+        self.assertEqual(results.shape, (len(self._centers),))
+        for name in ('success', 'redchi', 'offset', 'offset_stderr', 'amplitude',
+                     'amplitude_stderr', 'center', 'center_stderr', 'sigma', 'sigma_stderr'):
+            self.assertIn(name, results.dtype.names)
+        self.assertTrue(np.all(results['success']))
+        np.testing.assert_allclose(results['center'], self._centers, atol=0.01)
+        np.testing.assert_allclose(results['sigma'], 0.7, atol=0.01)
+        self.assertTrue(np.all(results['center_stderr'] > 0))
+
+    def test_sequential(self):
+        results = self.container.fit_data_batch('gauss', self._x, self.data, max_workers=0)
+        self._check_results(results)
+        # Same results as individual fits
+        for row, data in zip(results, self.data):
+            _, result = self.container.fit_data('gauss', self._x, data)
+            for name, value in result.best_values.items():
+                self.assertAlmostEqual(row[name], value, places=10)
+            self.assertAlmostEqual(row['redchi'], result.redchi, places=10)
+
+    def test_does_not_alter_last_fit(self):
+        self.container.fit_data_batch('gauss', self._x, self.data, max_workers=0)
+        self.assertEqual(self.container.last_fit, ('No Fit', None))
+
+    def test_process_pool(self):
+        expected = self.container.fit_data_batch('gauss', self._x, self.data, max_workers=0)
+        for _ in range(2):
+            # Second call reuses the worker processes
+            results = self.container.fit_data_batch('gauss', self._x, self.data, max_workers=2)
+            self._check_results(results)
+            for name in results.dtype.names:
+                np.testing.assert_allclose(results[name], expected[name], rtol=1e-10)
+
+    def test_failed_rows(self):
+        self.data[2] = np.nan
+        results = self.container.fit_data_batch('gauss', self._x, self.data, max_workers=0)
+        self.assertFalse(results[2]['success'])
+        self.assertTrue(np.isnan(results[2]['center']))
+        self.assertTrue(np.isnan(results[2]['redchi']))
+        mask = np.arange(len(self._centers)) != 2
+        self.assertTrue(np.all(results['success'][mask]))
+        np.testing.assert_allclose(results['center'][mask], self._centers[mask], atol=0.01)
+
+    def test_invalid_data_shape(self):
+        with self.assertRaises(ValueError):
+            self.container.fit_data_batch('gauss', self._x, self.data[0], max_workers=0)
+        with self.assertRaises(ValueError):
+            self.container.fit_data_batch('gauss', self._x[1:], self.data, max_workers=0)
+
+
+
+class TestWarmStart(unittest.TestCase):
+    _x = np.linspace(-5, 5, 101)
+
+    def setUp(self):
+        self.rng = np.random.default_rng(1234)
+        self.container = create_fit_container(warm_start=True)
+
+    def _data(self, center=0., x=None):
+        x = self._x if x is None else x
+        return gaussian(x, center=center) + self.rng.normal(0, 0.02, x.size)
+
+    def _fit(self, center=0., x=None):
+        x = self._x if x is None else x
+        _, result = self.container.fit_data('gauss', x, self._data(center, x))
+        self.assertTrue(result.success)
+        self.assertAlmostEqual(result.best_values['center'], center, delta=0.01)
+        return result
+
+    def test_warm_start(self):
+        self.assertFalse(self._fit(0.).warm_start)
+        self.assertTrue(self._fit(0.05).warm_start)
+        self.assertTrue(self._fit(0.1).warm_start)
+
+    def test_disabled(self):
+        self.container.warm_start = False
+        self.assertFalse(self._fit(0.).warm_start)
+        self.assertFalse(self._fit(0.05).warm_start)
+
+    def test_changed_x(self):
+        self.assertFalse(self._fit(0.).warm_start)
+        self.assertFalse(self._fit(0., x=self._x * 1.01).warm_start)
+        self.assertTrue(self._fit(0., x=self._x * 1.01).warm_start)
+
+    def test_changed_configuration(self):
+        self.assertFalse(self._fit(0.).warm_start)
+        config = self.container.fit_configurations[0]
+        config.estimator = 'Peak'
+        self.assertTrue(self._fit(0.).warm_start)
+        parameters = lmfit.Parameters()
+        parameters.add('offset', value=1, vary=False)
+        config.custom_parameters = parameters
+        self.assertFalse(self._fit(0.).warm_start)
+        self.assertTrue(self._fit(0.).warm_start)
+
+    def test_state_reset(self):
+        self.assertFalse(self._fit(0.).warm_start)
+        # Toggling warm_start or changing the objective resets the warm-start state
+        self.container.warm_start = True
+        self.assertFalse(self._fit(0.).warm_start)
+        self.container.objective = 'least_squares'
+        self.assertFalse(self._fit(0.).warm_start)
+        # "No Fit" clears the last fit result
+        self.container.fit_data('No Fit', self._x, self._data())
+        self.assertFalse(self._fit(0.).warm_start)
+
+    def test_tolerance(self):
+        self.assertFalse(self._fit(0.).warm_start)
+        # Every warm-started fit is rejected and repeated starting from the estimator
+        self.container.warm_start_tolerance = 0
+        self.assertFalse(self._fit(0.05).warm_start)
+        self.assertFalse(self._fit(0.05).warm_start)
+        self.container.warm_start_tolerance = 2
+        self.assertTrue(self._fit(0.05).warm_start)
+
+    def test_rejected_warm_start(self):
+        self.assertFalse(self._fit(0.).warm_start)
+        # Peak far outside the last fit result. The warm-started fit diverges or fits poorly.
+        _, result = self.container.fit_data('gauss', self._x, self._data(-3.5) * 5)
+        self.assertFalse(result.warm_start)
+        self.assertAlmostEqual(result.best_values['center'], -3.5, delta=0.01)
+        self.assertAlmostEqual(result.best_values['sigma'], 0.7, delta=0.01)
+
+
+
+class TestModelCache(unittest.TestCase):
+    _x = np.linspace(-5, 5, 101)
+
+    def setUp(self):
+        self.data = gaussian(self._x, center=0.5)
+        self.config_model = FitConfigurationsModel()
+        self.config_model.add_configuration('gauss', 'Gaussian')
+        self.config = self.config_model.get_configuration_by_name('gauss')
+        self.config.estimator = 'Peak'
+        self.container = FitContainer(config_model=self.config_model)
+
+    def _fit(self):
+        return self.container.fit_data('gauss', self._x, self.data)[1]
+
+    def test_model_reused(self):
+        model = self._fit().model
+        self.assertIs(self._fit().model, model)
+
+    def test_custom_parameters_change(self):
+        model = self._fit().model
+        parameters = lmfit.Parameters()
+        parameters.add('sigma', value=0.5, vary=False)
+        self.config.custom_parameters = parameters
+        result = self._fit()
+        self.assertIsNot(result.model, model)
+        self.assertEqual(result.best_values['sigma'], 0.5)
+        # Altering the original parameters object does not affect the cached parameters
+        parameters['sigma'].set(value=0.6)
+        self.assertEqual(self._fit().best_values['sigma'], 0.5)
+        self.config.custom_parameters = None
+        self.assertAlmostEqual(self._fit().best_values['sigma'], 0.7, places=6)
+
+    def test_estimator_change(self):
+        model = self._fit().model
+        self.config.estimator = 'Dip'
+        self.assertIsNot(self._fit().model, model)
+
+    def test_configurations_changed(self):
+        model = self._fit().model
+        config_model = self.config_model
+        config_model.add_configuration('other', 'Lorentzian')
+        self.assertIsNot(self._fit().model, model)
+        # Replacing a configuration by a new one with the same name
+        model = self._fit().model
+        config_model.remove_configuration('gauss')
+        config_model.add_configuration('gauss', 'Lorentzian')
+        config_model.get_configuration_by_name('gauss').estimator = 'Peak'
+        result = self._fit()
+        self.assertIsNot(result.model, model)
+        self.assertEqual(type(result.model).__name__, 'Lorentzian')
+
+    def test_concurrent_fits(self):
+        # Each thread fits with its own cached model instance
+        centers = np.linspace(-1, 1, 4)
+        barrier = threading.Barrier(len(centers) + 1)
+        results = dict()
+
+        def fit_repeatedly(center):
+            data = gaussian(self._x, center=center)
+            barrier.wait()
+            results[center] = [self.container.fit_data('gauss', self._x, data)[1] for _ in
+                               range(5)]
+
+        threads = [threading.Thread(target=fit_repeatedly, args=(center,)) for center in centers]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        async_result = self.container.fit_data_async('gauss', self._x, self.data).result()[1]
+        main_model = self._fit().model
+        for thread in threads:
+            thread.join()
+        self.container.shutdown_async_fits()
+
+        models = [main_model, async_result.model]
+        for center, thread_results in results.items():
+            thread_models = {id(result.model) for result in thread_results}
+            self.assertEqual(len(thread_models), 1)
+            models.append(thread_results[0].model)
+            for result in thread_results:
+                self.assertTrue(result.success)
+                self.assertAlmostEqual(result.best_values['center'], center, places=5)
+        self.assertEqual(len({id(model) for model in models}), len(models))
+        self.assertAlmostEqual(async_result.best_values['center'], 0.5, places=5)
+        # Configuration changes invalidate the model caches of all threads
+        self.config_model.add_configuration('other', 'Lorentzian')
+        self.assertIsNot(self._fit().model, main_model)
+
+
+class TestHighResBestFit(unittest.TestCase):
+    _x = np.linspace(-5, 5, 101)
+
+    def setUp(self):
+        self.container = create_fit_container()
+        self.data = gaussian(self._x, center=0.5)
+
+    def test_lazy_evaluation(self):
+        _, result = self.container.fit_data('gauss', self._x, self.data)
+        high_res = result.high_res_best_fit
+        self.assertIsInstance(high_res, HighResBestFit)
+        self.assertFalse(high_res.is_evaluated)
+        self.assertEqual(len(high_res), 2)
+        self.assertFalse(high_res.is_evaluated)
+        x, y = high_res
+        self.assertTrue(high_res.is_evaluated)
+        self.assertEqual(x.size, 10 * self._x.size)
+        self.assertEqual((x[0], x[-1]), (self._x[0], self._x[-1]))
+        np.testing.assert_allclose(y, result.model.eval(result.params, x=x))
+        # Evaluated only once
+        self.assertIs(high_res[0], x)
+
+    def test_container_settings(self):
+        self.container.high_res_oversampling = 5
+        self.container.high_res_max_points = 300
+        self.container.high_res_range = (4, -1)
+        _, result = self.container.fit_data('gauss', self._x, self.data)
+        x, y = result.high_res_best_fit
+        self.assertEqual(x.size, 300)
+        self.assertEqual((x[0], x[-1]), (-1, 4))
+        self.container.high_res_max_points = 10
+        _, result = self.container.fit_data('gauss', self._x, self.data)
+        # Never less points than the original data
+        self.assertEqual(result.high_res_best_fit[0].size, self._x.size)
+
+    def test_evaluate(self):
+        model = Gaussian()
+        values = {'offset': 1., 'amplitude': 3., 'center': 0.5, 'sigma': 0.7}
+        # Descending x-axis
+        high_res = HighResBestFit(model, values, self._x[::-1], oversampling=2)
+        x, y = high_res.evaluate(x_range=(-2, 10), points=50)
+        self.assertFalse(high_res.is_evaluated)
+        self.assertEqual((x.size, x[0], x[-1]), (50, 5, -2))
+        np.testing.assert_allclose(y, gaussian(x, center=0.5))
+        x, y = high_res.evaluate(x_range=(6, 10))
+        self.assertEqual((x.size, y.size), (0, 0))
+        x, _ = high_res
+        self.assertEqual((x.size, x[0], x[-1]), (2 * self._x.size, 5, -5))
+
+    def test_no_fit(self):
+        self.assertEqual(self.container.fit_data('No Fit', self._x, self.data), ('No Fit', None))
+
+
+
+class TestFitDataAsync(unittest.TestCase):
+    _x = np.linspace(-5, 5, 101)
+    _timeout = 30
+
+    def setUp(self):
+        self.container = create_fit_container()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        get_fit_parameters = datafitting._get_fit_parameters
+
+        def blocking_get_fit_parameters(*args, **kwargs):
+            # Blocks the worker thread until released by the test
+            self.started.set()
+            self.release.wait(self._timeout)
+            return get_fit_parameters(*args, **kwargs)
+
+        patcher = mock.patch.object(datafitting,
+                                    '_get_fit_parameters',
+                                    side_effect=blocking_get_fit_parameters)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.container.shutdown_async_fits)
+        self.addCleanup(self.release.set)
+
+    def _start_blocked_fit(self, center=0., **kwargs):
+        self.started.clear()
+        self.release.clear()
+        future = self.container.fit_data_async('gauss', self._x, gaussian(self._x, center=center),
+                                               **kwargs)
+        self.assertTrue(self.started.wait(self._timeout))
+        return future
+
+    def test_fit_data_async(self):
+        received = list()
+        self.container.sigLastFitResultChanged.connect(
+            lambda config, result: received.append((config, result)),
+            QtCore.Qt.DirectConnection
+        )
+        self.release.set()
+        future = self.container.fit_data_async('gauss', self._x, gaussian(self._x, center=0.5))
+        config, result = future.result(self._timeout)
+        self.assertEqual(config, 'gauss')
+        self.assertAlmostEqual(result.best_values['center'], 0.5, places=6)
+        self.assertEqual(self.container.last_fit, (config, result))
+        self.assertEqual(received, [(config, result)])
+
+    def test_supersede(self):
+        running = self._start_blocked_fit(0.)
+        pending = self.container.fit_data_async('gauss',
+                                                self._x,
+                                                gaussian(self._x, center=0.2),
+                                                supersede=False)
+        latest = self.container.fit_data_async('gauss', self._x, gaussian(self._x, center=0.4))
+        self.release.set()
+        _, result = latest.result(self._timeout)
+        self.assertAlmostEqual(result.best_values['center'], 0.4, places=6)
+        self.assertTrue(pending.cancelled())
+        with self.assertRaises(CancelledError):
+            running.result(self._timeout)
+        self.assertEqual(self.container.last_fit, ('gauss', result))
+
+    def test_cancel(self):
+        self.release.set()
+        _, last_result = self.container.fit_data('gauss', self._x, gaussian(self._x))
+        running = self._start_blocked_fit(0.5)
+        self.container.cancel_async_fits()
+        self.release.set()
+        with self.assertRaises(CancelledError):
+            running.result(self._timeout)
+        self.assertEqual(self.container.last_fit, ('gauss', last_result))
+
+    def test_shutdown(self):
+        running = self._start_blocked_fit(0.)
+        pending = self.container.fit_data_async('gauss',
+                                                self._x,
+                                                gaussian(self._x, center=0.2),
+                                                supersede=False)
+        shutdown = threading.Thread(target=self.container.shutdown_async_fits)
+        shutdown.start()
+        self.release.set()
+        shutdown.join(self._timeout)
+        self.assertFalse(shutdown.is_alive())
+        self.assertTrue(pending.cancelled())
+        with self.assertRaises(CancelledError):
+            running.result(self._timeout)
+        self.assertEqual(self.container.last_fit, ('No Fit', None))
+        # Starts a new worker thread
+        future = self.container.fit_data_async('gauss', self._x, gaussian(self._x, center=0.3))
+        _, result = future.result(self._timeout)
+        self.assertAlmostEqual(result.best_values['center'], 0.3, places=6)
+
+
+
+class TestFitTracker(unittest.TestCase):
+    _x = np.linspace(-5, 5, 201)
+
+    def setUp(self):
+        self.rng = np.random.default_rng(1234)
+        self.container = create_fit_container()
+
+    def _data(self, center):
+        return gaussian(self._x, center=center) + self.rng.normal(0, 0.02, self._x.size)
+
+    def test_tracking(self):
+        tracker = FitTracker(self.container, 'gauss', process_noise={'center': 0.05})
+        self.assertEqual(tracker.current_values, dict())
+        self.assertIsNone(tracker.current_covariance)
+        centers = np.linspace(0, 0.5, 11)
+        for center in centers:
+            values = tracker.update(self._x, self._data(center))
+            self.assertAlmostEqual(values['center'], center, delta=0.02)
+            self.assertAlmostEqual(values['sigma'], 0.7, delta=0.02)
+        self.assertEqual(set(tracker.tracked_parameters), {'offset', 'amplitude', 'center', 'sigma'})
+        self.assertEqual(tracker.current_covariance.shape, (4, 4))
+        self.assertEqual(tracker.current_values, values)
+        trajectory = tracker.trajectory
+        self.assertEqual(trajectory.shape, centers.shape)
+        # Only the first data set is fitted from scratch
+        self.assertTrue(trajectory['refit'][0])
+        self.assertFalse(np.any(trajectory['refit'][1:]))
+        np.testing.assert_allclose(trajectory['center'], centers, atol=0.02)
+        self.assertTrue(np.all(trajectory['center_stderr'] > 0))
+        self.assertTrue(np.all(trajectory['redchi'] < 2 * 0.02 ** 2))
+        # Tracking does not publish results as last_fit
+        self.assertNotEqual(self.container.last_fit[1].best_values['center'], values['center'])
+
+    def test_weights(self):
+        tracker = FitTracker(self.container, 'gauss')
+        weights = np.full(self._x.size, 2.)
+        for center in (0, 0.02, 0.04):
+            values = tracker.update(self._x, self._data(center), weights)
+            self.assertAlmostEqual(values['center'], center, delta=0.02)
+        self.assertFalse(np.any(tracker.trajectory['refit'][1:]))
+
+    def test_refit(self):
+        tracker = FitTracker(self.container, 'gauss')
+        tracker.update(self._x, self._data(0))
+        tracker.update(self._x, self._data(0.01))
+        # Jump of the peak can not be described by the tracked state anymore
+        values = tracker.update(self._x, self._data(-2.5))
+        self.assertAlmostEqual(values['center'], -2.5, delta=0.02)
+        self.assertEqual(tracker.trajectory['refit'].tolist(), [True, False, True])
+        # Reset discards the tracked state and trajectory
+        tracker.reset()
+        self.assertEqual(tracker.trajectory.size, 0)
+        tracker.update(self._x, self._data(0))
+        self.assertEqual(tracker.trajectory['refit'].tolist(), [True])
+
+    def test_fit_configuration(self):
+        with self.assertRaises(ValueError):
+            FitTracker(self.container, 'No Fit')
+        # Models without analytic Jacobian are linearized by finite differences
+        Gaussian.use_analytic_jacobian = False
+        try:
+            tracker = FitTracker(self.container, 'gauss')
+            for center in (0, 0.02, 0.04):
+                values = tracker.update(self._x, self._data(center))
+                self.assertAlmostEqual(values['center'], center, delta=0.02)
+        finally:
+            del Gaussian.use_analytic_jacobian
+        self.assertFalse(np.any(tracker.trajectory['refit'][1:]))
+
+
+
+class TestFitDataMap(unittest.TestCase):
+    _x = np.linspace(-5, 5, 101)
+    _shape = (4, 5)
+
+    def setUp(self):
+        rng = np.random.default_rng(1234)
+        rows, columns = np.indices(self._shape)
+        self.centers = 0.1 * rows + 0.05 * columns - 0.2
+        self.data = gaussian(self._x, center=self.centers[..., np.newaxis])
+        self.data += rng.normal(0, 0.02, self.data.shape)
+        self.container = create_fit_container()
+
+    def tearDown(self):
+        self.container.shutdown_batch_workers()
+
+    def _check_results(self, results):
+        self.assertEqual(results.shape, self._shape)
+        for name in ('success', 'redchi', 'warm_start', 'offset', 'offset_stderr', 'amplitude',
+                     'amplitude_stderr', 'center', 'center_stderr', 'sigma', 'sigma_stderr'):
+            self.assertIn(name, results.dtype.names)
+        self.assertTrue(np.all(results['success']))
+        np.testing.assert_allclose(results['center'], self.centers, atol=0.01)
+        np.testing.assert_allclose(results['sigma'], 0.7, atol=0.01)
+        self.assertTrue(np.all(results['center_stderr'] > 0))
+
+    def _pixel_index(self, spectrum):
+        matches = np.all(self.data == spectrum, axis=-1)
+        self.assertEqual(np.count_nonzero(matches), 1)
+        return tuple(np.argwhere(matches)[0])
+
+    @staticmethod
+    def _list_shared_memory():
+        # POSIX shared memory blocks (ignoring semaphores of the worker process pool)
+        if not os.path.isdir('/dev/shm'):
+            return set()
+        return {name for name in os.listdir('/dev/shm') if not name.startswith('sem.')}
+
+    def test_sequential(self):
+        progress = list()
+        results = self.container.fit_data_map('gauss',
+                                              self._x,
+                                              self.data,
+                                              max_workers=0,
+                                              progress_callback=lambda *args: progress.append(args))
+        self._check_results(results)
+        # All pixels except the very first one are seeded by the preceding neighbour
+        expected_warm_start = np.ones(self._shape, dtype=bool)
+        expected_warm_start[0, 0] = False
+        np.testing.assert_array_equal(results['warm_start'], expected_warm_start)
+        # Progress is reported once per row
+        total = self.data.shape[0] * self.data.shape[1]
+        self.assertEqual(progress, [(self._shape[1] * ii, total) for ii in range(1, 5)])
+
+    def test_snake_order(self):
+        seeded_pixels = list()
+
+        def fit_warm_start(model, last_result, tolerance, data, fit_kwargs):
+            seeded_pixels.append(self._pixel_index(data))
+            return warm_start_func(model, last_result, tolerance, data, fit_kwargs)
+
+        warm_start_func = FitContainer._fit_warm_start
+        with mock.patch.object(FitContainer, '_fit_warm_start', side_effect=fit_warm_start):
+            self.container.fit_data_map('gauss', self._x, self.data, max_workers=0)
+        expected_order = list()
+        for row in range(self._shape[0]):
+            columns = range(self._shape[1])
+            expected_order.extend((row, column) for column in
+                                  (columns if row % 2 == 0 else reversed(columns)))
+        self.assertEqual(seeded_pixels, expected_order[1:])
+
+    def test_unseeded(self):
+        results = self.container.fit_data_map('gauss',
+                                              self._x,
+                                              self.data,
+                                              max_workers=0,
+                                              seed_neighbours=False)
+        self._check_results(results)
+        self.assertFalse(np.any(results['warm_start']))
+        batch_results = self.container.fit_data_batch('gauss',
+                                                      self._x,
+                                                      self.data.reshape(-1, self._x.size),
+                                                      max_workers=0)
+        for name in ('offset', 'amplitude', 'center', 'sigma'):
+            np.testing.assert_allclose(results[name].ravel(), batch_results[name])
+
+    def test_failed_pixel(self):
+        self.data[1, 2, 10] = np.nan
+        results = self.container.fit_data_map('gauss', self._x, self.data, max_workers=0)
+        self.assertFalse(results[1, 2]['success'])
+        self.assertTrue(np.isnan(results[1, 2]['center']))
+        # Next pixel in snake order (row 1 is traversed backwards) is not seeded by failed pixel
+        self.assertFalse(results[1, 1]['warm_start'])
+        self.assertTrue(results[1, 3]['warm_start'])
+        self.assertEqual(np.count_nonzero(results['success']), results.size - 1)
+
+    def test_invalid_shape(self):
+        with self.assertRaises(ValueError):
+            self.container.fit_data_map('gauss', self._x, self.data[0], max_workers=0)
+        with self.assertRaises(ValueError):
+            self.container.fit_data_map('gauss', self._x[1:], self.data, max_workers=0)
+
+    def test_process_pool(self):
+        shared_memory_before = self._list_shared_memory()
+        progress = list()
+        results = self.container.fit_data_map('gauss',
+                                              self._x,
+                                              self.data,
+                                              max_workers=2,
+                                              progress_callback=lambda *args: progress.append(args))
+        self._check_results(results)
+        sequential_results = self.container.fit_data_map('gauss',
+                                                         self._x,
+                                                         self.data,
+                                                         max_workers=0)
+        for name in ('offset', 'amplitude', 'center', 'sigma'):
+            np.testing.assert_allclose(results[name], sequential_results[name], atol=1e-3)
+        # Each block of rows (here a single row) starts unseeded at the first column
+        expected_warm_start = np.ones(self._shape, dtype=bool)
+        expected_warm_start[:, 0] = False
+        np.testing.assert_array_equal(results['warm_start'], expected_warm_start)
+        total = self.data.shape[0] * self.data.shape[1]
+        fitted = [fitted for fitted, _ in progress]
+        self.assertEqual(fitted, sorted(fitted))
+        self.assertEqual(progress[-1], (total, total))
+        # Shared memory block has been released
+        self.assertTrue(self._list_shared_memory().issubset(shared_memory_before))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,7 +23,8 @@ If not, see <https://www.gnu.org/licenses/>.
 import unittest
 import numpy as np
 
-from qudi.util.fit_models.gaussian import Gaussian
+from qudi.util.fit_models.gaussian import Gaussian, Gaussian2D
+from qudi.util.spotfitting import find_spots, fit_spots
 
 
 class TestGaussianMethods(unittest.TestCase):
@@ -94,5 +95,55 @@ class TestGaussianMethods(unittest.TestCase):
             self.assertLessEqual(diff, tolerance, msg)
 
 
+class TestGaussian2DMethods(unittest.TestCase):
+    _fit_param_tolerance = 0.05  # 5% tolerance for each fit parameter
+
+    def setUp(self):
+        self.x_axis = np.linspace(0, 20e-6, 81)
+        self.y_axis = np.linspace(0, 15e-6, 61)
+        self.x = np.array(np.meshgrid(self.x_axis, self.y_axis, indexing='ij'))
+        self.rng = np.random.default_rng(7)
+
+    def test_gaussian_2d(self):
+        params = {'offset': 50., 'amplitude': 500., 'center_x': 8e-6, 'center_y': 6e-6,
+                  'sigma_x': 1e-6, 'sigma_y': 1.5e-6, 'theta': 0.5}
+        y_values = self.rng.poisson(Gaussian2D._model_function(self.x, **params)).astype(float)
+
+        fit_model = Gaussian2D()
+        estimate = fit_model.estimate_peak(y_values, self.x)
+        for name in ('center_x', 'center_y'):
+            self.assertLess(abs(estimate[name].value - params[name]) / params[name],
+                            self._fit_param_tolerance)
+        fit_result = fit_model.fit(data=y_values, x=self.x, params=estimate)
+        self.assertTrue(fit_result.success)
+        # Widths along the principal axes are unique up to swapping sigma_x and sigma_y
+        widths = sorted((fit_result.best_values['sigma_x'], fit_result.best_values['sigma_y']))
+        for name, value in (('center_x', params['center_x']),
+                            ('center_y', params['center_y']),
+                            ('amplitude', params['amplitude'])):
+            self.assertLess(abs(fit_result.best_values[name] - value) / value,
+                            self._fit_param_tolerance)
+        for width, value in zip(widths, (params['sigma_x'], params['sigma_y'])):
+            self.assertLess(abs(width - value) / value, self._fit_param_tolerance)
+
+    def test_fit_spots(self):
+        centers = ((4e-6, 4e-6), (15e-6, 5e-6), (10e-6, 11e-6))
+        image = np.full(self.x[0].shape, 20.)
+        for center_x, center_y in centers:
+            image += Gaussian2D._model_function(self.x, 0, 400, center_x, center_y, 0.4e-6, 0.4e-6,
+                                                0).reshape(image.shape)
+        image = self.rng.poisson(image).astype(float)
+
+        spots = find_spots(image)
+        self.assertEqual(len(spots), len(centers))
+        results = fit_spots(image, self.x_axis, self.y_axis, spots, max_workers=0)
+        self.assertTrue(np.all(results['success']))
+        for center_x, center_y in centers:
+            distance = np.hypot(results['center_x'] - center_x, results['center_y'] - center_y)
+            self.assertLess(np.min(distance), 0.05e-6)
+        with self.assertRaises(ValueError):
+            fit_spots(image.T, self.x_axis, self.y_axis)
+
+
 if __name__ == '__main__':
     unittest.main()
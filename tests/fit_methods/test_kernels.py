@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests comparing the (compiled) fit model kernels with their numpy counterparts.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+
+from qudi.util.fit_models.helpers import evaluate_kernel
+from qudi.util.fit_models import gaussian, lorentzian, exp_decay, poissonian
+
+
+class TestModelKernels(unittest.TestCase):
+    # (pure python kernel, compiled kernel, numpy implementation, x values, parameter sets)
+    # Each parameter set includes edge cases like zero widths that result in inf/nan values.
+    _kernels = {
+        'gaussian': (gaussian._multiple_gaussian_kernel,
+                     gaussian._compiled_multiple_gaussian_kernel,
+                     gaussian._multiple_gaussian_numpy,
+                     np.linspace(-5, 5, 101),
+                     [((0.5,), (1.2,), (2.,)),
+                      ((-1., 0., 2.), (0.5, 1., 3.), (1., -2., 0.5)),
+                      ((0., 1.), (0., 1.), (1., 1.))]),
+        'lorentzian': (lorentzian._multiple_lorentzian_kernel,
+                       lorentzian._compiled_multiple_lorentzian_kernel,
+                       lorentzian._multiple_lorentzian_numpy,
+                       np.linspace(-5, 5, 101),
+                       [((0.5,), (1.2,), (2.,)),
+                        ((-1., 0., 2.), (0.5, 1., 3.), (1., -2., 0.5)),
+                        ((0., 1.), (0., 1.), (1., 1.))]),
+        'exponential_decay': (exp_decay._multiple_exponential_decay_kernel,
+                              exp_decay._compiled_multiple_exponential_decay_kernel,
+                              exp_decay._multiple_exponential_decay_numpy,
+                              np.linspace(0, 10, 101),
+                              [((2.,), (1.5,), (1.,)),
+                               ((1., 0.5), (0.5, 4.), (2., 0.7)),
+                               ((1., 1.), (0., 1.), (1., 0.))]),
+        'poissonian': (poissonian._multiple_poissonian_kernel,
+                       poissonian._compiled_multiple_poissonian_kernel,
+                       poissonian._multiple_poissonian_numpy,
+                       np.arange(50, dtype=float),
+                       [((10.,), (2.,)),
+                        ((3., 25.5), (1., 0.5)),
+                        ((0., 5.), (1., 1.))])
+    }
+
+    def _compare(self, name, use_compiled):
+        kernel, compiled_kernel, numpy_function, x, parameter_sets = self._kernels[name]
+        if use_compiled:
+            if compiled_kernel is None:
+                self.skipTest('numba is not available')
+            kernel = compiled_kernel
+        for parameters in parameter_sets:
+            with self.subTest(parameters=parameters), np.errstate(all='ignore'):
+                expected = numpy_function(x, *parameters)
+                np.testing.assert_allclose(evaluate_kernel(kernel, x, *parameters),
+                                           expected,
+                                           rtol=1e-12,
+                                           atol=1e-300,
+                                           equal_nan=True)
+                # Arbitrary shaped x and scalar x
+                np.testing.assert_allclose(evaluate_kernel(kernel, x.reshape(-1, 1), *parameters),
+                                           expected.reshape(-1, 1),
+                                           rtol=1e-12,
+                                           atol=1e-300,
+                                           equal_nan=True)
+                self.assertIsInstance(evaluate_kernel(kernel, x[3], *parameters), float)
+
+    def test_python_kernels(self):
+        for name in self._kernels:
+            with self.subTest(kernel=name):
+                self._compare(name, use_compiled=False)
+
+    def test_compiled_kernels(self):
+        for name in self._kernels:
+            with self.subTest(kernel=name):
+                self._compare(name, use_compiled=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests for the (analytic and finite-difference) Jacobians of qudi fit models.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+
+from qudi.util.fit_models.gaussian import Gaussian, DoubleGaussian
+from qudi.util.fit_models.lorentzian import Lorentzian
+from qudi.util.fit_models.exp_decay import ExponentialDecay
+from qudi.util.fit_models.linear import Linear
+
+
+class TestModelJacobian(unittest.TestCase):
+    _x = np.linspace(-5, 5, 201)
+    _models = {
+        Gaussian: dict(offset=1., amplitude=3., center=0.2, sigma=0.7),
+        DoubleGaussian: dict(offset=1., amplitude_1=3., amplitude_2=-2., center_1=-1.,
+                             center_2=1.5, sigma_1=0.5, sigma_2=0.8),
+        Lorentzian: dict(offset=1., amplitude=3., center=0.2, sigma=0.7),
+        ExponentialDecay: dict(offset=0.5, amplitude=2., decay=1.5, stretch=1.2),
+        Linear: dict(offset=1., slope=-0.5)
+    }
+
+    def _x_for(self, model_class):
+        return np.abs(self._x) if model_class is ExponentialDecay else self._x
+
+    def test_analytic_matches_finite_differences(self):
+        for model_class, values in self._models.items():
+            with self.subTest(model=model_class.__name__):
+                model = model_class()
+                params = model.make_params(**values)
+                x = self._x_for(model_class)
+                analytic = model.eval_jacobian(params, x=x)
+                model.use_analytic_jacobian = False
+                finite_differences = model.eval_jacobian(params, x=x)
+                self.assertEqual(analytic.shape, (x.size, len(params)))
+                np.testing.assert_allclose(analytic, finite_differences, rtol=1e-5, atol=1e-6)
+
+    def test_var_names(self):
+        model = Gaussian()
+        params = model.make_params(**self._models[Gaussian])
+        params['offset'].set(vary=False)
+        full = model.eval_jacobian(params, list(params), x=self._x)
+        # Default: varying parameters only
+        varying = [name for name in params if name != 'offset']
+        np.testing.assert_array_equal(model.eval_jacobian(params, x=self._x),
+                                      full[:, [list(params).index(n) for n in varying]])
+        np.testing.assert_array_equal(model.eval_jacobian(params, ['sigma', 'center'], x=self._x),
+                                      full[:, [list(params).index('sigma'),
+                                               list(params).index('center')]])
+
+    def test_finite_differences_at_parameter_bounds(self):
+        model = Gaussian()
+        model.use_analytic_jacobian = False
+        params = model.make_params(**self._models[Gaussian])
+        expected = Gaussian().eval_jacobian(params, ['sigma'], x=self._x)
+        params['sigma'].set(max=params['sigma'].value)
+        np.testing.assert_allclose(model.eval_jacobian(params, ['sigma'], x=self._x),
+                                   expected,
+                                   rtol=1e-5,
+                                   atol=1e-6)
+
+    def test_constrained_parameters(self):
+        # Constrained parameters require finite differences of the full model evaluation
+        model = DoubleGaussian()
+        params = model.make_params(**self._models[DoubleGaussian])
+        params['sigma_2'].set(expr='sigma_1')
+        jacobian = model.eval_jacobian(params, ['sigma_1'], x=self._x)
+        analytic = model.eval_jacobian(model.make_params(**self._models[DoubleGaussian]),
+                                       ['sigma_1', 'sigma_2'],
+                                       x=self._x,
+                                       sigma_2=params['sigma_1'].value)
+        np.testing.assert_allclose(jacobian[:, 0],
+                                   analytic.sum(axis=1),
+                                   rtol=1e-5,
+                                   atol=1e-6)
+
+    def test_residual_jacobian_sign(self):
+        # Residual sign must match the analytic residual Jacobian independent of lmfit version
+        model = Lorentzian()
+        params = model.make_params(**self._models[Lorentzian])
+        data = model.eval(params, x=self._x) + np.cos(self._x)
+        weights = np.full(self._x.size, 2.)
+        residual = model._residual(params, data, weights, x=self._x)
+        np.testing.assert_allclose(residual, 2 * np.cos(self._x))
+        jacobian = model._residual_jacobian(params, data, weights, x=self._x)
+        finite_differences = np.empty_like(jacobian)
+        for row, name in zip(finite_differences, params):
+            shifted = params.copy()
+            step = 1e-7 * abs(shifted[name].value)
+            shifted[name].value += step
+            row[:] = (model._residual(shifted, data, weights, x=self._x) - residual) / step
+        np.testing.assert_allclose(jacobian, finite_differences, rtol=1e-4, atol=1e-5)
+
+    def test_fit_with_analytic_jacobian(self):
+        rng = np.random.default_rng(1234)
+        model = Lorentzian()
+        data = model.eval(x=self._x, offset=1., amplitude=3., center=0.2, sigma=0.5)
+        data += rng.normal(0, 0.05, self._x.size)
+        result = model.fit(data, model.estimators['Peak'](data, self._x), x=self._x)
+        model.use_analytic_jacobian = False
+        expected = model.fit(data, model.estimators['Peak'](data, self._x), x=self._x)
+        self.assertTrue(result.success)
+        for name, value in expected.best_values.items():
+            self.assertAlmostEqual(result.best_values[name], value, delta=1e-4)
+        self.assertAlmostEqual(result.redchi, expected.redchi, delta=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
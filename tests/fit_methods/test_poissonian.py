@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests for all qudi fit routines for Poissonian models.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+from scipy.stats import poisson
+
+from qudi.util.fit_models.poissonian import Poissonian, multiple_poissonian
+
+
+class TestPoissonianMethods(unittest.TestCase):
+    _fit_param_tolerance = 0.05  # 5% tolerance for each fit parameter
+
+    def test_multiple_poissonian(self):
+        # Sum of scaled Poisson probability mass functions
+        x_values = np.arange(100, dtype=float)
+        mus = (10., 45.5)
+        amplitudes = (2., 0.5)
+        expected = sum(amp * poisson.pmf(x_values, mu) for mu, amp in zip(mus, amplitudes))
+        np.testing.assert_allclose(multiple_poissonian(x_values, mus, amplitudes), expected)
+        self.assertAlmostEqual(multiple_poissonian(3., mus, amplitudes), expected[3])
+        # Normal distribution approximation for large x uses amplitudes as peak heights
+        mu = 2e6
+        values = multiple_poissonian(np.array([1e6, mu, mu + np.sqrt(mu)]), (mu,), (3.,))
+        np.testing.assert_allclose(values[1:], [3., 3. * np.exp(-0.5)])
+
+    def test_poissonian(self):
+        # Test for Poissonian fit
+        offset = np.random.rand() * 10
+        mu = 5 + np.random.rand() * 50
+        amplitude = 1e3 + np.random.rand() * 1e4
+        x_values = np.arange(int(3 * mu), dtype=float)
+        noise = (np.random.rand(x_values.size) - 0.5) * amplitude * 1e-3
+        y_values = noise + offset + amplitude * poisson.pmf(x_values, mu)
+
+        fit_model = Poissonian()
+        fit_result = fit_model.fit(data=y_values,
+                                   x=x_values,
+                                   params=fit_model.estimate(y_values, x_values))
+        self.assertTrue(fit_result.success)
+        for name, value in (('mu', mu), ('amplitude', amplitude)):
+            self.assertLess(abs(fit_result.best_values[name] - value) / value,
+                            self._fit_param_tolerance)
+
+    def test_poisson_objective(self):
+        # Poisson maximum-likelihood fit of low photon count data
+        rng = np.random.default_rng(42)
+        offset, mu, amplitude = 0.5, 12., 200.
+        x_values = np.arange(40, dtype=float)
+        y_values = rng.poisson(offset + amplitude * poisson.pmf(x_values, mu)).astype(float)
+
+        fit_model = Poissonian()
+        params = fit_model.estimate(y_values, x_values)
+        fit_result = fit_model.fit(data=y_values, x=x_values, params=params, objective='poisson')
+        self.assertTrue(fit_result.success)
+        # Sum of squared deviance residuals is the Poisson deviance
+        model = fit_result.best_fit
+        deviance = 2 * np.sum(model - y_values + y_values * np.log(
+            np.where(y_values > 0, y_values, 1) / np.where(y_values > 0, model, 1)
+        ))
+        self.assertAlmostEqual(fit_result.chisqr, deviance, places=6)
+        self.assertLess(abs(fit_result.best_values['mu'] - mu) / mu, self._fit_param_tolerance)
+        with self.assertRaises(ValueError):
+            fit_model.fit(data=y_values - 10, x=x_values, params=params, objective='poisson')
+        with self.assertRaises(ValueError):
+            fit_model.fit(data=y_values, x=x_values, params=params, objective='foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
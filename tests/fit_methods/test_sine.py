@@ -20,10 +20,11 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import time
 import unittest
 import numpy as np
 
-from qudi.util.fit_models.sine import Sine, DoubleSine
+from qudi.util.fit_models.sine import Sine, DoubleSine, ExponentialDecaySine, estimate_phase_lsq
 
 
 class TestSineMethods(unittest.TestCase):
@@ -106,5 +107,46 @@ class TestSineMethods(unittest.TestCase):
             self.assertLessEqual(diff, tolerance, msg)
 
 
+class TestSinePhaseEstimation(unittest.TestCase):
+    _phase_tolerance = 0.1  # rad
+    _max_estimation_time = 1.  # seconds, for the longest trace
+    _point_counts = (100, 1000, 10000, 100000)
+
+    @staticmethod
+    def phase_error(phase, ideal_phase):
+        return abs(np.angle(np.exp(1j * (phase - ideal_phase))))
+
+    def setUp(self):
+        self.phase = (np.random.rand() - 0.5) * 2 * np.pi
+        self.frequency = 5e6
+        self.decay = 0.5e-6
+
+    def test_estimate_phase_lsq(self):
+        for points in self._point_counts:
+            x = np.linspace(0, 1e-6, points)
+            envelope = np.exp(-x / self.decay)
+            y_values = envelope * np.sin(2 * np.pi * self.frequency * x + self.phase)
+            y_values += (np.random.rand(points) - 0.5) * 0.1
+            amplitude, phase = estimate_phase_lsq(y_values, x, self.frequency, envelope)
+            msg = f'Phase estimate not within {self._phase_tolerance} rad for {points} points'
+            self.assertLessEqual(self.phase_error(phase, self.phase), self._phase_tolerance, msg)
+            self.assertAlmostEqual(amplitude, 1, delta=0.1)
+
+    def test_estimator_timing(self):
+        # Phase estimation must not scale with the number of samples per oscillation period
+        for model in (Sine(), ExponentialDecaySine()):
+            estimator = tuple(model.estimators.values())[0]
+            for points in self._point_counts:
+                x = np.linspace(0, 1e-6, points)
+                y_values = np.sin(2 * np.pi * self.frequency * x + self.phase)
+                y_values *= np.exp(-x / self.decay)
+                start = time.perf_counter()
+                estimate = estimator(y_values, x)
+                elapsed = time.perf_counter() - start
+                msg = f'{type(model).__name__} estimation too slow for {points} points'
+                self.assertLessEqual(elapsed, self._max_estimation_time, msg)
+                self.assertLessEqual(self.phase_error(estimate['phase'].value, self.phase), 0.5)
+
+
 if __name__ == '__main__':
     unittest.main()